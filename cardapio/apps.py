@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CardapioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cardapio'
+
+    def ready(self):
+        from . import signals, tarefas  # noqa: F401
@@ -0,0 +1,218 @@
+"""Apoio aos comandos de carga e benchmark (banco temporario, dados, clientes)."""
+
+import http.cookiejar
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .busca import reindexar
+from .models import ItemPedido, Pedido, Produto
+from .relatorios import reconstruir_vendas_diarias
+
+PADRAO_TOKEN_CHECKOUT = re.compile(r'name="token_checkout" value="(\w+)"')
+
+
+@contextmanager
+def banco_temporario(limites=False):
+    """Aponta a conexao 'default' para um arquivo SQLite novo e migrado.
+
+    Usa um arquivo (e nao o banco em memoria dos testes) para que varias
+    threads, ou um servidor WSGI local, disputem o banco como em producao.
+    Os limites de requisicao ficam desligados, a menos que ``limites`` seja
+    verdadeiro: toda a carga sai do mesmo IP. O catalogo usa um cache em
+    memoria proprio, para nao misturar o banco temporario com o cache real.
+    """
+    if connections['default'].vendor != 'sqlite':
+        raise RuntimeError('O banco temporario de carga so suporta SQLite.')
+
+    diretorio = tempfile.mkdtemp(prefix='netburguer-carga-')
+    config = connections.settings['default']
+    nome_original = config['NAME']
+    connections['default'].close()
+    config['NAME'] = connections['default'].settings_dict['NAME'] = os.path.join(
+        diretorio, 'carga.sqlite3'
+    )
+
+    setup_test_environment()
+    # Falhas sao contadas pelos comandos; nao precisam de traceback no console.
+    logger_requisicoes = logging.getLogger('django.request')
+    nivel_original = logger_requisicoes.level
+    logger_requisicoes.setLevel(logging.CRITICAL)
+    try:
+        call_command('migrate', verbosity=0)
+        caches_carga = dict(
+            settings.CACHES,
+            default={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'netburguer-carga'},
+        )
+        with override_settings(LIMITES_ATIVOS=limites, CACHES=caches_carga):
+            yield
+    finally:
+        connections.close_all()
+        logger_requisicoes.setLevel(nivel_original)
+        teardown_test_environment()
+        config['NAME'] = connections['default'].settings_dict['NAME'] = nome_original
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def semear(qtd_produtos, qtd_pedidos, dias=90, semente=42):
+    """Cria produtos e um historico de pedidos distribuido nos ultimos ``dias``."""
+    aleatorio = random.Random(semente)
+    produtos = Produto.objects.bulk_create(
+        [
+            Produto(
+                nome=f'Produto {i:03d}',
+                descricao='Pao brioche, blend artesanal, queijo e molho da casa.',
+                preco=Decimal(aleatorio.randint(900, 4500)) / 100,
+            )
+            for i in range(qtd_produtos)
+        ]
+    )
+    reindexar()
+
+    agora = timezone.now()
+    for inicio in range(0, qtd_pedidos, 500):
+        pedidos = []
+        itens_por_pedido = []
+        for _ in range(inicio, min(inicio + 500, qtd_pedidos)):
+            itens = [
+                (produto, aleatorio.randint(1, 3))
+                for produto in aleatorio.sample(produtos, min(len(produtos), aleatorio.randint(1, 4)))
+            ]
+            total_bruto = sum((produto.preco * qtd for produto, qtd in itens), Decimal('0.00'))
+            desconto = total_bruto * Decimal('0.10') if len(itens) >= 3 else Decimal('0.00')
+            pedidos.append(
+                Pedido(
+                    nome_cliente='Cliente Benchmark',
+                    endereco_entrega='Rua do Teste, 100',
+                    data_criacao=agora - timedelta(minutes=aleatorio.randint(0, dias * 24 * 60)),
+                    total_bruto=total_bruto,
+                    desconto_aplicado=desconto,
+                    total_final=total_bruto - desconto,
+                    itens_json=json.dumps([
+                        {
+                            'produto_id': produto.id,
+                            'nome': produto.nome,
+                            'quantidade': qtd,
+                            'preco': f'{produto.preco:.2f}',
+                            'total': f'{produto.preco * qtd:.2f}',
+                        }
+                        for produto, qtd in itens
+                    ]),
+                )
+            )
+            itens_por_pedido.append(itens)
+
+        Pedido.objects.bulk_create(pedidos)
+        ItemPedido.objects.bulk_create(
+            [
+                ItemPedido(
+                    pedido=pedido,
+                    produto=produto,
+                    nome=produto.nome,
+                    preco_unitario=produto.preco,
+                    quantidade=qtd,
+                    total=produto.preco * qtd,
+                )
+                for pedido, itens in zip(pedidos, itens_por_pedido)
+                for produto, qtd in itens
+            ]
+        )
+
+    reconstruir_vendas_diarias()
+    return produtos
+
+
+def percentil(valores, p):
+    """Percentil ``p`` (0-100) por interpolacao linear; 0.0 se vazio."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+class ClienteDjango:
+    """Cliente do fluxo usando o django.test.Client (sem rede)."""
+
+    def __init__(self):
+        self._client = Client(raise_request_exception=False)
+
+    def login(self, usuario):
+        self._client.force_login(usuario)
+
+    def get(self, caminho, **params):
+        response = self._client.get(caminho, params)
+        corpo = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, corpo.decode()
+
+    def post(self, caminho, dados=None, ajax=False):
+        extras = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if ajax else {}
+        response = self._client.post(caminho, dados or {}, **extras)
+        return response.status_code, response.content.decode()
+
+
+class _SemRedirecionamento(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ClienteHttp:
+    """Cliente do fluxo via HTTP real (servidor WSGI local), com cookies e CSRF."""
+
+    def __init__(self, url_base):
+        self.url_base = url_base.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _SemRedirecionamento
+        )
+
+    def _cookie(self, nome):
+        return next((c.value for c in self.cookies if c.name == nome), '')
+
+    def login(self, usuario, senha):
+        self.get('/painel/login/')
+        self.post('/painel/login/', {'username': usuario, 'password': senha})
+
+    def _abrir(self, requisicao):
+        try:
+            with self._opener.open(requisicao, timeout=60) as response:
+                return response.status, response.read().decode()
+        except urllib.error.HTTPError as erro:
+            return erro.code, erro.read().decode(errors='replace')
+
+    def get(self, caminho, **params):
+        url = self.url_base + caminho
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        return self._abrir(urllib.request.Request(url))
+
+    def post(self, caminho, dados=None, ajax=False):
+        cabecalhos = {'X-CSRFToken': self._cookie('csrftoken')}
+        if ajax:
+            cabecalhos['X-Requested-With'] = 'XMLHttpRequest'
+        requisicao = urllib.request.Request(
+            self.url_base + caminho,
+            data=urllib.parse.urlencode(dados or {}).encode(),
+            headers=cabecalhos,
+            method='POST',
+        )
+        return self._abrir(requisicao)
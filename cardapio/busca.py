@@ -0,0 +1,145 @@
+"""Busca textual no cardapio (nome/descricao), sem diferenciar acentos.
+
+No SQLite usa a tabela FTS5 ``cardapio_produto_fts`` (tokenizer unicode61
+com remove_diacritics), mantida pelos sinais de Produto e por
+``indexar_produtos`` nas gravacoes em lote. No PostgreSQL usa o indice GIN
+de expressao ``netburguer_produto_busca(nome, descricao)``, que o proprio
+banco mantem. Ambos sao criados pela migracao 0009.
+"""
+
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.models import Q
+
+from .catalogo import obter_produtos
+from .models import Produto
+
+TABELA_FTS = 'cardapio_produto_fts'
+LIMITE_RESULTADOS = 60
+# Termos considerados por busca; o resto do texto e ignorado.
+MAXIMO_TERMOS = 8
+# Peso do nome em relacao a descricao na ordenacao por relevancia (bm25).
+PESO_NOME = 10.0
+
+
+def termos_busca(texto):
+    """Palavras do texto digitado, ja sem pontuacao (nada chega cru ao MATCH)."""
+    return re.findall(r'\w+', (texto or '').lower())[:MAXIMO_TERMOS]
+
+
+def _conexao(using=None, escrita=False):
+    if using is None:
+        using = router.db_for_write(Produto) if escrita else router.db_for_read(Produto)
+    return connections[using or DEFAULT_DB_ALIAS]
+
+
+def _filtros_preco(preco_min, preco_max):
+    sql, parametros = '', []
+    if preco_min is not None:
+        sql += ' AND p.preco >= %s'
+        parametros.append(preco_min)
+    if preco_max is not None:
+        sql += ' AND p.preco <= %s'
+        parametros.append(preco_max)
+    return sql, parametros
+
+
+def _buscar_sqlite(termos, preco_min, preco_max, limite):
+    # Cada termo vira prefixo ("pao"*), todos obrigatorios.
+    consulta = ' '.join(f'"{termo}"*' for termo in termos)
+    filtros, parametros = _filtros_preco(preco_min, preco_max)
+    sql = (
+        f'SELECT p.* FROM {TABELA_FTS} '
+        f'JOIN {Produto._meta.db_table} p ON p.id = {TABELA_FTS}.rowid '
+        f'WHERE {TABELA_FTS} MATCH %s{filtros} '
+        f'ORDER BY bm25({TABELA_FTS}, {PESO_NOME}, 1.0), p.nome LIMIT %s'
+    )
+    return list(Produto.objects.raw(sql, [consulta, *parametros, limite]))
+
+
+def _buscar_postgresql(termos, preco_min, preco_max, limite):
+    consulta = ' & '.join(f'{termo}:*' for termo in termos)
+    filtros, parametros = _filtros_preco(preco_min, preco_max)
+    sql = (
+        f'SELECT p.*, ts_rank(netburguer_produto_busca(p.nome, p.descricao), consulta) AS relevancia '
+        f"FROM {Produto._meta.db_table} p, to_tsquery('portuguese', netburguer_sem_acento(%s)) consulta "
+        f'WHERE netburguer_produto_busca(p.nome, p.descricao) @@ consulta{filtros} '
+        f'ORDER BY relevancia DESC, p.nome LIMIT %s'
+    )
+    return list(Produto.objects.raw(sql, [consulta, *parametros, limite]))
+
+
+def _buscar_sem_indice(termos, preco_min, preco_max, limite):
+    """Outros bancos: sem indice textual, filtra com icontains."""
+    produtos = Produto.objects.all()
+    for termo in termos:
+        produtos = produtos.filter(Q(nome__icontains=termo) | Q(descricao__icontains=termo))
+    if preco_min is not None:
+        produtos = produtos.filter(preco__gte=preco_min)
+    if preco_max is not None:
+        produtos = produtos.filter(preco__lte=preco_max)
+    return list(produtos[:limite])
+
+
+def buscar_produtos(texto='', preco_min=None, preco_max=None, limite=LIMITE_RESULTADOS):
+    """Produtos que contem todas as palavras de ``texto``, do mais relevante ao menos.
+
+    Sem texto, filtra so por preco sobre o catalogo em cache.
+    """
+    termos = termos_busca(texto)
+    if not termos:
+        return [
+            produto for produto in obter_produtos()
+            if (preco_min is None or produto.preco >= preco_min)
+            and (preco_max is None or produto.preco <= preco_max)
+        ][:limite]
+
+    vendor = _conexao().vendor
+    if vendor == 'sqlite':
+        return _buscar_sqlite(termos, preco_min, preco_max, limite)
+    if vendor == 'postgresql':
+        return _buscar_postgresql(termos, preco_min, preco_max, limite)
+    return _buscar_sem_indice(termos, preco_min, preco_max, limite)
+
+
+# ---------------------------
+# Manutencao do indice (SQLite)
+# ---------------------------
+
+
+def indexar_produtos(produtos, using=None):
+    """Grava nome/descricao dos produtos no indice FTS5.
+
+    Roda na transacao corrente, entao o indice acompanha o commit ou o
+    rollback da alteracao. Nos outros bancos nao ha nada a fazer.
+    """
+    conexao = _conexao(using, escrita=True)
+    if conexao.vendor != 'sqlite' or not produtos:
+        return
+    with conexao.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {TABELA_FTS}(rowid, nome, descricao) VALUES (%s, %s, %s)',
+            [(produto.id, produto.nome, produto.descricao) for produto in produtos],
+        )
+
+
+def remover_do_indice(produto_ids, using=None):
+    conexao = _conexao(using, escrita=True)
+    if conexao.vendor != 'sqlite' or not produto_ids:
+        return
+    with conexao.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABELA_FTS} WHERE rowid = %s', [(pk,) for pk in produto_ids])
+
+
+def reindexar(using=None):
+    """Reconstroi o indice a partir da tabela de produtos (apos cargas sem sinais)."""
+    conexao = _conexao(using, escrita=True)
+    if conexao.vendor != 'sqlite':
+        return
+    with conexao.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABELA_FTS}')
+        cursor.execute(
+            f'INSERT INTO {TABELA_FTS}(rowid, nome, descricao) '
+            f'SELECT id, nome, descricao FROM {Produto._meta.db_table}'
+        )
@@ -0,0 +1,141 @@
+"""Cache versionado do catalogo de produtos."""
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .models import Produto
+
+CHAVE_VERSAO = 'cardapio:catalogo:versao'
+CHAVE_PRODUTOS = 'cardapio:catalogo:{versao}:produtos'
+CHAVE_MENU_HTML = 'cardapio:catalogo:{versao}:menu_html'
+
+# Marcador trocado pelo token CSRF real de cada requisicao, ja que o
+# fragmento renderizado e compartilhado entre todos os clientes.
+MARCADOR_CSRF = '__NETBURGUER_CSRF__'
+
+
+# Indice id -> Produto da ultima versao lida neste processo, para nao
+# desserializar a lista do cache a cada item do carrinho.
+_indice_local = (None, {})
+
+
+def _agora_us():
+    return time.time_ns() // 1000
+
+
+def versao_catalogo():
+    """Retorna a versao atual do catalogo (timestamp em microssegundos)."""
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO, _agora_us(), None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+async def aversao_catalogo():
+    """Versao assincrona de ``versao_catalogo`` (views ASGI)."""
+    versao = await cache.aget(CHAVE_VERSAO)
+    if versao is None:
+        await cache.aadd(CHAVE_VERSAO, _agora_us(), None)
+        versao = await cache.aget(CHAVE_VERSAO)
+    return versao
+
+
+def invalidar_catalogo():
+    """Avanca a versao do catalogo, descartando tudo que foi cacheado antes."""
+    atual = cache.get(CHAVE_VERSAO) or 0
+    cache.set(CHAVE_VERSAO, max(_agora_us(), atual + 1), None)
+
+
+def ultima_modificacao(versao=None):
+    """Converte a versao do catalogo em datetime para o Last-Modified."""
+    versao = versao if versao is not None else versao_catalogo()
+    return datetime.fromtimestamp(versao / 1_000_000, tz=dt_timezone.utc)
+
+
+def obter_produtos(versao=None):
+    """Lista de produtos do catalogo, cacheada pela versao."""
+    versao = versao if versao is not None else versao_catalogo()
+    chave = CHAVE_PRODUTOS.format(versao=versao)
+    produtos = cache.get(chave)
+    if produtos is None:
+        produtos = list(Produto.objects.all())
+        cache.set(chave, produtos)
+    return produtos
+
+
+def indice_produtos(versao=None):
+    """Dicionario id -> Produto do catalogo, reaproveitado enquanto a versao nao mudar."""
+    global _indice_local
+    versao = versao if versao is not None else versao_catalogo()
+    versao_local, indice = _indice_local
+    if versao_local != versao:
+        indice = {produto.id: produto for produto in obter_produtos(versao)}
+        _indice_local = (versao, indice)
+    return indice
+
+
+async def aobter_produtos(versao=None):
+    """Versao assincrona de ``obter_produtos``, lendo o banco com ``aiterator``."""
+    versao = versao if versao is not None else await aversao_catalogo()
+    chave = CHAVE_PRODUTOS.format(versao=versao)
+    produtos = await cache.aget(chave)
+    if produtos is None:
+        produtos = [produto async for produto in Produto.objects.all().aiterator()]
+        await cache.aset(chave, produtos)
+    return produtos
+
+
+async def aindice_produtos(versao=None):
+    """Versao assincrona de ``indice_produtos``."""
+    global _indice_local
+    versao = versao if versao is not None else await aversao_catalogo()
+    versao_local, indice = _indice_local
+    if versao_local != versao:
+        indice = {produto.id: produto for produto in await aobter_produtos(versao)}
+        _indice_local = (versao, indice)
+    return indice
+
+
+def obter_produto(produto_id, versao=None):
+    """Busca um produto no catalogo cacheado; retorna None se nao existir."""
+    try:
+        produto_id = int(produto_id)
+    except (TypeError, ValueError):
+        return None
+    return indice_produtos(versao).get(produto_id)
+
+
+def obter_menu_html(versao=None):
+    """Fragmento HTML da grade de produtos, cacheado pela versao.
+
+    O token CSRF fica como ``MARCADOR_CSRF`` e deve ser substituido
+    pela view antes de entregar a pagina.
+    """
+    versao = versao if versao is not None else versao_catalogo()
+    chave = CHAVE_MENU_HTML.format(versao=versao)
+    html = cache.get(chave)
+    if html is None:
+        html = render_to_string(
+            'cliente/_produtos_grid.html',
+            {'produtos': obter_produtos(versao), 'versao': versao, 'csrf_token': MARCADOR_CSRF},
+        )
+        cache.set(chave, html)
+    return html
+
+
+async def aobter_menu_html(versao=None):
+    """Versao assincrona de ``obter_menu_html``."""
+    versao = versao if versao is not None else await aversao_catalogo()
+    chave = CHAVE_MENU_HTML.format(versao=versao)
+    html = await cache.aget(chave)
+    if html is None:
+        html = render_to_string(
+            'cliente/_produtos_grid.html',
+            {'produtos': await aobter_produtos(versao), 'versao': versao, 'csrf_token': MARCADOR_CSRF},
+        )
+        await cache.aset(chave, html)
+    return html
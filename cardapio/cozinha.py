@@ -0,0 +1,199 @@
+"""Feed de pedidos da cozinha (Server-Sent Events)."""
+
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+
+from .models import Pedido
+
+logger = logging.getLogger(__name__)
+
+# Pedidos enviados por consulta; um atraso maior e entregue em varios lotes.
+LIMITE_LOTE = 100
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def _itens(itens_json):
+    try:
+        return json.loads(itens_json or '[]')
+    except ValueError:
+        return []
+
+
+def serializar_evento(pedido):
+    """Evento SSE de um pedido; o ``id`` e o do Pedido (usado no Last-Event-ID)."""
+    dados = json.dumps(
+        {
+            'id': pedido.id,
+            'cliente': pedido.nome_cliente,
+            'endereco': pedido.endereco_entrega,
+            'data_criacao': pedido.data_criacao.isoformat(),
+            'total_final': f'{pedido.total_final:.2f}',
+            'itens': [
+                {'nome': item.get('nome', ''), 'quantidade': item.get('quantidade', 0)}
+                for item in _itens(pedido.itens_json)
+            ],
+        },
+        ensure_ascii=False,
+    )
+    return f'id: {pedido.id}\nevent: pedido\ndata: {dados}\n\n'
+
+
+def _pedidos_apos(ultimo_id):
+    return (
+        Pedido.objects.filter(id__gt=ultimo_id)
+        .order_by('id')
+        .only('id', 'nome_cliente', 'endereco_entrega', 'data_criacao', 'total_final', 'itens_json')
+    )
+
+
+def eventos_desde(ultimo_id):
+    """Lista ``(id, evento)`` dos pedidos depois de ``ultimo_id`` (um lote)."""
+    return [(pedido.id, serializar_evento(pedido)) for pedido in _pedidos_apos(ultimo_id)[:LIMITE_LOTE]]
+
+
+async def aeventos_desde(ultimo_id):
+    """Versao assincrona de ``eventos_desde``."""
+    return [
+        (pedido.id, serializar_evento(pedido))
+        async for pedido in _pedidos_apos(ultimo_id)[:LIMITE_LOTE].aiterator()
+    ]
+
+
+def ultimo_pedido_id():
+    return Pedido.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+async def aultimo_pedido_id():
+    return await Pedido.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+
+def abertura(ultimo_id):
+    """Inicio do fluxo: intervalo de reconexao e, se preciso, o id de partida."""
+    texto = f"retry: {_config('COZINHA_SSE_RETRY_MS', 3000)}\n\n"
+    if ultimo_id is not None:
+        return texto
+    # Evento sem dados: o navegador so guarda o id para o Last-Event-ID.
+    return texto + f'id: {ultimo_pedido_id()}\n\n'
+
+
+class FontePedidos:
+    """Uma unica consulta periodica por processo, repassada a todas as telas abertas.
+
+    Roda no loop de eventos do servidor ASGI enquanto houver assinantes.
+    ``acordar()`` (chamado apos o commit de um pedido neste processo)
+    antecipa a consulta; pedidos de outros processos chegam no intervalo
+    COZINHA_SSE_INTERVALO.
+    """
+
+    def __init__(self):
+        self._reiniciar(None)
+
+    def _reiniciar(self, loop):
+        """Associa a fonte a um loop de eventos (um por processo no servidor)."""
+        self._loop = loop
+        self._assinantes = set()
+        self._tarefa = None
+        self._pronta = None
+        self._acordar = asyncio.Event() if loop is not None else None
+        self.ultimo_id = 0
+
+    async def assinar(self):
+        """Registra uma tela; retorna a fila que recebe ``(id, evento)``.
+
+        So retorna depois que a fonte leu o ultimo id, para que a consulta
+        de atraso feita pela tela em seguida cubra tudo ate esse ponto.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._reiniciar(loop)
+        fila = asyncio.Queue()
+        self._assinantes.add(fila)
+        if self._tarefa is None or self._tarefa.done():
+            self._pronta = asyncio.Event()
+            self._tarefa = loop.create_task(self._consultar())
+        try:
+            await self._pronta.wait()
+        except BaseException:
+            self.cancelar(fila)
+            raise
+        return fila
+
+    def cancelar(self, fila):
+        self._assinantes.discard(fila)
+
+    def acordar(self):
+        """Pede uma consulta imediata; pode ser chamado de qualquer thread."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed() and self._tarefa is not None:
+            loop.call_soon_threadsafe(self._acordar.set)
+
+    async def _consultar(self):
+        while not self._pronta.is_set():
+            try:
+                self.ultimo_id = await aultimo_pedido_id()
+                self._pronta.set()
+            except Exception:
+                logger.exception('Falha ao iniciar o feed da cozinha.')
+                await asyncio.sleep(_config('COZINHA_SSE_INTERVALO', 1.0))
+
+        while self._assinantes:
+            try:
+                await asyncio.wait_for(self._acordar.wait(), _config('COZINHA_SSE_INTERVALO', 1.0))
+            except asyncio.TimeoutError:
+                pass
+            self._acordar.clear()
+            try:
+                eventos = await aeventos_desde(self.ultimo_id)
+            except Exception:
+                logger.exception('Falha ao consultar novos pedidos para a cozinha.')
+                continue
+            for pedido_id, evento in eventos:
+                self.ultimo_id = pedido_id
+                for fila in self._assinantes:
+                    fila.put_nowait((pedido_id, evento))
+            if len(eventos) == LIMITE_LOTE:
+                self._acordar.set()
+
+
+fonte_pedidos = FontePedidos()
+
+
+async def fluxo_eventos(ultimo_id=None):
+    """Gerador assincrono do feed: atraso desde ``ultimo_id`` e depois os novos pedidos.
+
+    Sem ``ultimo_id`` comeca a partir do pedido mais recente.
+    """
+    fila = await fonte_pedidos.assinar()
+    try:
+        yield f"retry: {_config('COZINHA_SSE_RETRY_MS', 3000)}\n\n"
+        if ultimo_id is None:
+            ultimo_id = fonte_pedidos.ultimo_id
+            yield f'id: {ultimo_id}\n\n'
+        else:
+            while True:
+                eventos = await aeventos_desde(ultimo_id)
+                for pedido_id, evento in eventos:
+                    ultimo_id = pedido_id
+                    yield evento
+                if len(eventos) < LIMITE_LOTE:
+                    break
+
+        heartbeat = _config('COZINHA_SSE_HEARTBEAT', 15.0)
+        while True:
+            try:
+                pedido_id, evento = await asyncio.wait_for(fila.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # Mantem proxies abertos e revela conexoes que ja cairam.
+                yield ': ping\n\n'
+                continue
+            if pedido_id > ultimo_id:
+                ultimo_id = pedido_id
+                yield evento
+    finally:
+        fonte_pedidos.cancelar(fila)
@@ -0,0 +1,137 @@
+"""Arquivos estaticos do perfil de producao: nomes com hash, pre-compressao e cache longo."""
+
+import gzip
+import mimetypes
+import os
+import posixpath
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # brotli e opcional; sem ele so ha a variante .gz
+    brotli = None
+
+# Tipos que compensam comprimir (imagens e fontes ja vem comprimidas).
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.map', '.svg', '.txt', '.json', '.xml', '.html')
+TAMANHO_MINIMO_COMPRESSAO = 256
+
+# Variantes na ordem de preferencia: (codificacao, sufixo do arquivo).
+VARIANTES = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _gzip(conteudo):
+    # mtime fixo: o mesmo arquivo gera sempre os mesmos bytes.
+    return gzip.compress(conteudo, compresslevel=9, mtime=0)
+
+
+def _brotli(conteudo):
+    return brotli.compress(conteudo, quality=11)
+
+
+class ArmazenamentoEstaticos(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que grava tambem ``.gz`` e ``.br`` de cada arquivo de texto.
+
+    As variantes sao feitas no collectstatic, uma vez, com a compressao
+    maxima; ``servir_estatico`` escolhe entre elas pelo Accept-Encoding.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        compressores = [('.gz', _gzip)] + ([('.br', _brotli)] if brotli else [])
+        for nome in set(self.hashed_files.values()):
+            if nome.endswith(EXTENSOES_COMPRIMIVEIS):
+                self._comprimir(nome, compressores)
+
+    def _comprimir(self, nome, compressores):
+        with self.open(nome) as arquivo:
+            conteudo = arquivo.read()
+        if len(conteudo) < TAMANHO_MINIMO_COMPRESSAO:
+            return
+        for sufixo, comprimir in compressores:
+            comprimido = comprimir(conteudo)
+            if len(comprimido) < len(conteudo):
+                with open(self.path(nome) + sufixo, 'wb') as destino:
+                    destino.write(comprimido)
+
+
+@lru_cache(maxsize=1)
+def nomes_imutaveis():
+    """Nomes com hash do manifesto; o conteudo de cada um nunca muda."""
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+@receiver(setting_changed)
+def _estaticos_alterados(setting, **kwargs):
+    if setting in ('STATIC_ROOT', 'STATIC_URL', 'STORAGES'):
+        nomes_imutaveis.cache_clear()
+
+
+def codificacoes_aceitas(cabecalho):
+    """Codificacoes do Accept-Encoding, sem as recusadas com ``q=0``."""
+    aceitas = set()
+    for parte in (cabecalho or '').lower().split(','):
+        nome, _, parametros = parte.partition(';')
+        qualidade = parametros.strip()
+        if qualidade.startswith('q=') and qualidade[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        if nome.strip():
+            aceitas.add(nome.strip())
+    return aceitas
+
+
+@require_safe
+def servir_estatico(request, caminho):
+    """Serve STATIC_ROOT quando nao ha servidor web na frente (SERVIR_ESTATICOS).
+
+    Arquivos com hash vao com cache de um ano e ``immutable``; os demais
+    sao revalidados. Entrega a variante .br/.gz se o cliente aceitar.
+    """
+    caminho = posixpath.normpath(caminho).lstrip('/')
+    try:
+        arquivo = safe_join(settings.STATIC_ROOT, caminho)
+    except SuspiciousFileOperation:
+        raise Http404('Arquivo nao encontrado.')
+    if not os.path.isfile(arquivo):
+        raise Http404('Arquivo nao encontrado.')
+
+    estado = os.stat(arquivo)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), estado.st_mtime):
+        # O 304 repete os cabecalhos de cache da resposta completa.
+        return _cabecalhos_de_cache(HttpResponseNotModified(), caminho)
+
+    aceitas = codificacoes_aceitas(request.headers.get('accept-encoding'))
+    codificacao, enviado = None, arquivo
+    for nome, sufixo in VARIANTES:
+        if nome in aceitas and os.path.isfile(arquivo + sufixo):
+            codificacao, enviado = nome, arquivo + sufixo
+            break
+
+    tipo, _ = mimetypes.guess_type(arquivo)
+    response = FileResponse(open(enviado, 'rb'), content_type=tipo or 'application/octet-stream')
+    if codificacao:
+        response.headers['Content-Encoding'] = codificacao
+    response.headers['Last-Modified'] = http_date(estado.st_mtime)
+    return _cabecalhos_de_cache(response, caminho)
+
+
+def _cabecalhos_de_cache(response, caminho):
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if caminho in nomes_imutaveis():
+        patch_cache_control(response, public=True, max_age=settings.ESTATICOS_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
@@ -0,0 +1,174 @@
+"""Fila de tarefas em banco, processada pelo comando processar_tarefas."""
+
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+# Funcoes registradas com @tarefa, por nome.
+_registradas = {}
+
+
+def tarefa(max_tentativas=5):
+    """Registra a funcao como tarefa e adiciona ``funcao.enfileirar(**kwargs)``.
+
+    Os argumentos precisam ser serializaveis em JSON (ids, nao objetos).
+    """
+
+    def decorador(funcao):
+        _registradas[funcao.__name__] = funcao
+        funcao.max_tentativas = max_tentativas
+        funcao.enfileirar = lambda **kwargs: enfileirar_lote([(funcao, kwargs)])[0]
+        return funcao
+
+    return decorador
+
+
+def enfileirar_lote(chamadas):
+    """Enfileira ``[(funcao, kwargs), ...]`` em um unico INSERT.
+
+    As tarefas entram na transacao corrente e so ficam visiveis ao worker
+    no commit, junto com o que as originou.
+    """
+    tarefas = Tarefa.objects.bulk_create(
+        [
+            Tarefa(
+                nome=funcao.__name__,
+                argumentos=json.dumps(kwargs),
+                max_tentativas=funcao.max_tentativas,
+            )
+            for funcao, kwargs in chamadas
+        ]
+    )
+    if getattr(settings, 'TAREFAS_SINCRONAS', False):
+        ids = [tarefa.pk for tarefa in tarefas]
+        transaction.on_commit(lambda: [_executar_agora(tarefa_id) for tarefa_id in ids])
+    return tarefas
+
+
+def _executar_agora(tarefa_id):
+    """Modo sincrono (desenvolvimento): executa logo apos o commit."""
+    agora = timezone.now()
+    reservou = Tarefa.objects.filter(pk=tarefa_id, status=Tarefa.PENDENTE).update(
+        status=Tarefa.EXECUTANDO, reservada_em=agora
+    )
+    if reservou:
+        executar(tarefa_id, agora)
+
+
+def atraso_nova_tentativa(tentativas):
+    """Espera exponencial (base * 2^(n-1)), limitada e com um pouco de variacao."""
+    base = getattr(settings, 'TAREFAS_BACKOFF_BASE', 5)
+    maximo = getattr(settings, 'TAREFAS_BACKOFF_MAXIMO', 600)
+    atraso = min(maximo, base * 2 ** (tentativas - 1))
+    return atraso + random.uniform(0, atraso * 0.1)
+
+
+def _reservar(agora):
+    """Reserva a proxima tarefa pronta; retorna o id ou None.
+
+    A reserva e um UPDATE condicionado ao status lido, entao dois workers
+    nunca executam a mesma tarefa. Tarefas ``executando`` ha mais que
+    TAREFAS_TIMEOUT (worker que caiu) voltam a ser elegiveis.
+    """
+    expirada = agora - timedelta(seconds=getattr(settings, 'TAREFAS_TIMEOUT', 300))
+    prontas = Tarefa.objects.filter(
+        Q(status=Tarefa.PENDENTE, executar_em__lte=agora)
+        | Q(status=Tarefa.EXECUTANDO, reservada_em__lt=expirada)
+    ).order_by('executar_em', 'id')
+
+    for candidata in prontas.values('id', 'status', 'reservada_em')[:10]:
+        reservou = Tarefa.objects.filter(
+            pk=candidata['id'],
+            status=candidata['status'],
+            reservada_em=candidata['reservada_em'],
+        ).update(status=Tarefa.EXECUTANDO, reservada_em=agora)
+        if reservou:
+            return candidata['id']
+    return None
+
+
+class ReservaPerdida(Exception):
+    """A tarefa foi retomada por outro worker antes de terminar aqui."""
+
+
+def executar(tarefa_id, reservada_em):
+    """Executa uma tarefa reservada por este processo em ``reservada_em``.
+
+    A funcao e a marcacao de concluida rodam na mesma transacao: se a
+    tarefa falhar, nada do que ela gravou no banco permanece. As gravacoes
+    na tarefa exigem que a reserva ainda seja esta; se ela expirou
+    (TAREFAS_TIMEOUT) e outro worker a retomou, o trabalho daqui e desfeito
+    e a tarefa fica com o outro worker.
+    """
+    tarefa = Tarefa.objects.get(pk=tarefa_id)
+    funcao = _registradas.get(tarefa.nome)
+    tarefa.tentativas += 1
+    minha = Tarefa.objects.filter(pk=tarefa_id, status=Tarefa.EXECUTANDO, reservada_em=reservada_em)
+    try:
+        if funcao is None:
+            raise LookupError(f'Tarefa desconhecida: {tarefa.nome}')
+        with transaction.atomic():
+            funcao(**json.loads(tarefa.argumentos))
+            if not minha.update(status=Tarefa.CONCLUIDA, tentativas=tarefa.tentativas, ultimo_erro=''):
+                raise ReservaPerdida(tarefa_id)
+        return True
+    except ReservaPerdida:
+        logger.warning('Tarefa %s foi retomada por outro worker; resultado descartado.', tarefa)
+        return False
+    except Exception:
+        tarefa.ultimo_erro = traceback.format_exc()
+        if tarefa.tentativas >= tarefa.max_tentativas:
+            tarefa.status = Tarefa.FALHOU
+        else:
+            tarefa.status = Tarefa.PENDENTE
+            tarefa.executar_em = timezone.now() + timedelta(
+                seconds=atraso_nova_tentativa(tarefa.tentativas)
+            )
+        atualizou = minha.update(
+            status=tarefa.status,
+            tentativas=tarefa.tentativas,
+            ultimo_erro=tarefa.ultimo_erro,
+            executar_em=tarefa.executar_em,
+            reservada_em=None,
+        )
+        if not atualizou:
+            logger.warning('Tarefa %s falhou depois de retomada por outro worker.', tarefa)
+        elif tarefa.status == Tarefa.FALHOU:
+            logger.error('Tarefa %s falhou apos %s tentativas.', tarefa, tarefa.tentativas)
+        else:
+            logger.warning('Tarefa %s falhou; nova tentativa em %s.', tarefa, tarefa.executar_em)
+        return False
+
+
+def processar_pendentes(limite=None):
+    """Executa as tarefas prontas ate esvaziar a fila (ou ate ``limite``).
+
+    Retorna quantas tarefas foram executadas, com ou sem sucesso.
+    """
+    executadas = 0
+    while limite is None or executadas < limite:
+        agora = timezone.now()
+        tarefa_id = _reservar(agora)
+        if tarefa_id is None:
+            break
+        executar(tarefa_id, agora)
+        executadas += 1
+    return executadas
+
+
+def limpar_concluidas(dias):
+    """Apaga tarefas concluidas ha mais de ``dias``; retorna quantas."""
+    limite = timezone.now() - timedelta(days=dias)
+    apagadas, _ = Tarefa.objects.filter(status=Tarefa.CONCLUIDA, executar_em__lt=limite).delete()
+    return apagadas
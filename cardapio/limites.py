@@ -0,0 +1,141 @@
+"""Controle de admissao: balde de fichas por cliente e checkouts simultaneos por processo."""
+
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+
+from .metricas import registro
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+# O balde e lido e regravado no cache; a trava torna isso atomico no processo
+# (o cache 'limites' e local, um por processo).
+_trava = threading.Lock()
+_em_andamento = {}
+
+
+def identificar_cliente(request):
+    """Chave do cliente: a sessao, quando existe de fato no armazenamento; senao o IP.
+
+    O cookie sozinho nao serve: um sessionid inventado a cada POST daria um
+    balde novo por requisicao. Com sessoes em cookie assinado a chave muda a
+    cada alteracao do carrinho, entao vale sempre o IP.
+    """
+    ip = f'ip:{request.META.get("REMOTE_ADDR", "")}'
+    sessao = getattr(request, 'session', None)
+    if sessao is None or not sessao.session_key or settings.SESSION_ENGINE.endswith('signed_cookies'):
+        return ip
+    # Carrega a sessao (a view le a mesma em seguida); se a chave nao existe
+    # no armazenamento, o backend zera session_key.
+    sessao.keys()
+    if sessao.session_key:
+        return f's:{sessao.session_key}'
+    return ip
+
+
+def consumir_ficha(grupo, cliente, capacidade, por_segundo):
+    """Retira uma ficha do balde do cliente.
+
+    Devolve 0 se havia ficha, ou os segundos ate a proxima. O balde comeca
+    cheio e recebe ``por_segundo`` fichas por segundo, ate ``capacidade``.
+    """
+    chave = f'limite:{grupo}:{cliente}'
+    cache = caches['limites']
+    agora = time.time()
+    with _trava:
+        fichas, instante = cache.get(chave, (capacidade, agora))
+        fichas = min(capacidade, fichas + (agora - instante) * por_segundo)
+        if fichas < 1:
+            return max(1, math.ceil((1 - fichas) / por_segundo))
+        # Expira quando o balde estaria cheio de novo.
+        cache.set(chave, (fichas - 1, agora), timeout=math.ceil(capacidade / por_segundo) + 1)
+    return 0
+
+
+def _admitir(grupo, maximo):
+    with _trava:
+        if _em_andamento.get(grupo, 0) >= maximo:
+            return False
+        _em_andamento[grupo] = _em_andamento.get(grupo, 0) + 1
+        return True
+
+
+def _liberar(grupo):
+    with _trava:
+        _em_andamento[grupo] -= 1
+
+
+def _recusar(request, evento, segundos):
+    """Resposta 429 curta, sem consultar o banco, com Retry-After."""
+    rota = getattr(request, 'resolver_match', None)
+    registro.contar_evento(evento, (rota.url_name if rota else None) or 'sem_rota')
+    mensagem = f'Muitos pedidos no momento. Tente novamente em {segundos} segundo(s).'
+    if (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+    ):
+        response = JsonResponse({'success': False, 'erro': mensagem, 'tentar_em': segundos}, status=429)
+    else:
+        response = HttpResponse(
+            render_to_string('cliente/limite.html', {'mensagem': mensagem, 'segundos': segundos}),
+            status=429,
+        )
+    response['Retry-After'] = str(segundos)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def limitar_taxa(grupo):
+    """Aplica o balde ``LIMITES_TAXA[grupo]`` as requisicoes que alteram dados.
+
+    Views do mesmo grupo dividem o balde (ex.: adicionar pelo formulario e
+    pela API). Grupo ausente do settings fica sem limite.
+    """
+
+    def decorador(view):
+        @wraps(view)
+        def embrulho(request, *args, **kwargs):
+            config = settings.LIMITES_TAXA.get(grupo) if settings.LIMITES_ATIVOS else None
+            if config and request.method not in METODOS_SEGUROS:
+                espera = consumir_ficha(
+                    grupo, identificar_cliente(request), config['capacidade'], config['por_segundo']
+                )
+                if espera:
+                    return _recusar(request, 'limite_taxa', espera)
+            return view(request, *args, **kwargs)
+
+        return embrulho
+
+    return decorador
+
+
+def limitar_concorrencia(grupo):
+    """Limita a ``LIMITES_CONCORRENCIA[grupo]['maximo']`` execucoes simultaneas.
+
+    Quem passa do limite recebe na hora um 429 com ``tentar_em`` segundos,
+    em vez de esperar na fila do servidor (e do escritor do SQLite) ate o
+    timeout. A contagem e por processo.
+    """
+
+    def decorador(view):
+        @wraps(view)
+        def embrulho(request, *args, **kwargs):
+            config = settings.LIMITES_CONCORRENCIA.get(grupo) if settings.LIMITES_ATIVOS else None
+            if not config or request.method in METODOS_SEGUROS:
+                return view(request, *args, **kwargs)
+            if not _admitir(grupo, config['maximo']):
+                return _recusar(request, 'limite_concorrencia', config['tentar_em'])
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _liberar(grupo)
+
+        return embrulho
+
+    return decorador
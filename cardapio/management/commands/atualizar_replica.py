@@ -0,0 +1,44 @@
+"""Mantem a replica SQLite de leitura em dia com a API de backup online."""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from cardapio.replica import atualizar_replica, replica_configurada
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia o banco principal para a replica de leitura (NETBURGUER_REPLICA_SQLITE) '
+        'a cada --intervalo segundos; use --uma-vez para uma unica copia.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=float, default=settings.REPLICA_INTERVALO,
+            help='Espera entre copias (s); mantenha abaixo de REPLICA_JANELA_PRIMARIO.',
+        )
+        parser.add_argument('--uma-vez', action='store_true', help='Faz uma copia e sai.')
+
+    def handle(self, *args, **options):
+        if not replica_configurada():
+            raise CommandError('Nenhuma replica configurada (defina NETBURGUER_REPLICA_SQLITE).')
+
+        try:
+            duracao = atualizar_replica()
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        self.stdout.write(self.style.SUCCESS(f'Replica atualizada em {duracao * 1000:.0f} ms.'))
+        if options['uma_vez']:
+            return
+
+        self.stdout.write('Atualizando a replica continuamente. Ctrl+C para encerrar.')
+        try:
+            while True:
+                time.sleep(options['intervalo'])
+                atualizar_replica()
+                close_old_connections()
+        except KeyboardInterrupt:
+            self.stdout.write('Atualizacao da replica encerrada.')
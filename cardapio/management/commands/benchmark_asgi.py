@@ -0,0 +1,191 @@
+"""Compara as views sincronas e assincronas do cliente sob o mesmo servidor ASGI."""
+
+import asyncio
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from importlib import import_module
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from cardapio.benchmark import banco_temporario, percentil, semear
+from cardapio.views import Carrinho
+
+FILA_CONEXOES = 1024
+
+# Variante -> URLconf servida pelo mesmo uvicorn.
+VARIANTES = {
+    'sincrono': 'netburger.urls',
+    'assincrono': 'netburger.urls_asgi',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Sobe o projeto no uvicorn com as views sincronas (netburger/urls.py) e depois '
+        'com as assincronas (netburger/urls_asgi.py) e mede cardapio, carrinho e '
+        'contagem do carrinho com clientes rapidos enquanto clientes lentos mantem '
+        'conexoes abertas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=30)
+        parser.add_argument('--conexoes', type=int, default=50, help='Clientes rapidos simultaneos.')
+        parser.add_argument('--requisicoes', type=int, default=6, help='Requisicoes por cliente rapido.')
+        parser.add_argument('--lentos', type=int, default=8, help='Clientes que enviam a requisicao devagar.')
+        parser.add_argument('--lentidao', type=float, default=2.0,
+                            help='Segundos que cada cliente lento leva para enviar a requisicao.')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--variantes', default=','.join(VARIANTES))
+
+    def handle(self, *args, **options):
+        if find_spec('uvicorn') is None:
+            raise CommandError('uvicorn nao instalado (pip install -r requirements-dev.txt).')
+        variantes = [variante.strip() for variante in options['variantes'].split(',')]
+        desconhecidas = set(variantes) - set(VARIANTES)
+        if desconhecidas:
+            raise CommandError(f"Variantes invalidas: {', '.join(sorted(desconhecidas))}.")
+
+        resultados = {}
+        with banco_temporario():
+            cache.clear()
+            produtos = semear(options['produtos'], 0)
+            self.sessoes = self._criar_sessoes(produtos, options['conexoes'])
+
+            for variante in variantes:
+                configuracao = override_settings(ALLOWED_HOSTS=['127.0.0.1'], ROOT_URLCONF=VARIANTES[variante])
+                with configuracao, self._servidor_asgi() as porta:
+                    resultados[variante] = asyncio.run(self._carga(porta, options))
+
+        self._imprimir(resultados)
+
+    def _criar_sessoes(self, produtos, quantidade):
+        """Sessoes com carrinho ja gravadas, para o carrinho ler a sessao de verdade."""
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+        chaves = []
+        for i in range(quantidade):
+            sessao = SessionStore()
+            sessao[Carrinho.CHAVE_SESSAO] = {
+                'i': {str(produtos[(i + n) % len(produtos)].id): 1 for n in range(3)},
+            }
+            sessao.save()
+            chaves.append(sessao.session_key)
+        return chaves
+
+    # ---------------------------
+    # Servidores
+    # ---------------------------
+
+    @contextmanager
+    def _servidor_asgi(self):
+        """uvicorn em uma thread, servindo o ROOT_URLCONF em vigor."""
+        import uvicorn
+
+        soquete = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        soquete.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        soquete.bind(('127.0.0.1', 0))
+        soquete.listen(FILA_CONEXOES)
+        servidor = uvicorn.Server(
+            uvicorn.Config(ASGIHandler(), lifespan='off', log_level='warning', access_log=False)
+        )
+        thread = threading.Thread(target=servidor.run, kwargs={'sockets': [soquete]}, daemon=True)
+        thread.start()
+        while not servidor.started and thread.is_alive():
+            time.sleep(0.01)
+        try:
+            yield soquete.getsockname()[1]
+        finally:
+            servidor.should_exit = True
+            thread.join()
+            soquete.close()
+
+    # ---------------------------
+    # Carga
+    # ---------------------------
+
+    async def _requisicao(self, porta, caminho, sessao=None, lentidao=0.0):
+        """GET HTTP/1.1 cru; com ``lentidao`` os bytes sao enviados aos poucos."""
+        leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+        try:
+            cabecalhos = f'GET {caminho} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n'
+            if sessao:
+                cabecalhos += f'Cookie: {settings.SESSION_COOKIE_NAME}={sessao}\r\n'
+            dados = (cabecalhos + '\r\n').encode()
+            if lentidao:
+                pedacos = 20
+                tamanho = -(-len(dados) // pedacos)
+                for inicio in range(0, len(dados), tamanho):
+                    escritor.write(dados[inicio:inicio + tamanho])
+                    await escritor.drain()
+                    await asyncio.sleep(lentidao / pedacos)
+            else:
+                escritor.write(dados)
+                await escritor.drain()
+            resposta = await leitor.read()
+        finally:
+            escritor.close()
+        return int(resposta.split(b' ', 2)[1]) if resposta else 0
+
+    async def _carga(self, porta, options):
+        caminhos = [reverse('menu_cardapio'), reverse('carrinho_detalhe'), reverse('api_carrinho_contagem')]
+        tempos = []
+        falhas = 0
+
+        async def lento(indice):
+            try:
+                await asyncio.wait_for(
+                    self._requisicao(porta, caminhos[indice % len(caminhos)], lentidao=options['lentidao']),
+                    options['timeout'],
+                )
+            except (OSError, asyncio.TimeoutError):
+                pass
+
+        async def rapido(indice):
+            nonlocal falhas
+            sessao = self.sessoes[indice]
+            for n in range(options['requisicoes']):
+                inicio = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(
+                        self._requisicao(porta, caminhos[(indice + n) % len(caminhos)], sessao),
+                        options['timeout'],
+                    )
+                except (OSError, asyncio.TimeoutError):
+                    status = 0
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                if not 200 <= status < 400:
+                    falhas += 1
+
+        lentos = [asyncio.create_task(lento(i)) for i in range(options['lentos'])]
+        # Deixa os clientes lentos ocuparem suas conexoes antes da carga rapida.
+        await asyncio.sleep(0.2)
+        inicio = time.perf_counter()
+        await asyncio.gather(*(rapido(i) for i in range(options['conexoes'])))
+        duracao = time.perf_counter() - inicio
+        await asyncio.gather(*lentos)
+
+        return {
+            'requisicoes': len(tempos),
+            'falhas': falhas,
+            'vazao_req_s': round(len(tempos) / duracao, 1),
+            'p50_ms': round(percentil(tempos, 50), 2),
+            'p95_ms': round(percentil(tempos, 95), 2),
+            'p99_ms': round(percentil(tempos, 99), 2),
+        }
+
+    def _imprimir(self, resultados):
+        self.stdout.write(
+            f"{'views':<11} {'n':>6} {'falhas':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for variante, dados in resultados.items():
+            self.stdout.write(
+                f"{variante:<11} {dados['requisicoes']:>6} {dados['falhas']:>6} {dados['vazao_req_s']:>8.1f} "
+                f"{dados['p50_ms']:>9.2f} {dados['p95_ms']:>9.2f} {dados['p99_ms']:>9.2f}"
+            )
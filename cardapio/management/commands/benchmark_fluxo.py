@@ -0,0 +1,205 @@
+"""Benchmark do fluxo de pedidos do cliente e das telas de historico/relatorio."""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from cardapio.benchmark import (
+    PADRAO_TOKEN_CHECKOUT,
+    ClienteDjango,
+    ClienteHttp,
+    banco_temporario,
+    percentil,
+    semear,
+)
+from cardapio.metricas import registro
+
+
+class _ServidorWSGI(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _Silencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Semeia produtos e pedidos em um banco temporario e executa o fluxo '
+        'cardapio -> carrinho -> checkout, alem do historico e do relatorio. '
+        'Mostra vazao, p50/p95/p99 e consultas por requisicao.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=30)
+        parser.add_argument('--pedidos', type=int, default=5000, help='Pedidos historicos semeados.')
+        parser.add_argument('--clientes', type=int, default=40, help='Fluxos completos de cliente.')
+        parser.add_argument('--itens', type=int, default=3, help='Adicoes ao carrinho por fluxo.')
+        parser.add_argument('--admin', type=int, default=10, help='Visitas ao historico e relatorio.')
+        parser.add_argument('--concorrencia', type=int, default=1, help='Threads simultaneas.')
+        parser.add_argument(
+            '--servidor', action='store_true',
+            help='Usa um servidor WSGI local (HTTP real) em vez do test client.',
+        )
+        parser.add_argument('--salvar', metavar='ARQUIVO', help='Grava o resultado como baseline JSON.')
+        parser.add_argument('--comparar', metavar='ARQUIVO', help='Compara com um baseline JSON.')
+        parser.add_argument(
+            '--limite', type=float, default=0.25,
+            help='Regressao tolerada no p95 (fracao, padrao 0.25 = 25%%).',
+        )
+
+    def handle(self, *args, **options):
+        with banco_temporario():
+            cache.clear()
+            registro.limpar()
+            self.produtos = semear(options['produtos'], options['pedidos'])
+            User.objects.create_user('benchmark', password='benchmark')
+            registro.limpar()
+
+            if options['servidor']:
+                resultado = self._com_servidor(options)
+            else:
+                resultado = self._executar(ClienteDjango, options)
+
+        self._imprimir(resultado)
+
+        if options['salvar']:
+            with open(options['salvar'], 'w', encoding='utf-8') as arquivo:
+                json.dump(resultado, arquivo, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline gravado em {options['salvar']}")
+
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                regressoes = self._comparar(json.load(arquivo), resultado, options['limite'])
+            if regressoes:
+                raise CommandError('Regressoes encontradas:\n  ' + '\n  '.join(regressoes))
+            self.stdout.write(self.style.SUCCESS('Sem regressoes em relacao ao baseline.'))
+
+    def _com_servidor(self, options):
+        with override_settings(ALLOWED_HOSTS=['127.0.0.1', 'localhost']):
+            servidor = make_server(
+                '127.0.0.1', 0, WSGIHandler(), server_class=_ServidorWSGI, handler_class=_Silencioso
+            )
+            thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+            thread.start()
+            url_base = f'http://127.0.0.1:{servidor.server_port}'
+            try:
+                return self._executar(lambda: ClienteHttp(url_base), options)
+            finally:
+                servidor.shutdown()
+                servidor.server_close()
+
+    def _executar(self, fabrica_cliente, options):
+        tempos = defaultdict(list)
+        falhas = defaultdict(int)
+        trava = threading.Lock()
+
+        def medir(etapa, chamada, *args, **kwargs):
+            inicio = time.perf_counter()
+            status, corpo = chamada(*args, **kwargs)
+            duracao = (time.perf_counter() - inicio) * 1000
+            with trava:
+                tempos[etapa].append(duracao)
+                if status >= 400:
+                    falhas[etapa] += 1
+            return corpo
+
+        def fluxo_cliente(indice):
+            cliente = fabrica_cliente()
+            medir('menu', cliente.get, reverse('menu_cardapio'))
+            for n in range(options['itens']):
+                produto = self.produtos[(indice + n) % len(self.produtos)]
+                medir('adicionar', cliente.post, reverse('adicionar_ao_carrinho', args=[produto.id]),
+                      {'quantidade': 1})
+            medir('carrinho', cliente.get, reverse('carrinho_detalhe'))
+            corpo = medir('checkout_form', cliente.get, reverse('finalizar_pedido'))
+            token = PADRAO_TOKEN_CHECKOUT.search(corpo)
+            medir('checkout', cliente.post, reverse('finalizar_pedido'), {
+                'nome': 'Cliente Benchmark',
+                'endereco': 'Rua do Teste, 100',
+                'token_checkout': token.group(1) if token else '',
+            })
+
+        def fluxo_admin(_):
+            cliente = fabrica_cliente()
+            if isinstance(cliente, ClienteHttp):
+                cliente.login('benchmark', 'benchmark')
+            else:
+                cliente.login(User.objects.get(username='benchmark'))
+            medir('historico', cliente.get, reverse('historico_pedidos'))
+            medir('relatorio', cliente.get, reverse('relatorio_vendas'))
+
+        tarefas = [(fluxo_cliente, i) for i in range(options['clientes'])]
+        tarefas += [(fluxo_admin, i) for i in range(options['admin'])]
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concorrencia']) as executor:
+            for futuro in [executor.submit(funcao, arg) for funcao, arg in tarefas]:
+                futuro.result()
+        duracao = time.perf_counter() - inicio
+
+        total = sum(len(valores) for valores in tempos.values())
+        return {
+            'parametros': {
+                chave: options[chave]
+                for chave in ('produtos', 'pedidos', 'clientes', 'itens', 'admin', 'concorrencia', 'servidor')
+            },
+            'vazao_req_s': round(total / duracao, 1),
+            'etapas': {
+                etapa: {
+                    'requisicoes': len(valores),
+                    'falhas': falhas[etapa],
+                    'p50_ms': round(percentil(valores, 50), 2),
+                    'p95_ms': round(percentil(valores, 95), 2),
+                    'p99_ms': round(percentil(valores, 99), 2),
+                }
+                for etapa, valores in sorted(tempos.items())
+            },
+            'views': {
+                view: {'consultas_por_req': round(dados['consultas'] / dados['requisicoes'], 2)}
+                for view, dados in sorted(registro.resumo().items())
+                if dados['requisicoes']
+            },
+        }
+
+    def _imprimir(self, resultado):
+        self.stdout.write(f"Vazao: {resultado['vazao_req_s']} req/s")
+        self.stdout.write(f"{'etapa':<14} {'n':>6} {'falhas':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for etapa, dados in resultado['etapas'].items():
+            self.stdout.write(
+                f"{etapa:<14} {dados['requisicoes']:>6} {dados['falhas']:>6} "
+                f"{dados['p50_ms']:>9.2f} {dados['p95_ms']:>9.2f} {dados['p99_ms']:>9.2f}"
+            )
+        self.stdout.write(f"{'view':<24} {'consultas/req':>14}")
+        for view, dados in resultado['views'].items():
+            self.stdout.write(f"{view:<24} {dados['consultas_por_req']:>14.2f}")
+
+    def _comparar(self, baseline, atual, limite):
+        regressoes = []
+        for etapa, dados in atual['etapas'].items():
+            anterior = baseline.get('etapas', {}).get(etapa)
+            if anterior and dados['p95_ms'] > anterior['p95_ms'] * (1 + limite):
+                regressoes.append(
+                    f"{etapa}: p95 {dados['p95_ms']:.2f} ms > {anterior['p95_ms']:.2f} ms (+{limite:.0%})"
+                )
+            if dados['falhas'] > (anterior or {}).get('falhas', 0):
+                regressoes.append(f"{etapa}: {dados['falhas']} falha(s)")
+        for view, dados in atual['views'].items():
+            anterior = baseline.get('views', {}).get(view)
+            if anterior and dados['consultas_por_req'] > anterior['consultas_por_req'] + 0.01:
+                regressoes.append(
+                    f"{view}: {dados['consultas_por_req']} consultas/req > {anterior['consultas_por_req']}"
+                )
+        return regressoes
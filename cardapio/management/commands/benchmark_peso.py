@@ -0,0 +1,214 @@
+"""Peso das paginas do cliente: HTML, CSS/JS e quanto cada visita realmente baixa."""
+
+import json
+import tempfile
+import urllib.error
+import urllib.request
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.cache import get_max_age
+
+from cardapio.benchmark import banco_temporario, semear
+
+PAGINAS = (
+    ('cardapio', 'menu_cardapio'),
+    ('carrinho', 'carrinho_detalhe'),
+    ('checkout', 'finalizar_pedido'),
+    ('login', 'admin_login'),
+)
+ACEITA = 'br, gzip'
+# Recurso com max-age menor que isto volta a ser pedido (ou revalidado) a cada visita.
+CACHE_MINIMO = 60 * 60 * 24
+TIMEOUT_EXTERNO = 5
+
+
+class _Recursos(HTMLParser):
+    """Coleta folhas de estilo e scripts externos de uma pagina."""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and 'stylesheet' in (attrs.get('rel') or '').split() and attrs.get('href'):
+            self.urls.append(attrs['href'])
+        elif tag == 'script' and attrs.get('src'):
+            self.urls.append(attrs['src'])
+
+
+def _corpo(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o HTML e os CSS/JS de cardapio, carrinho, checkout e login como o perfil atual '
+        'os entrega (collectstatic, compressao, Cache-Control). Com NETBURGUER_PERFIL=producao '
+        'mede os arquivos com hash e pre-comprimidos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=30)
+        parser.add_argument('--salvar', metavar='ARQUIVO', help='Grava o resultado como baseline JSON.')
+        parser.add_argument('--comparar', metavar='ARQUIVO', help='Compara com um baseline JSON.')
+        parser.add_argument(
+            '--limite', type=float, default=0.10,
+            help='Aumento tolerado nos bytes da primeira visita (fracao, padrao 0.10 = 10%%).',
+        )
+
+    def handle(self, *args, **options):
+        with banco_temporario(), tempfile.TemporaryDirectory() as raiz, \
+                override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], STATIC_ROOT=raiz):
+            cache.clear()
+            produtos = semear(options['produtos'], 0)
+            call_command('collectstatic', interactive=False, verbosity=0)
+            client = Client()
+            # Carrinho com itens, para o checkout mostrar o formulario.
+            client.post(reverse('adicionar_ao_carrinho', args=[produtos[0].id]))
+            resultado = self._medir(client)
+
+        self._imprimir(resultado)
+
+        if options['salvar']:
+            with open(options['salvar'], 'w', encoding='utf-8') as arquivo:
+                json.dump(resultado, arquivo, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline gravado em {options['salvar']}.")
+
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                baseline = json.load(arquivo)
+            if not self._comparar(baseline, resultado, options['limite']):
+                raise CommandError('Peso das paginas acima do limite em relacao ao baseline.')
+
+    # ---------------------------
+    # Medicao
+    # ---------------------------
+
+    def _medir(self, client):
+        paginas, recursos = {}, {}
+        for nome, rota in PAGINAS:
+            html = _corpo(client.get(reverse(rota), HTTP_ACCEPT_ENCODING=ACEITA))
+            coletor = _Recursos()
+            coletor.feed(html.decode('utf-8', 'replace'))
+            for url in coletor.urls:
+                if url not in recursos:
+                    recursos[url] = self._medir_recurso(client, url)
+
+            medidos = [recursos[url] for url in coletor.urls]
+            paginas[nome] = {
+                'html_bytes': len(html),
+                'recursos': coletor.urls,
+                'externos': sum(1 for recurso in medidos if recurso['externo']),
+                'nao_medidos': sum(1 for recurso in medidos if recurso['transferido'] is None),
+                'primeira_visita_bytes': len(html) + sum(r['transferido'] or 0 for r in medidos),
+                'primeira_visita_requisicoes': 1 + len(medidos),
+                'visita_repetida_requisicoes': 1 + sum(1 for r in medidos if r['max_age'] < CACHE_MINIMO),
+            }
+        return {'paginas': paginas, 'recursos': recursos}
+
+    def _medir_recurso(self, client, url):
+        if url.startswith(('http://', 'https://', '//')):
+            return self._medir_externo(url)
+
+        comprimido = client.get(url, HTTP_ACCEPT_ENCODING=ACEITA)
+        if comprimido.status_code != 200:
+            # Perfil sem rota de estaticos: o servidor de desenvolvimento entrega o
+            # arquivo original, sem compressao nem Cache-Control.
+            caminho = finders.find(url[len(settings.STATIC_URL):]) if url.startswith(settings.STATIC_URL) else None
+            tamanho = None
+            if caminho:
+                with open(caminho, 'rb') as arquivo:
+                    tamanho = len(arquivo.read())
+            return {'externo': False, 'bytes': tamanho, 'transferido': tamanho,
+                    'codificacao': '', 'cache_control': '', 'max_age': 0}
+
+        original = client.get(url)
+        return {
+            'externo': False,
+            'bytes': len(_corpo(original)),
+            'transferido': len(_corpo(comprimido)),
+            'codificacao': comprimido.headers.get('Content-Encoding', ''),
+            'cache_control': comprimido.headers.get('Cache-Control', ''),
+            'max_age': get_max_age(comprimido) or 0,
+        }
+
+    def _medir_externo(self, url):
+        """Baixa o recurso de terceiros (CDN); sem rede fica como nao medido."""
+        requisicao = urllib.request.Request(
+            'https:' + url if url.startswith('//') else url,
+            headers={'Accept-Encoding': ACEITA, 'User-Agent': 'Mozilla/5.0 (benchmark_peso)'},
+        )
+        medida = {'externo': True, 'bytes': None, 'transferido': None,
+                  'codificacao': '', 'cache_control': '', 'max_age': 0}
+        try:
+            with urllib.request.urlopen(requisicao, timeout=TIMEOUT_EXTERNO) as resposta:
+                corpo = resposta.read()
+                medida.update(
+                    transferido=len(corpo),
+                    codificacao=resposta.headers.get('Content-Encoding', ''),
+                    cache_control=resposta.headers.get('Cache-Control', ''),
+                )
+        except (urllib.error.URLError, OSError) as erro:
+            self.stderr.write(f'{url}: nao foi possivel baixar ({erro}); fica como nao medido.')
+        return medida
+
+    # ---------------------------
+    # Relatorio
+    # ---------------------------
+
+    def _imprimir(self, resultado):
+        self.stdout.write(
+            f"{'pagina':<10} {'HTML KB':>8} {'1a visita KB':>13} {'req.':>5} {'req. repetida':>14} {'externos':>9}"
+        )
+        for nome, pagina in resultado['paginas'].items():
+            aviso = f" ({pagina['nao_medidos']} nao medido(s))" if pagina['nao_medidos'] else ''
+            self.stdout.write(
+                f"{nome:<10} {pagina['html_bytes'] / 1024:>8.1f} {pagina['primeira_visita_bytes'] / 1024:>13.1f} "
+                f"{pagina['primeira_visita_requisicoes']:>5} {pagina['visita_repetida_requisicoes']:>14} "
+                f"{pagina['externos']:>9}{aviso}"
+            )
+
+        self.stdout.write('')
+        self.stdout.write(f"{'recurso':<48} {'KB':>7} {'enviado KB':>11} {'cod.':>5}  Cache-Control")
+        for url, recurso in resultado['recursos'].items():
+            bytes_kb = '?' if recurso['bytes'] is None else f"{recurso['bytes'] / 1024:.1f}"
+            enviado_kb = '?' if recurso['transferido'] is None else f"{recurso['transferido'] / 1024:.1f}"
+            self.stdout.write(
+                f"{url[:48]:<48} {bytes_kb:>7} {enviado_kb:>11} {recurso['codificacao'] or '-':>5}  "
+                f"{recurso['cache_control'] or '-'}"
+            )
+
+    def _comparar(self, baseline, resultado, limite):
+        ok = True
+        self.stdout.write('')
+        self.stdout.write('Comparacao com o baseline (1a visita / requisicoes na visita repetida):')
+        for nome, pagina in resultado['paginas'].items():
+            anterior = baseline['paginas'].get(nome)
+            if anterior is None:
+                continue
+            antes, depois = anterior['primeira_visita_bytes'], pagina['primeira_visita_bytes']
+            variacao = (depois - antes) / antes if antes else 0.0
+            if anterior['nao_medidos'] or pagina['nao_medidos']:
+                # Bytes de terceiros desconhecidos: o total nao e comparavel.
+                nota = ' (ha recurso externo nao medido; bytes nao comparaveis)'
+            elif variacao > limite:
+                ok = False
+                nota = ' REGRESSAO'
+            else:
+                nota = ''
+            self.stdout.write(
+                f"  {nome:<10} {antes / 1024:>7.1f} KB -> {depois / 1024:>7.1f} KB ({variacao:+.0%}), "
+                f"{anterior['visita_repetida_requisicoes']} -> {pagina['visita_repetida_requisicoes']} req.{nota}"
+            )
+        return ok
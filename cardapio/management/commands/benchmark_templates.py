@@ -0,0 +1,155 @@
+"""Tempo de renderizacao por template: sem cache, loader com cache e fragmentos em cache."""
+
+import copy
+import json
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates, Template
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from cardapio.benchmark import banco_temporario, percentil, semear
+
+# (nome, rota, parametros, precisa de login)
+PAGINAS = (
+    ('cardapio', 'menu_cardapio', {}, False),
+    ('busca', 'menu_busca', {'q': 'produto'}, False),
+    ('carrinho', 'carrinho_detalhe', {}, False),
+    ('checkout', 'finalizar_pedido', {}, False),
+    ('login', 'admin_login', {}, False),
+    ('painel', 'admin_painel', {}, True),
+    ('produtos', 'produto_listar', {}, True),
+    ('historico', 'historico_pedidos', {}, True),
+    ('relatorio', 'relatorio_vendas', {}, True),
+)
+
+
+def _templates(cacheado):
+    """TEMPLATES com ou sem o loader em cache (o resto igual ao settings)."""
+    templates = copy.deepcopy(settings.TEMPLATES)
+    carregadores = settings.CARREGADORES_TEMPLATES
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = (
+        [('django.template.loaders.cached.Loader', carregadores)] if cacheado else carregadores
+    )
+    return templates
+
+
+def _caches(fragmentos):
+    caches = copy.deepcopy(settings.CACHES)
+    if not fragmentos:
+        caches['fragmentos'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    return caches
+
+
+MODOS = (
+    ('sem cache', lambda: override_settings(TEMPLATES=_templates(False), CACHES=_caches(False))),
+    ('loader', lambda: override_settings(TEMPLATES=_templates(True), CACHES=_caches(False))),
+    ('loader+fragm.', lambda: override_settings(TEMPLATES=_templates(True), CACHES=_caches(True))),
+)
+
+
+class _Cronometro:
+    """Soma, por template de pagina, o tempo de carregar (ler/compilar) e renderizar."""
+
+    def __init__(self):
+        self.tempos = defaultdict(float)
+        self._get_template = DjangoTemplates.get_template
+        self._render = Template.render
+
+    def __enter__(self):
+        cronometro = self
+
+        def get_template(engine, nome):
+            inicio = time.perf_counter()
+            try:
+                return cronometro._get_template(engine, nome)
+            finally:
+                cronometro.tempos[nome] += time.perf_counter() - inicio
+
+        def render(template, context=None, request=None):
+            inicio = time.perf_counter()
+            try:
+                return cronometro._render(template, context, request)
+            finally:
+                cronometro.tempos[template.template.name] += time.perf_counter() - inicio
+
+        DjangoTemplates.get_template = get_template
+        Template.render = render
+        return self
+
+    def __exit__(self, *exc):
+        DjangoTemplates.get_template = self._get_template
+        Template.render = self._render
+
+    def zerar(self):
+        self.tempos.clear()
+
+
+class Command(BaseCommand):
+    help = (
+        'Renderiza as paginas do cliente e do painel e mede o tempo gasto em cada template '
+        '(carregar + renderizar) sem cache de templates, com o loader em cache do perfil de '
+        'producao e com o loader mais o cache de fragmentos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=30)
+        parser.add_argument('--pedidos', type=int, default=500)
+        parser.add_argument('--repeticoes', type=int, default=100, help='Requisicoes por pagina e modo.')
+        parser.add_argument('--salvar', metavar='ARQUIVO', help='Grava o resultado em JSON.')
+
+    def handle(self, *args, **options):
+        resultado = {}
+        with banco_temporario():
+            produtos = semear(options['produtos'], options['pedidos'])
+            User.objects.create_user('benchmark', password='benchmark')
+            for modo, configuracao in MODOS:
+                cache.clear()
+                with configuracao(), _Cronometro() as cronometro:
+                    resultado[modo] = self._medir(cronometro, produtos, options['repeticoes'])
+
+        self._imprimir(resultado)
+        if options['salvar']:
+            with open(options['salvar'], 'w', encoding='utf-8') as arquivo:
+                json.dump(resultado, arquivo, indent=2, sort_keys=True)
+
+    def _medir(self, cronometro, produtos, repeticoes):
+        anonimo = Client()
+        for produto in produtos[:3]:
+            anonimo.post(reverse('adicionar_ao_carrinho', args=[produto.id]))
+        admin = Client()
+        admin.force_login(User.objects.get(username='benchmark'))
+
+        amostras = defaultdict(list)
+        for nome, rota, parametros, logado in PAGINAS:
+            cliente = admin if logado else anonimo
+            cliente.get(reverse(rota), parametros)  # aquecimento
+            for _ in range(repeticoes):
+                cronometro.zerar()
+                cliente.get(reverse(rota), parametros)
+                for template, segundos in cronometro.tempos.items():
+                    amostras[template].append(segundos * 1000)
+
+        return {
+            template: {'media_ms': sum(tempos) / len(tempos), 'p95_ms': percentil(tempos, 95), 'n': len(tempos)}
+            for template, tempos in amostras.items()
+        }
+
+    def _imprimir(self, resultado):
+        modos = [modo for modo, _ in MODOS]
+        base = resultado[modos[0]]
+        self.stdout.write(
+            f"{'template (media ms)':<34}" + ''.join(f'{modo:>15}' for modo in modos) + f"{'ganho':>9}"
+        )
+        for template in sorted(base, key=lambda nome: -base[nome]['media_ms']):
+            medias = [resultado[modo].get(template, {}).get('media_ms') for modo in modos]
+            colunas = ''.join('{:>15}'.format('-' if media is None else f'{media:.3f}') for media in medias)
+            ganho = f'{base[template]["media_ms"] / medias[-1]:.1f}x' if medias[-1] else '-'
+            self.stdout.write(f'{template[:34]:<34}{colunas}{ganho:>9}')
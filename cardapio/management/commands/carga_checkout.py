@@ -0,0 +1,89 @@
+"""Dispara checkouts paralelos em um SQLite temporario e conta erros de lock."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from cardapio.benchmark import banco_temporario
+from cardapio.models import Pedido, Produto
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa checkouts concorrentes contra um arquivo SQLite temporario, '
+        'com os PRAGMAs do perfil atual (NETBURGUER_PERFIL), e reporta falhas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--pedidos', type=int, default=10, help='Checkouts por thread.')
+        parser.add_argument(
+            '--limites', action='store_true',
+            help='Mantem os limites de requisicao (LIMITES_*) e conta os 429 como recusados.',
+        )
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Este teste de carga so se aplica ao SQLite.')
+
+        with banco_temporario(limites=options['limites']):
+            produtos = [
+                Produto.objects.create(nome=f'Produto {i}', descricao='...', preco=Decimal('10.00'))
+                for i in range(3)
+            ]
+            connections['default'].close()
+
+            inicio = threading.Barrier(options['threads'])
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                resultados = list(
+                    executor.map(
+                        lambda _: self._cliente(inicio, produtos, options['pedidos']),
+                        range(options['threads']),
+                    )
+                )
+
+            sucesso = sum(ok for ok, _, _ in resultados)
+            erros = sum(falhas for _, falhas, _ in resultados)
+            recusados = sum(recusas for _, _, recusas in resultados)
+            gravados = Pedido.objects.count()
+            journal = self._journal_mode()
+
+        self.stdout.write(
+            f'journal_mode={journal} checkouts_ok={sucesso} '
+            f'erros={erros} pedidos_gravados={gravados} recusados={recusados}'
+        )
+
+    def _cliente(self, inicio, produtos, quantidade):
+        client = Client(raise_request_exception=False)
+        ok = falhas = recusas = 0
+        inicio.wait()
+        try:
+            for _ in range(quantidade):
+                for produto in produtos:
+                    status = client.post(reverse('adicionar_ao_carrinho', args=[produto.id])).status_code
+                    if status == 429:
+                        recusas += 1
+                    elif status != 302:
+                        falhas += 1
+                response = client.post(
+                    reverse('finalizar_pedido'), {'nome': 'Carga', 'endereco': 'Rua Teste, 1'}
+                )
+                if response.status_code == 302:
+                    ok += 1
+                elif response.status_code == 429:
+                    recusas += 1
+                else:
+                    falhas += 1
+        finally:
+            connections.close_all()
+        return ok, falhas, recusas
+
+    def _journal_mode(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            return cursor.fetchone()[0]
@@ -0,0 +1,120 @@
+"""Teste de carga comparando os backends de sessao no fluxo do carrinho."""
+
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from cardapio.benchmark import banco_temporario, percentil
+from cardapio.models import Produto
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa o fluxo cardapio -> carrinho com cada backend de sessao em um '
+        'banco de teste, com --threads clientes simultaneos, e compara '
+        'requisicoes/s, latencia e consultas por requisicao.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=50, help='Sessoes simuladas.')
+        parser.add_argument('--itens', type=int, default=5, help='Itens adicionados por sessao.')
+        parser.add_argument('--threads', type=int, default=8, help='Clientes simultaneos.')
+        parser.add_argument(
+            '--backends',
+            default=','.join(settings.SESSOES_BACKENDS),
+            help='Lista separada por virgula (db,cookie,cache,cached_db).',
+        )
+
+    def handle(self, *args, **options):
+        diretorio_cache = tempfile.mkdtemp(prefix='netburguer-sessoes-')
+        try:
+            with banco_temporario():
+                produtos = [
+                    Produto.objects.create(nome=f'Produto {i}', descricao='...', preco=Decimal('10.00'))
+                    for i in range(options['itens'])
+                ]
+                connections['default'].close()
+                caches_teste = dict(settings.CACHES)
+                caches_teste['sessoes'] = dict(caches_teste['sessoes'], LOCATION=diretorio_cache)
+
+                self.stdout.write(
+                    f"{'backend':<10} {'req/s':>10} {'consultas/req':>14} "
+                    f"{'p50 ms':>8} {'p95 ms':>8} {'erros':>6}"
+                )
+                for apelido in options['backends'].split(','):
+                    engine = settings.SESSOES_BACKENDS[apelido.strip()]
+                    with override_settings(SESSION_ENGINE=engine, CACHES=caches_teste):
+                        caches['sessoes'].clear()
+                        latencias, consultas, erros, duracao = self._executar(
+                            options['clientes'], options['threads'], produtos
+                        )
+                    requisicoes = len(latencias)
+                    self.stdout.write(
+                        f'{apelido:<10} {requisicoes / duracao:>10.1f} '
+                        f'{consultas / requisicoes:>14.2f} {percentil(latencias, 50):>8.2f} '
+                        f'{percentil(latencias, 95):>8.2f} {erros:>6}'
+                    )
+        finally:
+            shutil.rmtree(diretorio_cache, ignore_errors=True)
+
+    def _executar(self, clientes, threads, produtos):
+        """Divide as sessoes entre ``threads`` clientes que disparam ao mesmo tempo."""
+        threads = max(1, min(threads, clientes))
+        inicio_comum = threading.Barrier(threads + 1)
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futuros = [
+                executor.submit(
+                    self._cliente, inicio_comum, produtos, len(range(indice, clientes, threads))
+                )
+                for indice in range(threads)
+            ]
+            inicio_comum.wait()
+            inicio = time.perf_counter()
+            resultados = [futuro.result() for futuro in futuros]
+            duracao = time.perf_counter() - inicio
+
+        latencias = [ms for parcial, _, _ in resultados for ms in parcial]
+        consultas = sum(quantidade for _, quantidade, _ in resultados)
+        erros = sum(falhas for _, _, falhas in resultados)
+        return latencias, consultas, erros, duracao
+
+    def _cliente(self, inicio_comum, produtos, sessoes):
+        latencias, falhas = [], 0
+
+        def medir(metodo, caminho, **extras):
+            nonlocal falhas
+            inicio = time.perf_counter()
+            response = metodo(caminho, **extras)
+            latencias.append(1000 * (time.perf_counter() - inicio))
+            if response.status_code >= 400:
+                falhas += 1
+
+        inicio_comum.wait()
+        try:
+            # Cada thread tem a propria conexao; as consultas sao contadas nela.
+            with CaptureQueriesContext(connection) as consultas:
+                for _ in range(sessoes):
+                    client = Client(raise_request_exception=False)
+                    medir(client.get, reverse('menu_cardapio'))
+                    for produto in produtos:
+                        medir(
+                            client.post,
+                            reverse('adicionar_ao_carrinho', args=[produto.id]),
+                            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                        )
+                    medir(client.get, reverse('api_carrinho_contagem'))
+                    medir(client.get, reverse('carrinho_detalhe'))
+        finally:
+            connections.close_all()
+        return latencias, len(consultas), falhas
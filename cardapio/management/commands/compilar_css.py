@@ -0,0 +1,48 @@
+"""Compila o CSS do site com o Tailwind standalone (sem Node)."""
+
+import os
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ENTRADA = os.path.join('assets', 'tailwind.css')
+SAIDA = os.path.join('static', 'css', 'app.css')
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera static/css/app.css a partir de assets/tailwind.css, apenas com as classes '
+        'usadas nos templates e no JavaScript, minificado. Rode de novo ao mudar classes '
+        'nos templates (ou use --watch durante o desenvolvimento).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help='Recompila a cada alteracao.')
+        parser.add_argument(
+            '--binario', default=os.environ.get('TAILWINDCSS_BIN', 'tailwindcss'),
+            help='Executavel do Tailwind (padrao: tailwindcss do pacote tailwindcss-bin).',
+        )
+
+    def handle(self, *args, **options):
+        binario = shutil.which(options['binario'])
+        if binario is None:
+            raise CommandError(
+                f"Executavel '{options['binario']}' nao encontrado. "
+                'Instale com: pip install -r requirements-dev.txt'
+            )
+
+        base = str(settings.BASE_DIR)
+        comando = [binario, '--input', ENTRADA, '--output', SAIDA, '--minify']
+        if options['watch']:
+            comando.append('--watch')
+        try:
+            subprocess.run(comando, cwd=base, check=True)
+        except subprocess.CalledProcessError as erro:
+            raise CommandError(f'Falha ao compilar o CSS (codigo {erro.returncode}).')
+        except KeyboardInterrupt:
+            return
+
+        tamanho = os.path.getsize(os.path.join(base, SAIDA))
+        self.stdout.write(self.style.SUCCESS(f'{SAIDA} gerado ({tamanho / 1024:.1f} KB).'))
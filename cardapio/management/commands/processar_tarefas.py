@@ -0,0 +1,43 @@
+"""Worker da fila de tarefas (recibos, consolidado de vendas, aviso a cozinha, PDF mensal)."""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from cardapio.fila import limpar_concluidas, processar_pendentes
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as tarefas enfileiradas pelo checkout. Fica em execucao consultando '
+        'a fila a cada --intervalo segundos; use --uma-vez para esvaziar a fila e sair.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Espera com a fila vazia (s).')
+        parser.add_argument('--uma-vez', action='store_true', help='Processa o que estiver pronto e sai.')
+        parser.add_argument(
+            '--reter-dias', type=int, default=7,
+            help='Apaga tarefas concluidas ha mais que estes dias ao iniciar.',
+        )
+
+    def handle(self, *args, **options):
+        apagadas = limpar_concluidas(options['reter_dias'])
+        if apagadas:
+            self.stdout.write(f'{apagadas} tarefa(s) concluida(s) antiga(s) removida(s).')
+
+        if options['uma_vez']:
+            executadas = processar_pendentes()
+            self.stdout.write(self.style.SUCCESS(f'{executadas} tarefa(s) executada(s).'))
+            return
+
+        self.stdout.write('Worker iniciado. Ctrl+C para encerrar.')
+        try:
+            while True:
+                if not processar_pendentes(limite=100):
+                    time.sleep(options['intervalo'])
+                # Worker de longa duracao: respeita CONN_MAX_AGE e descarta conexoes quebradas.
+                close_old_connections()
+        except KeyboardInterrupt:
+            self.stdout.write('Worker encerrado.')
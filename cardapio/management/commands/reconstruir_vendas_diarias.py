@@ -0,0 +1,28 @@
+"""Reconstroi o consolidado diario de vendas a partir do historico de pedidos."""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cardapio.relatorios import reconstruir_vendas_diarias
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela VendaDiaria a partir dos pedidos registrados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Recalcula apenas a partir desta data (AAAA-MM-DD).',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = date.fromisoformat(options['desde'])
+            except ValueError:
+                raise CommandError('Data invalida. Use o formato AAAA-MM-DD.')
+
+        dias = reconstruir_vendas_diarias(desde)
+        self.stdout.write(self.style.SUCCESS(f'{dias} dia(s) consolidados.'))
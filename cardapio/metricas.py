@@ -0,0 +1,136 @@
+"""Registro em memoria de metricas de desempenho por view."""
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Limites (em segundos) dos baldes do histograma de latencia.
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Medicoes da requisicao em andamento (consultas, templates), por contexto.
+medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+class Medicao:
+    """Acumula as medicoes de uma unica requisicao."""
+
+    __slots__ = ('consultas', 'tempo_db', 'tempo_template', 'profundidade_template')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+        self.profundidade_template = 0
+
+
+class _MetricasView:
+    __slots__ = (
+        'requisicoes', 'baldes', 'soma_latencia', 'consultas', 'tempo_db',
+        'tempo_template', 'gravacoes_sessao',
+    )
+
+    def __init__(self):
+        self.requisicoes = 0
+        self.baldes = [0] * (len(BALDES_LATENCIA) + 1)
+        self.soma_latencia = 0.0
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+        self.gravacoes_sessao = 0
+
+
+class RegistroMetricas:
+    """Metricas agregadas por nome de URL, seguras para varias threads."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._views = {}
+        # Contadores de eventos por (evento, view), ex.: requisicoes recusadas.
+        self._eventos = {}
+
+    def registrar(self, view, latencia, medicao, gravou_sessao):
+        balde = bisect_left(BALDES_LATENCIA, latencia)
+        with self._trava:
+            metricas = self._views.get(view)
+            if metricas is None:
+                metricas = self._views[view] = _MetricasView()
+            metricas.requisicoes += 1
+            metricas.baldes[balde] += 1
+            metricas.soma_latencia += latencia
+            metricas.consultas += medicao.consultas
+            metricas.tempo_db += medicao.tempo_db
+            metricas.tempo_template += medicao.tempo_template
+            metricas.gravacoes_sessao += int(gravou_sessao)
+
+    def contar_evento(self, evento, view):
+        with self._trava:
+            self._eventos[evento, view] = self._eventos.get((evento, view), 0) + 1
+
+    def eventos(self):
+        with self._trava:
+            return dict(self._eventos)
+
+    def resumo(self):
+        """Copia simples das metricas por view (usada pelos benchmarks)."""
+        with self._trava:
+            return {
+                view: {
+                    'requisicoes': metricas.requisicoes,
+                    'consultas': metricas.consultas,
+                    'tempo_db': metricas.tempo_db,
+                    'tempo_template': metricas.tempo_template,
+                    'gravacoes_sessao': metricas.gravacoes_sessao,
+                }
+                for view, metricas in self._views.items()
+            }
+
+    def limpar(self):
+        with self._trava:
+            self._views = {}
+            self._eventos = {}
+
+    def exportar_prometheus(self):
+        """Serializa as metricas no formato texto do Prometheus."""
+        with self._trava:
+            views = sorted(self._views.items())
+            linhas = [
+                '# HELP netburguer_requisicao_segundos Latencia das requisicoes por view.',
+                '# TYPE netburguer_requisicao_segundos histogram',
+            ]
+            for view, metricas in views:
+                acumulado = 0
+                for limite, quantidade in zip(BALDES_LATENCIA, metricas.baldes):
+                    acumulado += quantidade
+                    linhas.append(
+                        f'netburguer_requisicao_segundos_bucket{{view="{view}",le="{limite}"}} {acumulado}'
+                    )
+                linhas.append(
+                    f'netburguer_requisicao_segundos_bucket{{view="{view}",le="+Inf"}} {metricas.requisicoes}'
+                )
+                linhas.append(f'netburguer_requisicao_segundos_sum{{view="{view}"}} {metricas.soma_latencia:.6f}')
+                linhas.append(f'netburguer_requisicao_segundos_count{{view="{view}"}} {metricas.requisicoes}')
+
+            contadores = (
+                ('netburguer_db_consultas_total', 'Consultas SQL executadas.', 'consultas', '{}'),
+                ('netburguer_db_segundos_total', 'Tempo gasto em consultas SQL.', 'tempo_db', '{:.6f}'),
+                ('netburguer_template_segundos_total', 'Tempo de renderizacao de templates.',
+                 'tempo_template', '{:.6f}'),
+                ('netburguer_sessao_gravacoes_total', 'Requisicoes que regravaram a sessao.',
+                 'gravacoes_sessao', '{}'),
+            )
+            for nome, ajuda, atributo, formato in contadores:
+                linhas.append(f'# HELP {nome} {ajuda}')
+                linhas.append(f'# TYPE {nome} counter')
+                for view, metricas in views:
+                    valor = formato.format(getattr(metricas, atributo))
+                    linhas.append(f'{nome}{{view="{view}"}} {valor}')
+
+            linhas.append('# HELP netburguer_eventos_total Eventos por view (ex.: requisicoes recusadas por limite).')
+            linhas.append('# TYPE netburguer_eventos_total counter')
+            for (evento, view), quantidade in sorted(self._eventos.items()):
+                linhas.append(f'netburguer_eventos_total{{evento="{evento}",view="{view}"}} {quantidade}')
+
+        return '\n'.join(linhas) + '\n'
+
+
+registro = RegistroMetricas()
@@ -0,0 +1,118 @@
+"""Middlewares do app Cardapio."""
+
+import functools
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metricas import Medicao, medicao_atual, registro
+
+
+def _instrumentar_templates():
+    """Mede o tempo de render dos templates (apenas o render mais externo)."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'instrumentado', False):
+        return
+    render_original = Template.render
+
+    @functools.wraps(render_original)
+    def render(self, context=None, request=None):
+        medicao = medicao_atual.get()
+        if medicao is None:
+            return render_original(self, context, request)
+        medicao.profundidade_template += 1
+        inicio = perf_counter()
+        try:
+            return render_original(self, context, request)
+        finally:
+            medicao.profundidade_template -= 1
+            if not medicao.profundidade_template:
+                medicao.tempo_template += perf_counter() - inicio
+
+    render.instrumentado = True
+    Template.render = render
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicao = medicao_atual.get()
+    inicio = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if medicao is not None:
+            medicao.consultas += 1
+            medicao.tempo_db += perf_counter() - inicio
+
+
+def _instrumentar_conexao(connection, **kwargs):
+    """Instala a medicao de consultas de forma permanente na conexao.
+
+    Sob ASGI as consultas rodam em threads do sync_to_async, com conexoes
+    proprias; o ContextVar chega ate elas, um execute_wrapper aberto so
+    durante a requisicao nao.
+    """
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+class MetricasMiddleware:
+    """Registra latencia, consultas, templates e sessao por nome de URL.
+
+    Deve ficar no topo do MIDDLEWARE para incluir o custo dos demais.
+    Tambem adiciona o cabecalho Server-Timing a cada resposta. Funciona
+    tanto sob WSGI quanto sob ASGI, sem forcar as views para uma thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_ATIVAS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrumentar_templates()
+        connection_created.connect(_instrumentar_conexao, dispatch_uid='metricas_consultas')
+        for conexao in connections.all(initialized_only=True):
+            _instrumentar_conexao(conexao)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicao = Medicao()
+        token = medicao_atual.set(medicao)
+        inicio = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            medicao_atual.reset(token)
+        return self._registrar(request, response, medicao, perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicao = Medicao()
+        token = medicao_atual.set(medicao)
+        inicio = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            medicao_atual.reset(token)
+        return self._registrar(request, response, medicao, perf_counter() - inicio)
+
+    def _registrar(self, request, response, medicao, latencia):
+        rota = getattr(request, 'resolver_match', None)
+        view = (rota.url_name if rota else None) or 'sem_rota'
+        sessao = getattr(request, 'session', None)
+        registro.registrar(view, latencia, medicao, sessao is not None and sessao.modified)
+
+        response['Server-Timing'] = (
+            f'app;dur={latencia * 1000:.1f}, '
+            f'db;dur={medicao.tempo_db * 1000:.1f};desc="{medicao.consultas} consultas", '
+            f'tpl;dur={medicao.tempo_template * 1000:.1f}'
+        )
+        return response
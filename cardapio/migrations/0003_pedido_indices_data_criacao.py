@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0002_remove_produto_is_combo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['-data_criacao', '-id'], name='pedido_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['data_criacao', 'total_final'], name='pedido_data_total_idx'),
+        ),
+    ]
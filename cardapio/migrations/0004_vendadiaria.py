@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+def preencher_vendas_diarias(apps, schema_editor):
+    # Pedidos anteriores a tabela entram no consolidado ja na migracao.
+    from cardapio.relatorios import reconstruir_vendas_diarias
+
+    reconstruir_vendas_diarias(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0003_pedido_indices_data_criacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True, verbose_name='Dia')),
+                ('qtd_pedidos', models.PositiveIntegerField(default=0, verbose_name='Quantidade de Pedidos')),
+                ('total_bruto', models.DecimalField(decimal_places=2, default=0.0, max_digits=12, verbose_name='Total Bruto')),
+                ('desconto_total', models.DecimalField(decimal_places=2, default=0.0, max_digits=12, verbose_name='Desconto Total')),
+                ('total_final', models.DecimalField(decimal_places=2, default=0.0, max_digits=12, verbose_name='Total Final')),
+            ],
+            options={
+                'verbose_name': 'Venda Diária',
+                'verbose_name_plural': 'Vendas Diárias',
+                'ordering': ['data'],
+            },
+        ),
+        migrations.RunPython(preencher_vendas_diarias, migrations.RunPython.noop),
+    ]
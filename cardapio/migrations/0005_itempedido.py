@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 12:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0004_vendadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemPedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome do Item')),
+                ('preco_unitario', models.DecimalField(decimal_places=2, max_digits=6, verbose_name='Preço Unitário')),
+                ('quantidade', models.PositiveIntegerField(verbose_name='Quantidade')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Total do Item')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='cardapio.pedido', verbose_name='Pedido')),
+                ('produto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='itens_pedido', to='cardapio.produto', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Item do Pedido',
+                'verbose_name_plural': 'Itens do Pedido',
+                'ordering': ['pedido', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+"""Preenche ItemPedido a partir do itens_json dos pedidos ja registrados."""
+
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+TAMANHO_LOTE = 500
+
+
+def _decimal(valor):
+    try:
+        numero = Decimal(str(valor))
+    except (InvalidOperation, TypeError):
+        return Decimal('0.00')
+    return numero if numero.is_finite() else Decimal('0.00')
+
+
+def preencher_itens(apps, schema_editor):
+    Pedido = apps.get_model('cardapio', 'Pedido')
+    Produto = apps.get_model('cardapio', 'Produto')
+    ItemPedido = apps.get_model('cardapio', 'ItemPedido')
+
+    produtos_existentes = set(Produto.objects.values_list('id', flat=True))
+    pedidos = Pedido.objects.filter(itens__isnull=True).values_list('id', 'itens_json')
+
+    lote = []
+    for pedido_id, itens_json in pedidos.iterator(chunk_size=TAMANHO_LOTE):
+        try:
+            itens = json.loads(itens_json or '[]')
+        except ValueError:
+            continue
+
+        if not isinstance(itens, list):
+            continue
+
+        for item in itens:
+            # Itens malformados sao ignorados, como o JSON invalido acima.
+            if not isinstance(item, dict):
+                continue
+            try:
+                quantidade = int(item.get('quantidade') or 0)
+                preco = _decimal(item.get('preco'))
+                total = _decimal(item.get('total', preco * quantidade))
+            except (TypeError, ValueError):
+                continue
+            if quantidade <= 0:
+                continue
+            produto_id = item.get('produto_id')
+            if not isinstance(produto_id, int) or produto_id not in produtos_existentes:
+                produto_id = None
+            lote.append(
+                ItemPedido(
+                    pedido_id=pedido_id,
+                    produto_id=produto_id,
+                    nome=str(item.get('nome') or '')[:100],
+                    preco_unitario=preco,
+                    quantidade=quantidade,
+                    total=total,
+                )
+            )
+
+        if len(lote) >= TAMANHO_LOTE:
+            ItemPedido.objects.bulk_create(lote)
+            lote = []
+
+    if lote:
+        ItemPedido.objects.bulk_create(lote)
+
+
+def remover_itens(apps, schema_editor):
+    apps.get_model('cardapio', 'ItemPedido').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0005_itempedido'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_itens, remover_itens),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0006_preencher_itempedido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='token_checkout',
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True, verbose_name='Token de Checkout'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 12:36
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0007_pedido_token_checkout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome da Tarefa')),
+                ('argumentos', models.TextField(default='{}', verbose_name='Argumentos (JSON)')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=12, verbose_name='Status')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_tentativas', models.PositiveIntegerField(default=5, verbose_name='Máximo de Tentativas')),
+                ('executar_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar Em')),
+                ('reservada_em', models.DateTimeField(blank=True, null=True, verbose_name='Reservada Em')),
+                ('ultimo_erro', models.TextField(blank=True, default='', verbose_name='Último Erro')),
+                ('criada_em', models.DateTimeField(auto_now_add=True, verbose_name='Criada Em')),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'ordering': ['executar_em', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['status', 'executar_em'], name='tarefa_status_exec_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+"""Indice de busca textual de Produto (FTS5 no SQLite, GIN no PostgreSQL)."""
+
+from django.db import migrations
+
+TABELA_FTS = 'cardapio_produto_fts'
+
+POSTGRESQL_CRIAR = [
+    'CREATE EXTENSION IF NOT EXISTS unaccent',
+    # unaccent() nao e IMMUTABLE; o envoltorio com dicionario fixo pode ir para o indice.
+    """
+    CREATE OR REPLACE FUNCTION netburguer_sem_acento(texto text) RETURNS text
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, texto) $$
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    """
+    CREATE OR REPLACE FUNCTION netburguer_produto_busca(nome text, descricao text) RETURNS tsvector
+    AS $$
+        SELECT setweight(to_tsvector('portuguese'::regconfig, netburguer_sem_acento(coalesce(nome, ''))), 'A')
+            || setweight(to_tsvector('portuguese'::regconfig, netburguer_sem_acento(coalesce(descricao, ''))), 'B')
+    $$
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """,
+    'CREATE INDEX IF NOT EXISTS cardapio_produto_busca_idx ON cardapio_produto '
+    'USING GIN (netburguer_produto_busca(nome, descricao))',
+]
+
+POSTGRESQL_REMOVER = [
+    'DROP INDEX IF EXISTS cardapio_produto_busca_idx',
+    'DROP FUNCTION IF EXISTS netburguer_produto_busca(text, text)',
+    'DROP FUNCTION IF EXISTS netburguer_sem_acento(text)',
+]
+
+SQLITE_CRIAR = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+    f"nome, descricao, tokenize = 'unicode61 remove_diacritics 2')",
+    f'INSERT INTO {TABELA_FTS}(rowid, nome, descricao) SELECT id, nome, descricao FROM cardapio_produto',
+]
+
+SQLITE_REMOVER = [f'DROP TABLE IF EXISTS {TABELA_FTS}']
+
+
+def _executar(schema_editor, comandos):
+    for comando in comandos:
+        schema_editor.execute(comando)
+
+
+def criar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _executar(schema_editor, SQLITE_CRIAR)
+    elif vendor == 'postgresql':
+        _executar(schema_editor, POSTGRESQL_CRIAR)
+
+
+def remover_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _executar(schema_editor, SQLITE_REMOVER)
+    elif vendor == 'postgresql':
+        _executar(schema_editor, POSTGRESQL_REMOVER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0008_tarefa'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cardapio', '0009_produto_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='mensagem',
+            field=models.TextField(blank=True, default='', verbose_name='Mensagem do Pedido'),
+        ),
+    ]
@@ -45,10 +45,117 @@ class Pedido(models.Model):
     # Armazena os itens do carrinho como JSON/Texto para persistência.
     itens_json = models.TextField(default="[]", verbose_name="Itens do Pedido (JSON)")
 
+    # Token emitido com o formulário de checkout; impede pedidos duplicados
+    # em duplo clique ou reenvio.
+    token_checkout = models.CharField(
+        max_length=32, unique=True, null=True, blank=True, verbose_name="Token de Checkout"
+    )
+
+    # Mensagem do WhatsApp gerada uma única vez no checkout; o link curto
+    # /p/<token>/ lê daqui em vez de remontá-la a cada reenvio.
+    mensagem = models.TextField(blank=True, default="", verbose_name="Mensagem do Pedido")
+
     class Meta:
         verbose_name = "Pedido"
         verbose_name_plural = "Pedidos"
         ordering = ['-data_criacao']
+        indexes = [
+            # Historico: filtro por periodo + paginacao por (data_criacao, id).
+            models.Index(fields=['-data_criacao', '-id'], name='pedido_data_id_idx'),
+            # Relatorio: cobre o filtro por periodo e a soma de total_final.
+            models.Index(fields=['data_criacao', 'total_final'], name='pedido_data_total_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido #{self.id} - Cliente: {self.nome_cliente} - R$ {self.total_final}"
+
+class ItemPedido(models.Model):
+    """
+    Modelo ItemPedido: Linha normalizada de um pedido (snapshot de nome e preço).
+    Permite rankings e receita por produto com GROUP BY, sem ler itens_json.
+    """
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='itens', verbose_name="Pedido")
+    # Mantém o histórico mesmo que o produto seja removido do cardápio.
+    produto = models.ForeignKey(
+        Produto, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='itens_pedido', verbose_name="Produto",
+    )
+    nome = models.CharField(max_length=100, verbose_name="Nome do Item")
+    preco_unitario = models.DecimalField(max_digits=6, decimal_places=2, verbose_name="Preço Unitário")
+    quantidade = models.PositiveIntegerField(verbose_name="Quantidade")
+    total = models.DecimalField(max_digits=8, decimal_places=2, verbose_name="Total do Item")
+
+    class Meta:
+        verbose_name = "Item do Pedido"
+        verbose_name_plural = "Itens do Pedido"
+        ordering = ['pedido', 'id']
+
+    def __str__(self):
+        return f"{self.quantidade}x {self.nome} (Pedido #{self.pedido_id})"
+
+
+# -----------------------------------------------------
+# Módulo de Relatórios (Consolidado diário de vendas)
+# -----------------------------------------------------
+class VendaDiaria(models.Model):
+    """
+    Modelo VendaDiaria: Totais de vendas consolidados por dia (fuso local).
+    Atualizado a cada pedido finalizado; reconstruível pelo comando
+    reconstruir_vendas_diarias.
+    """
+    data = models.DateField(unique=True, verbose_name="Dia")
+    qtd_pedidos = models.PositiveIntegerField(default=0, verbose_name="Quantidade de Pedidos")
+    total_bruto = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, verbose_name="Total Bruto")
+    desconto_total = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, verbose_name="Desconto Total")
+    total_final = models.DecimalField(max_digits=12, decimal_places=2, default=0.00, verbose_name="Total Final")
+
+    class Meta:
+        verbose_name = "Venda Diária"
+        verbose_name_plural = "Vendas Diárias"
+        ordering = ['data']
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} - {self.qtd_pedidos} pedido(s) - R$ {self.total_final}"
+
+
+# -----------------------------------------------------
+# Fila de Tarefas (efeitos do checkout fora da requisição)
+# -----------------------------------------------------
+class Tarefa(models.Model):
+    """
+    Modelo Tarefa: Trabalho enfileirado para o worker (processar_tarefas).
+    Gravada na mesma transação do pedido; executada com novas tentativas e
+    espera exponencial em caso de erro.
+    """
+    PENDENTE = 'pendente'
+    EXECUTANDO = 'executando'
+    CONCLUIDA = 'concluida'
+    FALHOU = 'falhou'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'),
+        (EXECUTANDO, 'Executando'),
+        (CONCLUIDA, 'Concluída'),
+        (FALHOU, 'Falhou'),
+    ]
+
+    nome = models.CharField(max_length=100, verbose_name="Nome da Tarefa")
+    argumentos = models.TextField(default="{}", verbose_name="Argumentos (JSON)")
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=PENDENTE, verbose_name="Status")
+    tentativas = models.PositiveIntegerField(default=0, verbose_name="Tentativas")
+    max_tentativas = models.PositiveIntegerField(default=5, verbose_name="Máximo de Tentativas")
+    executar_em = models.DateTimeField(default=timezone.now, verbose_name="Executar Em")
+    reservada_em = models.DateTimeField(null=True, blank=True, verbose_name="Reservada Em")
+    ultimo_erro = models.TextField(blank=True, default="", verbose_name="Último Erro")
+    criada_em = models.DateTimeField(auto_now_add=True, verbose_name="Criada Em")
+
+    class Meta:
+        verbose_name = "Tarefa"
+        verbose_name_plural = "Tarefas"
+        ordering = ['executar_em', 'id']
+        indexes = [
+            # Worker: proxima tarefa pendente ja liberada para execucao.
+            models.Index(fields=['status', 'executar_em'], name='tarefa_status_exec_idx'),
+        ]
 
     def __str__(self):
-        return f"Pedido #{self.id} - Cliente: {self.nome_cliente} - R$ {self.total_final}"
\ No newline at end of file
+        return f"Tarefa #{self.id} - {self.nome} ({self.status})"
@@ -0,0 +1,182 @@
+"""Relatorio mensal de vendas em PDF (reportlab), gerado pelo worker da fila."""
+
+import glob
+import os
+import threading
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Pedido
+
+LINHAS_POR_TABELA = 200
+
+
+def intervalo_mes(referencia):
+    """Retorna (primeiro_dia, primeiro_dia_do_mes_seguinte) de ``referencia``."""
+    inicio = referencia.replace(day=1)
+    if inicio.month == 12:
+        return inicio, date(inicio.year + 1, 1, 1)
+    return inicio, date(inicio.year, inicio.month + 1, 1)
+
+
+def _pedidos_do_mes(inicio, fim):
+    return Pedido.objects.filter(
+        data_criacao__gte=timezone.make_aware(datetime.combine(inicio, time.min)),
+        data_criacao__lt=timezone.make_aware(datetime.combine(fim, time.min)),
+    )
+
+
+def caminho_relatorio(referencia):
+    """Arquivo do PDF para o mes, identificado pelo ultimo pedido incluido.
+
+    Um pedido novo no mes muda o nome do arquivo, invalidando a versao antiga.
+    Todo o conteudo do PDF sai de Pedido (nao do consolidado, que chega
+    depois pela fila), entao o nome corresponde ao que o arquivo mostra.
+    """
+    inicio, fim = intervalo_mes(referencia)
+    ultimo_id = (
+        _pedidos_do_mes(inicio, fim).order_by('-id').values_list('id', flat=True).first() or 0
+    )
+    return os.path.join(_diretorio(), f'relatorio_{inicio:%Y_%m}_{ultimo_id}.pdf')
+
+
+def _diretorio():
+    return getattr(settings, 'RELATORIOS_PDF_DIR', settings.BASE_DIR / 'relatorios_pdf')
+
+
+def _ultimo_id(caminho):
+    return int(os.path.splitext(os.path.basename(caminho))[0].rsplit('_', 1)[1])
+
+
+def remover_versoes_antigas(destino):
+    """Apaga os PDFs do mesmo mes gerados com um ultimo pedido anterior ao de ``destino``."""
+    prefixo, _ = os.path.basename(destino).rsplit('_', 1)
+    atual = _ultimo_id(destino)
+    for caminho in glob.glob(os.path.join(os.path.dirname(destino), f'{prefixo}_*.pdf')):
+        if _ultimo_id(caminho) < atual:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+
+def vendas_por_dia(inicio, fim):
+    """Totais por dia (fuso local) calculados direto dos pedidos do periodo.
+
+    O relatorio nao usa o VendaDiaria, que pode estar atras da fila de tarefas.
+    """
+    dias = (
+        _pedidos_do_mes(inicio, fim)
+        .annotate(dia=TruncDate('data_criacao', tzinfo=timezone.get_current_timezone()))
+        .order_by('dia')
+        .values('dia')
+        .annotate(
+            qtd_pedidos=Count('id'),
+            desconto_total=Coalesce(Sum('desconto_aplicado'), Decimal('0.00')),
+            total_final=Coalesce(Sum('total_final'), Decimal('0.00')),
+        )
+    )
+    return list(dias)
+
+
+class _HistoriaSobDemanda(list):
+    """Lista de flowables que se reabastece a partir de um gerador.
+
+    O platypus consome a historia removendo o primeiro elemento; entregando
+    os flowables aos poucos, um mes grande nunca fica inteiro em memoria.
+    """
+
+    def __init__(self, gerador):
+        super().__init__()
+        self._gerador = gerador
+
+    def __len__(self):
+        if not super().__len__():
+            proximo = next(self._gerador, None)
+            if proximo is not None:
+                self.append(proximo)
+        return super().__len__()
+
+
+def _flowables(referencia):
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+
+    estilos = getSampleStyleSheet()
+    estilo_tabela = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#ffb300')),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#dddddd')),
+        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+    ])
+    inicio, fim = intervalo_mes(referencia)
+    fuso = timezone.get_current_timezone()
+
+    vendas_diarias = vendas_por_dia(inicio, fim)
+    qtd_pedidos = sum(dia['qtd_pedidos'] for dia in vendas_diarias)
+    total_mensal = sum((dia['total_final'] for dia in vendas_diarias), Decimal('0.00'))
+
+    yield Paragraph(f'NetBurguer - Relatorio de Vendas {inicio:%m/%Y}', estilos['Title'])
+    yield Paragraph(f'Total de pedidos: {qtd_pedidos}', estilos['Normal'])
+    yield Paragraph(f'Arrecadacao total: R$ {total_mensal:.2f}', estilos['Normal'])
+    yield Spacer(1, 12)
+
+    yield Paragraph('Vendas por dia', estilos['Heading2'])
+    linhas = [['Dia', 'Pedidos', 'Desconto', 'Total Final']]
+    for dia in vendas_diarias:
+        linhas.append([
+            f'{dia["dia"]:%d/%m/%Y}',
+            dia['qtd_pedidos'],
+            f'R$ {dia["desconto_total"]:.2f}',
+            f'R$ {dia["total_final"]:.2f}',
+        ])
+    yield Table(linhas, repeatRows=1, style=estilo_tabela)
+    yield Spacer(1, 12)
+
+    yield Paragraph('Pedidos detalhados', estilos['Heading2'])
+    cabecalho = ['ID', 'Data', 'Cliente', 'Total Final']
+    pedidos = (
+        _pedidos_do_mes(inicio, fim)
+        .order_by('-data_criacao', '-id')
+        .values_list('id', 'data_criacao', 'nome_cliente', 'total_final')
+        .iterator(chunk_size=LINHAS_POR_TABELA)
+    )
+    linhas = [cabecalho]
+    for pedido_id, data_criacao, cliente, total_final in pedidos:
+        linhas.append([
+            pedido_id,
+            f'{data_criacao.astimezone(fuso):%d/%m/%Y %H:%M}',
+            cliente[:40],
+            f'R$ {total_final:.2f}',
+        ])
+        if len(linhas) > LINHAS_POR_TABELA:
+            yield Table(linhas, repeatRows=1, style=estilo_tabela)
+            linhas = [cabecalho]
+    if len(linhas) > 1:
+        yield Table(linhas, repeatRows=1, style=estilo_tabela)
+
+
+def gerar_relatorio_pdf(referencia, destino):
+    """Monta o PDF do mes em ``destino`` (gravacao atomica via arquivo temporario).
+
+    Em seguida apaga as versoes do mesmo mes com pedidos a menos.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f'{destino}.{os.getpid()}.{threading.get_ident()}.tmp'
+    documento = SimpleDocTemplate(temporario, pagesize=A4, title='Relatorio de Vendas')
+    try:
+        documento.build(_HistoriaSobDemanda(_flowables(referencia)))
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    remover_versoes_antigas(destino)
@@ -0,0 +1,93 @@
+"""Consolidado diario de vendas usado pelo relatorio mensal."""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Pedido, VendaDiaria
+
+
+def recalcular_venda_diaria(dia):
+    """Regrava o consolidado de ``dia`` somando os pedidos daquele dia.
+
+    Recalcular (em vez de somar um pedido ao total) torna a operacao
+    idempotente: rodar de novo para o mesmo pedido, numa nova tentativa da
+    tarefa ou junto com reconstruir_vendas_diarias, nao conta nada duas vezes.
+    """
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    fim = timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min))
+    totais = Pedido.objects.filter(data_criacao__gte=inicio, data_criacao__lt=fim).aggregate(
+        qtd_pedidos=Count('id'),
+        total_bruto=Sum('total_bruto'),
+        desconto_total=Sum('desconto_aplicado'),
+        total_final=Sum('total_final'),
+    )
+    if not totais['qtd_pedidos']:
+        VendaDiaria.objects.filter(data=dia).delete()
+        return
+    valores = {
+        'qtd_pedidos': totais['qtd_pedidos'],
+        'total_bruto': totais['total_bruto'] or Decimal('0.00'),
+        'desconto_total': totais['desconto_total'] or Decimal('0.00'),
+        'total_final': totais['total_final'] or Decimal('0.00'),
+    }
+    # Roda no checkout: um UPDATE no caso comum, INSERT so no primeiro pedido do dia.
+    if VendaDiaria.objects.filter(data=dia).update(**valores):
+        return
+    try:
+        with transaction.atomic():
+            VendaDiaria.objects.create(data=dia, **valores)
+    except IntegrityError:
+        # Outro processo criou a linha do dia ao mesmo tempo.
+        VendaDiaria.objects.filter(data=dia).update(**valores)
+
+
+def reconstruir_vendas_diarias(desde=None, apps=None):
+    """Recalcula o consolidado a partir dos pedidos. Retorna os dias gravados.
+
+    ``apps`` e o registro de modelos de uma migracao (RunPython); sem ele
+    valem os modelos atuais.
+    """
+    modelo_pedido = apps.get_model('cardapio', 'Pedido') if apps else Pedido
+    modelo_venda = apps.get_model('cardapio', 'VendaDiaria') if apps else VendaDiaria
+    pedidos = modelo_pedido.objects.all()
+    if desde is not None:
+        pedidos = pedidos.filter(
+            data_criacao__gte=timezone.make_aware(datetime.combine(desde, time.min))
+        )
+
+    dias = (
+        pedidos.annotate(dia=TruncDate('data_criacao', tzinfo=timezone.get_current_timezone()))
+        .order_by()
+        .values('dia')
+        .annotate(
+            qtd_pedidos=Count('id'),
+            total_bruto=Sum('total_bruto'),
+            desconto_total=Sum('desconto_aplicado'),
+            total_final=Sum('total_final'),
+        )
+    )
+
+    with transaction.atomic():
+        consolidado = modelo_venda.objects.all()
+        if desde is not None:
+            consolidado = consolidado.filter(data__gte=desde)
+        consolidado.delete()
+        modelo_venda.objects.bulk_create(
+            [
+                modelo_venda(
+                    data=dia['dia'],
+                    qtd_pedidos=dia['qtd_pedidos'],
+                    total_bruto=dia['total_bruto'] or Decimal('0.00'),
+                    desconto_total=dia['desconto_total'] or Decimal('0.00'),
+                    total_final=dia['total_final'] or Decimal('0.00'),
+                )
+                for dia in dias
+            ],
+            batch_size=500,
+        )
+    return len(dias)
@@ -0,0 +1,188 @@
+"""Leituras do painel em uma replica, com janela no primario apos escritas.
+
+As views de leitura pesada do painel (historico, exportacao, relatorio) sao
+marcadas com ``ler_da_replica`` e consultam o alias ``replica``, longe das
+gravacoes do checkout no ``default``. Sem replica configurada tudo continua
+no ``default``. Quem acabou de gravar algo le do primario por
+REPLICA_JANELA_PRIMARIO segundos, para ver as proprias alteracoes.
+"""
+
+import sqlite3
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ALIAS_REPLICA = 'replica'
+# Chave da sessao com o instante ate o qual o cliente le do primario.
+CHAVE_PRIMARIO_ATE = '_primario_ate'
+# Gravacoes destes apps nao contam como escrita do cliente (a propria sessao).
+APPS_IGNORADOS = ('sessions',)
+
+# Alias de leitura da view em andamento (None: decisao padrao, o 'default').
+_alias_leitura = ContextVar('alias_leitura', default=None)
+# Marcador da requisicao em andamento, preenchido pelo roteador.
+_escrita_atual = ContextVar('escrita_atual', default=None)
+
+
+class _Escrita:
+    __slots__ = ('houve',)
+
+    def __init__(self):
+        self.houve = False
+
+
+def _endereco(alias):
+    config = connections[alias].settings_dict
+    return config['ENGINE'], config['HOST'], config['PORT'], config['NAME']
+
+
+def replica_configurada():
+    """Ha um alias 'replica' apontando para outro banco que nao o primario.
+
+    Nos testes o alias vira espelho do 'default' (TEST MIRROR) e aponta
+    para o proprio primario; ai nao ha o que separar.
+    """
+    if ALIAS_REPLICA not in connections.settings:
+        return False
+    return _endereco(ALIAS_REPLICA) != _endereco(DEFAULT_DB_ALIAS)
+
+
+class RoteadorReplica:
+    """Router: leituras das views marcadas na replica, escritas sempre no primario."""
+
+    def db_for_read(self, model, **hints):
+        return _alias_leitura.get()
+
+    def db_for_write(self, model, **hints):
+        escrita = _escrita_atual.get()
+        if escrita is not None and model._meta.app_label not in APPS_IGNORADOS:
+            escrita.houve = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A replica e uma copia do primario: os objetos de um e de outro se relacionam.
+        bancos = {DEFAULT_DB_ALIAS, ALIAS_REPLICA}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # O esquema chega a replica pela copia do primario.
+        if db == ALIAS_REPLICA:
+            return False
+        return None
+
+
+def _no_primario(request):
+    sessao = getattr(request, 'session', None)
+    return sessao is not None and sessao.get(CHAVE_PRIMARIO_ATE, 0) > time.time()
+
+
+def _iterar_na_replica(conteudo, alias):
+    """Mantem o alias de leitura enquanto o servidor consome uma resposta em streaming."""
+    iterador = iter(conteudo)
+    while True:
+        token = _alias_leitura.set(alias)
+        try:
+            parte = next(iterador)
+        except StopIteration:
+            return
+        finally:
+            _alias_leitura.reset(token)
+        yield parte
+
+
+def ler_da_replica(view):
+    """Executa a view (e o streaming da resposta) lendo da replica.
+
+    Cai no primario quando nao ha replica ou quando o cliente gravou algo
+    ha menos de REPLICA_JANELA_PRIMARIO segundos.
+    """
+
+    @wraps(view)
+    def embrulho(request, *args, **kwargs):
+        if not replica_configurada() or _no_primario(request):
+            return view(request, *args, **kwargs)
+        token = _alias_leitura.set(ALIAS_REPLICA)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _alias_leitura.reset(token)
+        if response.streaming:
+            response.streaming_content = _iterar_na_replica(response.streaming_content, ALIAS_REPLICA)
+        return response
+
+    return embrulho
+
+
+class ReplicaMiddleware:
+    """Abre a janela no primario na sessao de quem gravou algo na requisicao.
+
+    Deve ficar depois do SessionMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        escrita = _Escrita()
+        token = _escrita_atual.set(escrita)
+        try:
+            response = self.get_response(request)
+        finally:
+            _escrita_atual.reset(token)
+        self._marcar(request, escrita)
+        return response
+
+    async def __acall__(self, request):
+        escrita = _Escrita()
+        token = _escrita_atual.set(escrita)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _escrita_atual.reset(token)
+        self._marcar(request, escrita)
+        return response
+
+    def _marcar(self, request, escrita):
+        sessao = getattr(request, 'session', None)
+        if escrita.houve and sessao is not None and replica_configurada():
+            sessao[CHAVE_PRIMARIO_ATE] = time.time() + settings.REPLICA_JANELA_PRIMARIO
+
+
+def atualizar_replica(origem=DEFAULT_DB_ALIAS, destino=ALIAS_REPLICA):
+    """Copia o SQLite primario para o arquivo da replica com a API de backup online.
+
+    A copia e feita numa unica etapa, um retrato consistente do primario,
+    direto no arquivo da replica (conexoes abertas nela passam a ver os
+    dados novos na proxima transacao). Devolve o tempo gasto em segundos.
+    """
+    principal, replica = connections[origem], connections[destino]
+    if principal.vendor != 'sqlite' or replica.vendor != 'sqlite':
+        raise ValueError('A copia por backup online so se aplica a replica SQLite.')
+
+    if principal.in_atomic_block:
+        # Com uma transacao de escrita aberta na origem o backup nunca termina.
+        raise ValueError('A copia da replica nao pode rodar dentro de uma transacao.')
+
+    inicio = time.perf_counter()
+    principal.ensure_connection()
+    timeout = settings.REPLICA_BACKUP_TIMEOUT
+    with principal.wrap_database_errors:
+        alvo = sqlite3.connect(replica.settings_dict['NAME'], timeout=timeout)
+        try:
+            principal.connection.backup(alvo)
+        finally:
+            alvo.close()
+    return time.perf_counter() - inicio
@@ -0,0 +1,48 @@
+"""Sinais do app Cardapio."""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .busca import indexar_produtos, remover_do_indice
+from .catalogo import invalidar_catalogo
+from .cozinha import fonte_pedidos
+from .models import Pedido, Produto
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+def produto_alterado(sender, **kwargs):
+    """Invalida o cache do catalogo depois que a alteracao for confirmada."""
+    transaction.on_commit(invalidar_catalogo)
+
+
+@receiver(post_save, sender=Produto)
+def produto_indexar(sender, instance, using, **kwargs):
+    """Atualiza o indice de busca na mesma transacao da gravacao."""
+    indexar_produtos([instance], using=using)
+
+
+@receiver(post_delete, sender=Produto)
+def produto_desindexar(sender, instance, using, **kwargs):
+    remover_do_indice([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Pedido)
+def pedido_criado(sender, created, **kwargs):
+    """Antecipa a consulta do feed da cozinha quando o pedido for confirmado."""
+    if created:
+        transaction.on_commit(fonte_pedidos.acordar)
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    """Aplica os PRAGMAs do perfil (WAL, busy_timeout...) em conexoes SQLite."""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome} = {valor}')
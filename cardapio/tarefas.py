@@ -0,0 +1,102 @@
+"""Tarefas executadas pelo worker (pos-pedido e relatorio em PDF)."""
+
+import json
+import logging
+import os
+import urllib.request
+from datetime import datetime
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .fila import tarefa
+from .models import Pedido, Tarefa
+from .relatorio_pdf import caminho_relatorio, gerar_relatorio_pdf
+from .relatorios import recalcular_venda_diaria
+
+logger = logging.getLogger(__name__)
+
+
+def caminho_recibo(pedido_id):
+    diretorio = getattr(settings, 'RECIBOS_DIR', settings.BASE_DIR / 'recibos')
+    return os.path.join(diretorio, f'recibo_pedido_{pedido_id}.txt')
+
+
+@tarefa()
+def consolidar_venda(pedido_id):
+    """Recalcula o consolidado diario (VendaDiaria) do dia do pedido.
+
+    O checkout ja recalcula o dia na propria transacao e nao enfileira mais
+    esta tarefa; ela continua registrada para as que ja estavam na fila.
+    """
+    pedido = Pedido.objects.filter(pk=pedido_id).first()
+    if pedido is not None:
+        recalcular_venda_diaria(timezone.localdate(pedido.data_criacao))
+
+
+@tarefa()
+def gerar_recibo(pedido_id):
+    """Grava o recibo do pedido em texto (sobrescreve em novas tentativas)."""
+    pedido = Pedido.objects.filter(pk=pedido_id).first()
+    if pedido is None:
+        return
+    conteudo = render_to_string(
+        'cliente/recibo.txt', {'pedido': pedido, 'itens': pedido.itens.all()}
+    )
+    caminho = caminho_recibo(pedido_id)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+@tarefa(max_tentativas=8)
+def notificar_cozinha(pedido_id):
+    """Avisa a cozinha pelo webhook COZINHA_WEBHOOK_URL (ou apenas registra no log)."""
+    pedido = Pedido.objects.filter(pk=pedido_id).first()
+    if pedido is None:
+        return
+    url = getattr(settings, 'COZINHA_WEBHOOK_URL', '')
+    if not url:
+        logger.info('Novo pedido para a cozinha: %s', pedido)
+        return
+
+    corpo = json.dumps({
+        'id': pedido.id,
+        'cliente': pedido.nome_cliente,
+        'endereco': pedido.endereco_entrega,
+        'data_criacao': pedido.data_criacao.isoformat(),
+        'total_final': f'{pedido.total_final:.2f}',
+        'itens': [
+            {'nome': item.nome, 'quantidade': item.quantidade} for item in pedido.itens.all()
+        ],
+    }).encode()
+    requisicao = urllib.request.Request(
+        url, data=corpo, headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    # Erros de rede ou HTTP levantam excecao e a fila tenta de novo com espera.
+    with urllib.request.urlopen(requisicao, timeout=10):
+        pass
+
+
+@tarefa(max_tentativas=3)
+def gerar_relatorio_mensal(mes):
+    """Gera o PDF do mes ``AAAA-MM`` com os pedidos gravados ate agora."""
+    referencia = datetime.strptime(mes, '%Y-%m').date()
+    destino = caminho_relatorio(referencia)
+    if not os.path.exists(destino):
+        gerar_relatorio_pdf(referencia, destino)
+
+
+def agendar_relatorio_pdf(referencia):
+    """Enfileira a geracao do PDF do mes, se ainda nao houver uma na fila."""
+    argumentos = {'mes': f'{referencia:%Y-%m}'}
+    na_fila = Tarefa.objects.filter(
+        nome=gerar_relatorio_mensal.__name__,
+        argumentos=json.dumps(argumentos),
+        status__in=[Tarefa.PENDENTE, Tarefa.EXECUTANDO],
+    ).exists()
+    if not na_fila:
+        gerar_relatorio_mensal.enfileirar(**argumentos)
@@ -1,3 +1,1249 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import unquote
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from .catalogo import MARCADOR_CSRF, invalidar_catalogo, versao_catalogo
+from .cozinha import fluxo_eventos, fonte_pedidos
+from .metricas import registro
+from .fila import _reservar, executar, processar_pendentes, tarefa
+from .models import ItemPedido, Pedido, Produto, Tarefa, VendaDiaria
+from .relatorio_pdf import (
+    caminho_relatorio,
+    gerar_relatorio_pdf,
+    intervalo_mes,
+    remover_versoes_antigas,
+    vendas_por_dia,
+)
+from .tarefas import caminho_recibo, consolidar_venda
+from . import estaticos, limites, replica, views
+from .views import MARCADOR_LINHAS, _filtrar_periodo
+
+
+class MenuCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.produto = Produto.objects.create(
+            nome='X-Burguer', descricao='Pao, carne e queijo', preco=Decimal('18.90')
+        )
+
+    def test_menu_reaproveita_cache_sem_consultar_banco(self):
+        self.client.get(reverse('menu_cardapio'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('menu_cardapio'))
+        self.assertContains(response, 'X-Burguer')
+        self.assertNotContains(response, MARCADOR_CSRF)
+
+    def test_alteracao_de_produto_invalida_cache(self):
+        self.client.get(reverse('menu_cardapio'))
+        versao = versao_catalogo()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produto.nome = 'X-Salada'
+            self.produto.save()
+        self.assertNotEqual(versao, versao_catalogo())
+        response = self.client.get(reverse('menu_cardapio'))
+        self.assertContains(response, 'X-Salada')
+
+    def test_menu_responde_304_com_etag_valido(self):
+        self.client.get(reverse('menu_cardapio'))
+        response = self.client.get(reverse('menu_cardapio'))
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get(
+            reverse('menu_cardapio'), headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class CatalogoCompartilhadoTests(SimpleTestCase):
+    def _ambiente(self, diretorio):
+        return dict(
+            os.environ, NETBURGUER_PERFIL='producao', NETBURGUER_CACHE_DIR=diretorio,
+            DJANGO_SETTINGS_MODULE='netburger.settings',
+        )
+
+    def test_edicao_em_um_worker_chega_aos_demais(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            ambiente = self._ambiente(diretorio)
+            # "Worker" de longa duracao: le a versao, espera, le de novo.
+            worker = subprocess.Popen(
+                [sys.executable, '-c',
+                 'import sys, django; django.setup(); from cardapio.catalogo import versao_catalogo; '
+                 'print(versao_catalogo(), flush=True); sys.stdin.readline(); print(versao_catalogo())'],
+                cwd=settings.BASE_DIR, env=ambiente, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            )
+            antes = worker.stdout.readline().strip()
+            edicao = subprocess.run(
+                [sys.executable, '-c',
+                 'import django; django.setup(); from cardapio.catalogo import invalidar_catalogo; '
+                 'invalidar_catalogo()'],
+                cwd=settings.BASE_DIR, env=ambiente, capture_output=True, text=True, timeout=60,
+            )
+            self.assertEqual(edicao.returncode, 0, edicao.stderr)
+            depois, _ = worker.communicate('\n', timeout=60)
+
+        self.assertGreater(int(depois.strip()), int(antes))
+
+
+class HistoricoPaginacaoTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', password='senha')
+        self.client.force_login(self.user)
+        agora = timezone.now()
+        # Dois pedidos com o mesmo horario garantem o desempate pelo id.
+        for i in range(5):
+            Pedido.objects.create(
+                nome_cliente=f'Cliente {i}',
+                endereco_entrega='Rua A',
+                data_criacao=agora - timedelta(minutes=i // 2),
+                total_final=Decimal('10.00'),
+            )
+
+    def test_paginas_por_cursor_cobrem_todos_os_pedidos(self):
+        vistos = []
+        url = reverse('historico_pedidos') + '?por_pagina=2'
+        while url:
+            response = self.client.get(url)
+            vistos.extend(p.id for p in response.context['pedidos'])
+            proxima = response.context.get('proxima_pagina')
+            url = reverse('historico_pedidos') + '?' + proxima if proxima else None
+        esperado = list(Pedido.objects.order_by('-data_criacao', '-id').values_list('id', flat=True))
+        self.assertEqual(vistos, esperado)
+
+    def test_modo_streaming_envia_todas_as_linhas(self):
+        response = self.client.get(reverse('historico_pedidos'), {'stream': '1'})
+        self.assertTrue(response.streaming)
+        conteudo = b''.join(response.streaming_content).decode()
+        for i in range(5):
+            self.assertIn(f'Cliente {i}', conteudo)
+        self.assertNotIn(MARCADOR_LINHAS, conteudo)
+
+
+class PedidoIndicesTests(TestCase):
+    def test_filtro_por_periodo_e_semiaberto_no_fuso_local(self):
+        meia_noite = timezone.make_aware(datetime(2025, 3, 2))
+        dentro = Pedido.objects.create(nome_cliente='A', endereco_entrega='Rua A', data_criacao=meia_noite)
+        Pedido.objects.create(
+            nome_cliente='B', endereco_entrega='Rua B', data_criacao=meia_noite + timedelta(days=1)
+        )
+        pedidos = _filtrar_periodo(Pedido.objects.all(), '2025-03-02', date(2025, 3, 2))
+        self.assertEqual(list(pedidos), [dentro])
+
+    def test_consulta_por_periodo_usa_indice(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plano de consulta verificado apenas no SQLite.')
+        pedidos = _filtrar_periodo(
+            Pedido.objects.order_by('-data_criacao', '-id'), '2025-03-01', '2025-03-31'
+        )
+        plano = pedidos.explain()
+        self.assertIn('USING', plano)
+        self.assertRegex(plano, r'pedido_data_(id|total)_idx')
+
+
+class VendaDiariaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        # Os recibos das tarefas vao para um diretorio temporario.
+        configuracao = self.settings(RECIBOS_DIR=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.client.force_login(User.objects.create_user('admin', password='senha'))
+        self.produtos = [
+            Produto.objects.create(nome=f'Burguer {i}', descricao='...', preco=Decimal('10.00'))
+            for i in range(3)
+        ]
+
+    def _finalizar_pedido(self):
+        for produto in self.produtos:
+            self.client.post(reverse('adicionar_ao_carrinho', args=[produto.id]), {'quantidade': 1})
+        response = self.client.post(
+            reverse('finalizar_pedido'), {'nome': 'Maria', 'endereco': 'Rua A, 10'}
+        )
+        processar_pendentes()
+        return response
+
+    def test_checkout_atualiza_consolidado_do_dia(self):
+        self._finalizar_pedido()
+        self._finalizar_pedido()
+        dia = VendaDiaria.objects.get(data=timezone.localdate())
+        self.assertEqual(dia.qtd_pedidos, 2)
+        self.assertEqual(dia.total_bruto, Decimal('60.00'))
+        self.assertEqual(dia.desconto_total, Decimal('6.00'))
+        self.assertEqual(dia.total_final, Decimal('54.00'))
+
+        response = self.client.get(reverse('relatorio_vendas'))
+        self.assertEqual(response.context['qtd_pedidos'], 2)
+        self.assertEqual(response.context['total_mensal'], Decimal('54.00'))
+
+        self.assertEqual(ItemPedido.objects.count(), 6)
+        ranking = response.context['ranking_produtos']
+        self.assertEqual(len(ranking), 3)
+        self.assertEqual(ranking[0]['qtd_vendida'], 2)
+        self.assertEqual(ranking[0]['receita'], Decimal('20.00'))
+
+    def test_reconstrucao_reproduz_consolidado_incremental(self):
+        self._finalizar_pedido()
+        Pedido.objects.create(
+            nome_cliente='Antigo',
+            endereco_entrega='Rua B',
+            data_criacao=timezone.now() - timedelta(days=40),
+            total_bruto=Decimal('5.00'),
+            total_final=Decimal('5.00'),
+        )
+        incremental = VendaDiaria.objects.get(data=timezone.localdate())
+        call_command('reconstruir_vendas_diarias', stdout=StringIO())
+        self.assertEqual(VendaDiaria.objects.count(), 2)
+        reconstruido = VendaDiaria.objects.get(data=timezone.localdate())
+        self.assertEqual(reconstruido.qtd_pedidos, incremental.qtd_pedidos)
+        self.assertEqual(reconstruido.total_final, incremental.total_final)
+
+    def test_kpis_batem_com_o_ranking_sem_o_worker(self):
+        for produto in self.produtos:
+            self.client.post(reverse('adicionar_ao_carrinho', args=[produto.id]), {'quantidade': 1})
+        self.client.post(reverse('finalizar_pedido'), {'nome': 'Maria', 'endereco': 'Rua A, 10'})
+        self.assertTrue(Tarefa.objects.filter(status=Tarefa.PENDENTE).exists())
+
+        response = self.client.get(reverse('relatorio_vendas'))
+        self.assertEqual(response.context['qtd_pedidos'], 1)
+        self.assertEqual(response.context['total_mensal'], Decimal('27.00'))
+        self.assertEqual(sum(item['receita'] for item in response.context['ranking_produtos']), Decimal('30.00'))
+
+    def test_consolidar_de_novo_nao_conta_o_pedido_duas_vezes(self):
+        pedido = Pedido.objects.create(
+            nome_cliente='Ana', endereco_entrega='Rua C', total_bruto=Decimal('8.00'),
+            total_final=Decimal('8.00'),
+        )
+        consolidar_venda(pedido_id=pedido.id)
+        consolidar_venda(pedido_id=pedido.id)
+        call_command('reconstruir_vendas_diarias', stdout=StringIO())
+        consolidar_venda(pedido_id=pedido.id)
+        dia = VendaDiaria.objects.get()
+        self.assertEqual(dia.qtd_pedidos, 1)
+        self.assertEqual(dia.total_final, Decimal('8.00'))
+
+    def test_relatorio_pdf_conta_pedidos_ainda_na_fila(self):
+        self._finalizar_pedido()
+        # Pedido gravado fora do checkout, ausente do consolidado.
+        Pedido.objects.create(nome_cliente='Ana', endereco_entrega='Rua C', total_final=Decimal('8.00'))
+        dias = vendas_por_dia(*intervalo_mes(timezone.localdate()))
+        self.assertEqual(len(dias), 1)
+        self.assertEqual(dias[0]['dia'], timezone.localdate())
+        self.assertEqual(dias[0]['qtd_pedidos'], 2)
+        self.assertEqual(dias[0]['total_final'], Decimal('35.00'))
+
+
+class VendaDiariaMigracaoTests(TransactionTestCase):
+    def test_migracao_preenche_consolidado_com_pedidos_existentes(self):
+        from django.db.migrations.executor import MigrationExecutor
+
+        antes = [('cardapio', '0003_pedido_indices_data_criacao')]
+        depois = [('cardapio', '0004_vendadiaria')]
+        executor = MigrationExecutor(connection)
+        executor.migrate(antes)
+        self.addCleanup(call_command, 'migrate', verbosity=0)
+        estado = MigrationExecutor(connection).loader.project_state(antes)
+        PedidoAntigo = estado.apps.get_model('cardapio', 'Pedido')
+        for total in ('10.00', '15.50'):
+            PedidoAntigo.objects.create(
+                nome_cliente='Antigo', endereco_entrega='Rua A',
+                total_bruto=Decimal(total), total_final=Decimal(total),
+            )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(depois)
+        estado = executor.loader.project_state(depois)
+        dia = estado.apps.get_model('cardapio', 'VendaDiaria').objects.get()
+        self.assertEqual(dia.data, timezone.localdate())
+        self.assertEqual(dia.qtd_pedidos, 2)
+        self.assertEqual(dia.total_final, Decimal('25.50'))
+
+
+class ItemPedidoMigracaoTests(TransactionTestCase):
+    def test_backfill_ignora_itens_malformados(self):
+        from django.db.migrations.executor import MigrationExecutor
+
+        antes = [('cardapio', '0005_itempedido')]
+        depois = [('cardapio', '0006_preencher_itempedido')]
+        executor = MigrationExecutor(connection)
+        executor.migrate(antes)
+        self.addCleanup(call_command, 'migrate', verbosity=0)
+        PedidoAntigo = executor.loader.project_state(antes).apps.get_model('cardapio', 'Pedido')
+        pedido = PedidoAntigo.objects.create(
+            nome_cliente='Antigo',
+            endereco_entrega='Rua A',
+            itens_json=json.dumps([
+                'texto solto',
+                {'produto_id': 1, 'nome': 'Sem numero', 'quantidade': 'duas', 'preco': '5.00'},
+                {'produto_id': 1, 'nome': 'Negativo', 'quantidade': -3, 'preco': '5.00'},
+                {'produto_id': [1], 'nome': 'Valido', 'quantidade': 2, 'preco': '5.00'},
+            ]),
+        )
+        PedidoAntigo.objects.create(nome_cliente='Objeto', endereco_entrega='Rua B', itens_json='{"a": 1}')
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(depois)
+        ItemAntigo = executor.loader.project_state(depois).apps.get_model('cardapio', 'ItemPedido')
+        item = ItemAntigo.objects.get()
+        self.assertEqual((item.pedido_id, item.nome, item.quantidade), (pedido.id, 'Valido', 2))
+        self.assertIsNone(item.produto_id)
+        self.assertEqual(item.total, Decimal('10.00'))
+
+
+class HistoricoExportarTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', password='senha'))
+        Pedido.objects.create(
+            nome_cliente='Joao',
+            endereco_entrega='Rua A',
+            total_final=Decimal('30.00'),
+            itens_json=json.dumps([
+                {'produto_id': 1, 'nome': 'X-Burguer', 'quantidade': 2, 'preco': '10.00', 'total': '20.00'},
+                {'produto_id': 2, 'nome': 'Batata', 'quantidade': 1, 'preco': '10.00', 'total': '10.00'},
+            ]),
+        )
+
+    def _linhas(self, **params):
+        response = self.client.get(reverse('historico_exportar'), params)
+        self.assertTrue(response.streaming)
+        conteudo = b''.join(response.streaming_content).decode()
+        return list(csv.reader(conteudo.splitlines()))
+
+    def test_formato_largo_resume_itens_em_uma_coluna(self):
+        linhas = self._linhas(itens='largo')
+        self.assertEqual(len(linhas), 2)
+        self.assertEqual(linhas[1][-1], '2x X-Burguer; 1x Batata')
+
+    def test_formato_longo_gera_uma_linha_por_item(self):
+        linhas = self._linhas(itens='longo')
+        self.assertEqual(len(linhas), 3)
+        self.assertEqual([linha[8] for linha in linhas[1:]], ['X-Burguer', 'Batata'])
+
+    def test_textos_com_formula_sao_neutralizados(self):
+        Pedido.objects.create(
+            nome_cliente='=HYPERLINK("http://exemplo.com","clique")',
+            endereco_entrega='@SUM(A1:A2)',
+            itens_json=json.dumps([{'produto_id': 1, 'nome': '+cmd', 'quantidade': 1,
+                                    'preco': '1.00', 'total': '1.00'}]),
+        )
+        linha = self._linhas(itens='longo')[1]
+        self.assertEqual(linha[2], '\'=HYPERLINK("http://exemplo.com","clique")')
+        self.assertEqual(linha[3], "'@SUM(A1:A2)")
+        self.assertEqual(linha[8], "'+cmd")
+        # Valores numericos nao mudam.
+        self.assertEqual(linha[6], '0.00')
+
+
+class RelatorioPdfTests(TestCase):
+    def setUp(self):
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            self.skipTest('reportlab nao instalado.')
+        for i in range(450):
+            Pedido.objects.create(
+                nome_cliente=f'Cliente {i}', endereco_entrega='Rua A', total_final=Decimal('12.50')
+            )
+
+    def test_gera_pdf_do_mes_e_muda_nome_com_novo_pedido(self):
+        with tempfile.TemporaryDirectory() as diretorio, self.settings(RELATORIOS_PDF_DIR=diretorio):
+            hoje = timezone.localdate()
+            destino = caminho_relatorio(hoje)
+            gerar_relatorio_pdf(hoje, destino)
+            with open(destino, 'rb') as arquivo:
+                self.assertEqual(arquivo.read(5), b'%PDF-')
+
+            Pedido.objects.create(nome_cliente='Novo', endereco_entrega='Rua B')
+            self.assertNotEqual(caminho_relatorio(hoje), destino)
+
+
+class RelatorioPdfFilaTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', password='senha'))
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+
+    def test_pdf_inexistente_enfileira_uma_unica_tarefa(self):
+        with self.settings(RELATORIOS_PDF_DIR=self.diretorio.name):
+            for _ in range(3):
+                response = self.client.get(reverse('relatorio_vendas_pdf'), {'mes': '2025-03'})
+                self.assertEqual(response.status_code, 202)
+        tarefa_pdf = Tarefa.objects.get()
+        self.assertEqual(tarefa_pdf.nome, 'gerar_relatorio_mensal')
+        self.assertEqual(json.loads(tarefa_pdf.argumentos), {'mes': '2025-03'})
+
+    def test_versao_nova_apaga_as_anteriores_do_mes(self):
+        def criar(nome):
+            caminho = os.path.join(self.diretorio.name, nome)
+            open(caminho, 'wb').close()
+            return caminho
+
+        antiga = criar('relatorio_2025_03_7.pdf')
+        atual = criar('relatorio_2025_03_12.pdf')
+        mais_nova = criar('relatorio_2025_03_15.pdf')
+        outro_mes = criar('relatorio_2025_02_3.pdf')
+        remover_versoes_antigas(atual)
+        self.assertFalse(os.path.exists(antiga))
+        for caminho in (atual, mais_nova, outro_mes):
+            self.assertTrue(os.path.exists(caminho))
+
+
+class CarrinhoApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.produtos = [
+            Produto.objects.create(nome=f'Burguer {i}', descricao='...', preco=Decimal('10.00'))
+            for i in range(3)
+        ]
+
+    def test_adicionar_via_ajax_responde_json_sem_renderizar_menu(self):
+        response = self.client.post(
+            reverse('adicionar_ao_carrinho', args=[self.produtos[0].id]),
+            {'quantidade': 2},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.json(), {'success': True, 'count': 2})
+        self.assertEqual(self.client.get(reverse('api_carrinho_contagem')).json(), {'count': 2})
+
+    def test_formulario_sem_javascript_continua_redirecionando(self):
+        response = self.client.post(reverse('adicionar_ao_carrinho', args=[self.produtos[0].id]))
+        self.assertRedirects(response, reverse('menu_cardapio'))
+
+    def test_resumo_aplica_desconto_do_combo(self):
+        for produto in self.produtos:
+            self.client.post(reverse('api_carrinho_adicionar', args=[produto.id]))
+        self.client.post(
+            reverse('api_carrinho_atualizar', args=[self.produtos[0].id]), {'quantidade': 3}
+        )
+        resumo = self.client.get(reverse('api_carrinho_resumo')).json()
+        self.assertEqual(resumo['count'], 5)
+        self.assertEqual(resumo['total_bruto'], '50.00')
+        self.assertEqual(resumo['desconto_aplicado'], '5.00')
+        self.assertTrue(resumo['tem_desconto'])
+
+        resumo = self.client.post(
+            reverse('api_carrinho_remover', args=[self.produtos[1].id])
+        ).json()
+        self.assertEqual(resumo['count'], 4)
+        self.assertFalse(resumo['tem_desconto'])
+
+
+@override_settings(ROOT_URLCONF='netburger.urls_asgi')
+class ViewsAssincronasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.produtos = [
+            Produto.objects.create(nome=f'Burguer {i}', descricao='...', preco=Decimal('10.00'))
+            for i in range(3)
+        ]
+
+    def test_perfil_asgi_usa_views_assincronas(self):
+        self.assertIs(resolve(reverse('menu_cardapio')).func, views.menu_cardapio_async)
+        self.assertIs(resolve(reverse('carrinho_detalhe')).func, views.carrinho_detalhe_async)
+        self.assertIs(
+            resolve(reverse('api_carrinho_contagem')).func, views.api_carrinho_contagem_async
+        )
+
+    async def test_menu_assincrono_responde_304_com_etag(self):
+        response = await self.async_client.get(reverse('menu_cardapio'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Burguer 2')
+        self.assertNotContains(response, MARCADOR_CSRF)
+
+        response = await self.async_client.get(
+            reverse('menu_cardapio'), headers={'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_carrinho_e_contagem_assincronos(self):
+        for produto in self.produtos[:2]:
+            await self.async_client.post(
+                reverse('adicionar_ao_carrinho', args=[produto.id]),
+                {'quantidade': 2},
+                headers={'X-Requested-With': 'XMLHttpRequest'},
+            )
+        response = await self.async_client.get(reverse('api_carrinho_contagem'))
+        self.assertEqual(response.json(), {'count': 4})
+        response = await self.async_client.post(reverse('api_carrinho_contagem'))
+        self.assertEqual(response.status_code, 405)
+
+        await self.produtos[0].adelete()
+        invalidar_catalogo()  # o sinal so roda no commit, que o TestCase nao faz
+        response = await self.async_client.get(reverse('carrinho_detalhe'))
+        self.assertContains(response, 'nao estao mais disponiveis')
+        self.assertNotContains(response, 'Burguer 0')
+        self.assertEqual(response.context['total_bruto'], Decimal('20.00'))
+
+
+class CarrinhoSessaoTests(TestCase):
+    """Mede gravacoes de sessao e tamanho do carrinho serializado."""
+
+    def setUp(self):
+        cache.clear()
+        self.produtos = [
+            Produto.objects.create(
+                nome=f'Burguer Artesanal Especial {i}',
+                descricao='...',
+                preco=Decimal('29.90'),
+            )
+            for i in range(10)
+        ]
+
+    def _contar_gravacoes(self, fluxo):
+        gravacoes = []
+        original = SessionStore.save
+
+        def contar(sessao, *args, **kwargs):
+            gravacoes.append(sessao.session_key)
+            return original(sessao, *args, **kwargs)
+
+        with mock.patch.object(SessionStore, 'save', contar):
+            fluxo()
+        return len(gravacoes)
+
+    def test_requisicoes_sem_mudanca_nao_regravam_sessao(self):
+        produto_id = self.produtos[0].id
+        self.client.post(reverse('adicionar_ao_carrinho', args=[produto_id]), {'quantidade': 2})
+
+        def sem_mudanca():
+            self.client.post(reverse('atualizar_carrinho', args=[produto_id]), {'quantidade': 2})
+            self.client.post(reverse('api_carrinho_remover', args=[self.produtos[1].id]))
+            self.client.get(reverse('carrinho_detalhe'))
+            self.client.get(reverse('api_carrinho_contagem'))
+
+        self.assertEqual(self._contar_gravacoes(sem_mudanca), 0)
+
+        def com_mudanca():
+            self.client.post(reverse('atualizar_carrinho', args=[produto_id]), {'quantidade': 3})
+
+        self.assertEqual(self._contar_gravacoes(com_mudanca), 1)
+
+    def test_formato_compacto_reduz_tamanho_da_sessao(self):
+        for produto in self.produtos:
+            self.client.post(reverse('api_carrinho_adicionar', args=[produto.id]))
+
+        sessao = self.client.session
+        compacto = json.dumps(sessao['carrinho'])
+        antigo = json.dumps({
+            str(produto.id): {
+                'id': produto.id,
+                'nome': produto.nome,
+                'preco': str(produto.preco),
+                'quantidade': 1,
+            }
+            for produto in self.produtos
+        })
+        self.assertLess(len(compacto) * 2, len(antigo))
+
+    def test_carrinho_no_formato_antigo_continua_valido(self):
+        produto = self.produtos[0]
+        sessao = self.client.session
+        sessao['carrinho'] = {
+            str(produto.id): {'id': produto.id, 'nome': produto.nome, 'preco': '1.00', 'quantidade': 2}
+        }
+        sessao.save()
+        resumo = self.client.get(reverse('api_carrinho_resumo')).json()
+        self.assertEqual(resumo['count'], 2)
+        self.assertEqual(resumo['total_bruto'], '59.80')
+
+
+class PerfilSqliteConcorrenciaTests(SimpleTestCase):
+    def test_checkouts_paralelos_sem_erros_de_lock(self):
+        ambiente = dict(os.environ, NETBURGUER_PERFIL='producao')
+        resultado = subprocess.run(
+            [sys.executable, 'manage.py', 'carga_checkout', '--threads', '8', '--pedidos', '5'],
+            cwd=settings.BASE_DIR,
+            env=ambiente,
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        self.assertIn('journal_mode=wal', resultado.stdout)
+        self.assertIn('checkouts_ok=40 erros=0 pedidos_gravados=40', resultado.stdout)
+
+
+class CheckoutIdempotenteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        # Os recibos das tarefas vao para um diretorio temporario.
+        configuracao = self.settings(RECIBOS_DIR=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.produto = Produto.objects.create(nome='X-Burguer', descricao='...', preco=Decimal('20.00'))
+        self.client.post(reverse('adicionar_ao_carrinho', args=[self.produto.id]), {'quantidade': 2})
+        self.token = self.client.get(reverse('finalizar_pedido')).context['token_checkout']
+        self.dados = {'nome': 'Ana', 'endereco': 'Rua C, 3', 'token_checkout': self.token}
+
+    def _checkout(self):
+        return self.client.post(reverse('finalizar_pedido'), self.dados)
+
+    def test_reenvio_devolve_mesmo_link_sem_novo_pedido(self):
+        primeira = self._checkout()
+        with self.assertNumQueries(1):  # apenas a leitura da sessao
+            segunda = self._checkout()
+        self.assertEqual(primeira['Location'], segunda['Location'])
+        self.assertTrue(primeira['Location'].startswith('/p/'))
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(Tarefa.objects.count(), 2)
+        processar_pendentes()
+        self.assertEqual(VendaDiaria.objects.get().qtd_pedidos, 1)
+
+    def test_envio_concorrente_com_mesmo_token_reaproveita_pedido(self):
+        self._checkout()
+        # Simula a segunda requisicao que carregou a sessao antes do primeiro commit.
+        sessao = self.client.session
+        sessao['carrinho'] = {'i': {str(self.produto.id): 2}}
+        del sessao['checkouts_concluidos']
+        sessao.save()
+
+        response = self._checkout()
+        pedido = Pedido.objects.get()
+        self.assertEqual(response['Location'], reverse('pedido_link', args=[views._token_pedido(pedido.id)]))
+        self.assertEqual(Pedido.objects.count(), 1)
+        self.assertEqual(ItemPedido.objects.count(), 1)
+
+
+class PedidoLinkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.produto = Produto.objects.create(nome='X-Tudo', descricao='...', preco=Decimal('25.00'))
+
+    def _checkout(self, quantidade=1):
+        self.client.post(reverse('adicionar_ao_carrinho', args=[self.produto.id]), {'quantidade': quantidade})
+        return self.client.post(reverse('finalizar_pedido'), {'nome': 'Bia', 'endereco': 'Rua E, 5'})
+
+    def test_checkout_grava_mensagem_e_redireciona_pelo_link_curto(self):
+        response = self._checkout()
+        pedido = Pedido.objects.get()
+        self.assertIn('1x X-Tudo', pedido.mensagem)
+        self.assertLess(len(response['Location']), 40)
+
+        with self.assertNumQueries(1):
+            destino = self.client.get(response['Location'])
+        self.assertTrue(destino['Location'].startswith('https://api.whatsapp.com/send'))
+        self.assertIn('X-Tudo', unquote(destino['Location']))
+        self.assertIn('private', destino['Cache-Control'])
+
+    def test_mensagem_longa_vira_pagina_para_copiar(self):
+        response = self._checkout()
+        with self.settings(WHATSAPP_URL_MAXIMO=100):
+            pagina = self.client.get(response['Location'])
+        self.assertEqual(pagina.status_code, 200)
+        self.assertContains(pagina, 'Copiar mensagem')
+        self.assertContains(pagina, '1x X-Tudo')
+        self.assertNotIn('text=', pagina.context['whatsapp_link'])
+
+        resumo = self.client.get(response['Location'], {'resumo': '1'})
+        self.assertContains(resumo, 'text=')
+
+    def test_token_adulterado_ou_de_outro_pedido_da_404(self):
+        self._checkout()
+        pedido = Pedido.objects.get()
+        token = views._token_pedido(pedido.id)
+        outro = views._token_pedido(pedido.id + 1)
+        adulterado = outro.split('-')[0] + '-' + token.split('-')[1]
+        self.assertEqual(self.client.get(reverse('pedido_link', args=[adulterado])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('pedido_link', args=[outro])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('pedido_link', args=['zz'])).status_code, 404)
+
+    def test_pedido_antigo_sem_mensagem_e_preenchido_no_primeiro_acesso(self):
+        self._checkout()
+        Pedido.objects.update(mensagem='')
+        pedido = Pedido.objects.get()
+        self.client.get(reverse('pedido_link', args=[views._token_pedido(pedido.id)]))
+        pedido.refresh_from_db()
+        self.assertIn('*TOTAL: R$ 25.00*', pedido.mensagem)
+
+
+class CarrinhoRevalidacaoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.produtos = [
+            Produto.objects.create(nome=f'Burguer {i}', descricao='...', preco=Decimal('10.00'))
+            for i in range(2)
+        ]
+        for produto in self.produtos:
+            self.client.post(reverse('api_carrinho_adicionar', args=[produto.id]))
+
+    def _alterar_catalogo(self, alteracao):
+        with self.captureOnCommitCallbacks(execute=True):
+            alteracao()
+
+    def test_carrinho_usa_preco_atual_do_catalogo(self):
+        produto = self.produtos[0]
+        produto.preco = Decimal('15.00')
+        self._alterar_catalogo(produto.save)
+        self.client.get(reverse('carrinho_detalhe'))
+        with self.assertNumQueries(1):  # apenas a sessao
+            response = self.client.get(reverse('carrinho_detalhe'))
+        self.assertEqual(response.context['total_bruto'], Decimal('25.00'))
+
+    def test_sessao_guarda_so_as_quantidades(self):
+        sessao = self.client.session
+        sessao['carrinho'] = {'v': 1, 'i': {str(self.produtos[0].id): 1}}
+        sessao.save()
+        self.client.post(reverse('api_carrinho_adicionar', args=[self.produtos[1].id]))
+        self.assertEqual(
+            self.client.session['carrinho'],
+            {'i': {str(self.produtos[0].id): 1, str(self.produtos[1].id): 1}},
+        )
+
+    def test_produto_removido_e_sinalizado_e_bloqueia_checkout(self):
+        self._alterar_catalogo(self.produtos[0].delete)
+        response = self.client.get(reverse('finalizar_pedido'))
+        self.assertRedirects(response, reverse('carrinho_detalhe'), fetch_redirect_response=False)
+
+        response = self.client.get(reverse('carrinho_detalhe'))
+        avisos = [str(m) for m in response.context['messages']]
+        self.assertTrue(any('removidos' in aviso for aviso in avisos))
+        self.assertEqual(response.context['total_bruto'], Decimal('10.00'))
+        self.assertEqual(len(response.context['carrinho']), 1)
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registro.limpar()
+        Produto.objects.create(nome='X-Burguer', descricao='...', preco=Decimal('18.90'))
+
+    def test_registra_metricas_por_view_e_envia_server_timing(self):
+        response = self.client.get(reverse('menu_cardapio'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.client.get(reverse('carrinho_detalhe'))
+
+        self.client.force_login(User.objects.create_user('admin', password='senha'))
+        texto = self.client.get(reverse('metricas_prometheus')).content.decode()
+        self.assertIn('netburguer_requisicao_segundos_count{view="menu_cardapio"} 1', texto)
+        self.assertIn('netburguer_requisicao_segundos_count{view="carrinho_detalhe"} 1', texto)
+        self.assertRegex(texto, r'netburguer_db_consultas_total\{view="menu_cardapio"\} [1-9]')
+        self.assertRegex(texto, r'netburguer_template_segundos_total\{view="carrinho_detalhe"\} 0\.\d*[1-9]')
+
+    def test_metricas_exigem_login(self):
+        response = self.client.get(reverse('metricas_prometheus'))
+        self.assertEqual(response.status_code, 302)
+
+
+class LimitesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['limites'].clear()
+        # Os baldes esgotados aqui (inclusive o do IP do test client) nao passam adiante.
+        self.addCleanup(caches['limites'].clear)
+        registro.limpar()
+        self.produto = Produto.objects.create(nome='X-Bacon', descricao='...', preco=Decimal('22.00'))
+        # Cliente com sessao desde o inicio: o balde e o da sessao, nao o do IP.
+        self.client.session.save()
+
+    def _adicionar(self, **extra):
+        return self.client.post(reverse('api_carrinho_adicionar', args=[self.produto.id]), **extra)
+
+    @override_settings(LIMITES_TAXA={'carrinho': {'capacidade': 2, 'por_segundo': 0.1}})
+    def test_balde_esgotado_recusa_com_retry_after_e_conta_na_metrica(self):
+        self.assertEqual(self._adicionar().status_code, 200)
+        self.assertEqual(self._adicionar().status_code, 200)
+        with self.assertNumQueries(1):  # apenas a leitura da sessao
+            recusada = self._adicionar(HTTP_ACCEPT='application/json')
+        self.assertEqual(recusada.status_code, 429)
+        self.assertEqual(recusada['Retry-After'], '10')
+        self.assertEqual(recusada.json()['tentar_em'], 10)
+
+        # O formulario divide o balde com a API e recebe a pagina HTML.
+        pagina = self.client.post(reverse('adicionar_ao_carrinho', args=[self.produto.id]))
+        self.assertContains(pagina, 'Tente novamente em 10 segundo(s)', status_code=429)
+        # Leituras nao consomem fichas.
+        self.assertEqual(self.client.get(reverse('carrinho_detalhe')).status_code, 200)
+
+        self.client.force_login(User.objects.create_user('admin', password='senha'))
+        texto = self.client.get(reverse('metricas_prometheus')).content.decode()
+        self.assertIn('netburguer_eventos_total{evento="limite_taxa",view="api_carrinho_adicionar"} 1', texto)
+        self.assertIn('netburguer_eventos_total{evento="limite_taxa",view="adicionar_ao_carrinho"} 1', texto)
+
+    @override_settings(LIMITES_TAXA={'carrinho': {'capacidade': 2, 'por_segundo': 0.1}})
+    def test_sessionid_inventado_nao_renova_o_balde(self):
+        cliente = Client()
+        respostas = []
+        for _ in range(3):
+            cliente.cookies[settings.SESSION_COOKIE_NAME] = uuid.uuid4().hex
+            respostas.append(
+                cliente.post(reverse('api_carrinho_adicionar', args=[self.produto.id])).status_code
+            )
+        self.assertEqual(respostas, [200, 200, 429])
+
+    def test_checkout_acima_da_concorrencia_e_recusado_na_hora(self):
+        self._adicionar()
+        dados = {'nome': 'Caio', 'endereco': 'Rua F, 6'}
+        with mock.patch.dict(limites._em_andamento, {'checkout': 4}):
+            recusada = self.client.post(reverse('finalizar_pedido'), dados)
+        self.assertEqual(recusada.status_code, 429)
+        self.assertEqual(recusada['Retry-After'], '2')
+        self.assertFalse(Pedido.objects.exists())
+        self.assertEqual(registro.eventos(), {('limite_concorrencia', 'finalizar_pedido'): 1})
+
+        self.assertEqual(self.client.post(reverse('finalizar_pedido'), dados).status_code, 302)
+        self.assertEqual(limites._em_andamento['checkout'], 0)
+
+    @override_settings(LIMITES_ATIVOS=False, LIMITES_TAXA={'carrinho': {'capacidade': 1, 'por_segundo': 0.1}})
+    def test_limites_desligados(self):
+        for _ in range(3):
+            self.assertEqual(self._adicionar().status_code, 200)
+
+
+@tarefa(max_tentativas=2)
+def _tarefa_que_falha(nome):
+    Produto.objects.create(nome=nome, descricao='...', preco=Decimal('1.00'))
+    raise RuntimeError('falha simulada')
+
+
+@tarefa()
+def _tarefa_que_grava(nome):
+    Produto.objects.create(nome=nome, descricao='...', preco=Decimal('1.00'))
+
+
+class FilaTarefasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        produto = Produto.objects.create(nome='X-Salada', descricao='...', preco=Decimal('15.00'))
+        self.client.post(reverse('adicionar_ao_carrinho', args=[produto.id]), {'quantidade': 2})
+
+    def test_checkout_enfileira_efeitos_e_worker_executa(self):
+        with self.settings(RECIBOS_DIR=self.diretorio.name):
+            response = self.client.post(
+                reverse('finalizar_pedido'), {'nome': 'Rita & Filhos', 'endereco': 'Rua D, 4'}
+            )
+            self.assertTrue(response['Location'].startswith('/p/'))
+            pedido = Pedido.objects.get()
+            self.assertEqual(
+                sorted(Tarefa.objects.values_list('nome', flat=True)),
+                ['gerar_recibo', 'notificar_cozinha'],
+            )
+            # O consolidado do dia e gravado pelo proprio checkout.
+            self.assertEqual(VendaDiaria.objects.get().total_final, Decimal('30.00'))
+
+            call_command('processar_tarefas', '--uma-vez', stdout=StringIO())
+            with open(caminho_recibo(pedido.id), encoding='utf-8') as arquivo:
+                recibo = arquivo.read()
+
+        self.assertEqual(Tarefa.objects.exclude(status=Tarefa.CONCLUIDA).count(), 0)
+        self.assertEqual(VendaDiaria.objects.get().total_final, Decimal('30.00'))
+        self.assertIn('Rita & Filhos', recibo)
+        self.assertIn('2x X-Salada', recibo)
+
+    def test_falha_desfaz_gravacoes_e_reagenda_com_espera(self):
+        _tarefa_que_falha.enfileirar(nome='Nao deve ficar')
+        self.assertEqual(processar_pendentes(), 1)
+        tarefa_falha = Tarefa.objects.get()
+        self.assertEqual(tarefa_falha.status, Tarefa.PENDENTE)
+        self.assertEqual(tarefa_falha.tentativas, 1)
+        self.assertIn('falha simulada', tarefa_falha.ultimo_erro)
+        self.assertGreater(tarefa_falha.executar_em, timezone.now())
+        self.assertFalse(Produto.objects.filter(nome='Nao deve ficar').exists())
+
+        # Antes do fim da espera a tarefa nao e executada de novo.
+        self.assertEqual(processar_pendentes(), 0)
+        Tarefa.objects.update(executar_em=timezone.now())
+        processar_pendentes()
+        tarefa_falha.refresh_from_db()
+        self.assertEqual(tarefa_falha.status, Tarefa.FALHOU)
+        self.assertEqual(tarefa_falha.tentativas, 2)
+
+    def test_reserva_retomada_por_outro_worker_descarta_o_resultado(self):
+        tarefa_lenta = _tarefa_que_grava.enfileirar(nome='Gravado duas vezes')
+        antes = timezone.now()
+        self.assertEqual(_reservar(antes), tarefa_lenta.id)
+        # O primeiro worker passa do TAREFAS_TIMEOUT e outro retoma a tarefa.
+        depois = antes + timedelta(seconds=settings.TAREFAS_TIMEOUT + 1)
+        self.assertEqual(_reservar(depois), tarefa_lenta.id)
+
+        self.assertFalse(executar(tarefa_lenta.id, antes))
+        self.assertFalse(Produto.objects.filter(nome='Gravado duas vezes').exists())
+        tarefa_lenta.refresh_from_db()
+        self.assertEqual(tarefa_lenta.status, Tarefa.EXECUTANDO)
+        self.assertEqual(tarefa_lenta.reservada_em, depois)
+
+        self.assertTrue(executar(tarefa_lenta.id, depois))
+        self.assertEqual(Produto.objects.filter(nome='Gravado duas vezes').count(), 1)
+
+
+class CozinhaFeedTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('cozinha', password='senha'))
+        self.pedidos = [self._pedido(f'Cliente {i}') for i in range(3)]
+
+    def _pedido(self, nome):
+        return Pedido.objects.create(
+            nome_cliente=nome,
+            endereco_entrega='Rua E, 5',
+            total_final=Decimal('12.00'),
+            itens_json=json.dumps([{'nome': 'X-Tudo', 'quantidade': 2, 'total': '24.00'}]),
+        )
+
+    def _eventos(self, response):
+        corpo = b''.join(response.streaming_content).decode()
+        return [bloco for bloco in corpo.split('\n\n') if bloco.startswith('id:')]
+
+    def test_wsgi_entrega_pendentes_desde_last_event_id(self):
+        response = self.client.get(
+            reverse('cozinha_eventos'), HTTP_LAST_EVENT_ID=str(self.pedidos[0].id)
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        eventos = self._eventos(response)
+        self.assertEqual(len(eventos), 2)
+        self.assertTrue(eventos[0].startswith(f'id: {self.pedidos[1].id}\nevent: pedido\n'))
+        dados = json.loads(eventos[1].split('data: ', 1)[1])
+        self.assertEqual(dados['cliente'], 'Cliente 2')
+        self.assertEqual(dados['itens'], [{'nome': 'X-Tudo', 'quantidade': 2}])
+
+    def test_sem_last_event_id_comeca_no_ultimo_pedido(self):
+        eventos = self._eventos(self.client.get(reverse('cozinha_eventos')))
+        self.assertEqual(eventos, [f'id: {self.pedidos[2].id}'])
+
+    def test_exige_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('cozinha_eventos'))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_fonte_unica_repassa_novos_pedidos_a_todas_as_telas(self):
+        tela_nova = fluxo_eventos()
+        tela_retomada = fluxo_eventos(self.pedidos[1].id)
+        self.assertTrue((await anext(tela_nova)).startswith('retry:'))
+        self.assertEqual(await anext(tela_nova), f'id: {self.pedidos[2].id}\n\n')
+        await anext(tela_retomada)
+        self.assertTrue((await anext(tela_retomada)).startswith(f'id: {self.pedidos[2].id}\n'))
+        tarefa_fonte = fonte_pedidos._tarefa
+
+        novo = await Pedido.objects.acreate(
+            nome_cliente='Cliente Novo', endereco_entrega='Rua F', itens_json='[]'
+        )
+        # O sinal acorda a fonte no commit, que o TestCase nao faz.
+        fonte_pedidos.acordar()
+        for tela in (tela_nova, tela_retomada):
+            evento = await asyncio.wait_for(anext(tela), 5)
+            self.assertTrue(evento.startswith(f'id: {novo.id}\nevent: pedido\n'))
+        self.assertIs(fonte_pedidos._tarefa, tarefa_fonte)
+
+        await tela_nova.aclose()
+        await tela_retomada.aclose()
+        self.assertFalse(fonte_pedidos._assinantes)
+
+
+class ProdutosLoteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('admin', password='senha'))
+        self.burguer = Produto.objects.create(nome='Burguer', descricao='Simples', preco=Decimal('20.00'))
+        self.batata = Produto.objects.create(nome='Batata', descricao='Frita', preco=Decimal('10.00'))
+
+    def _importar(self, conteudo, nome='produtos.csv', **extras):
+        arquivo = SimpleUploadedFile(nome, conteudo.encode())
+        return self.client.post(reverse('produto_importar'), dict(arquivo=arquivo, **extras))
+
+    def test_simulacao_mostra_diferencas_sem_gravar(self):
+        csv_exportado = self.client.get(reverse('produto_exportar')).content.decode()
+        self.assertTrue(csv_exportado.startswith('id,nome,descricao,preco'))
+        conteudo = csv_exportado.replace('20.00', '22.50') + ',Refrigerante,Lata,6.00\n'
+
+        response = self._importar(conteudo)
+        previa = response.context['previa']
+        self.assertEqual((previa['criados'], previa['alterados']), (1, 1))
+        acoes = sorted(diferenca['acao'] for diferenca in previa['diferencas'])
+        self.assertEqual(acoes, ['alterar', 'criar', 'igual'])
+        self.burguer.refresh_from_db()
+        self.assertEqual(self.burguer.preco, Decimal('20.00'))
+        self.assertEqual(Produto.objects.count(), 2)
+
+        with mock.patch('cardapio.views.invalidar_catalogo') as invalidar, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('produto_importar'), {
+                'conteudo': previa['conteudo'], 'formato': 'csv', 'aplicar': '1',
+            })
+        self.assertRedirects(response, reverse('produto_listar'))
+        invalidar.assert_called_once()
+        self.burguer.refresh_from_db()
+        self.assertEqual(self.burguer.preco, Decimal('22.50'))
+        self.assertTrue(Produto.objects.filter(nome='Refrigerante', preco=Decimal('6.00')).exists())
+
+    def test_conteudo_reenviado_respeita_o_limite_de_tamanho(self):
+        linha = ',Combo,' + 'x' * 200 + ',10.00\n'
+        conteudo = 'id,nome,descricao,preco\n' + linha * (views.TAMANHO_MAXIMO_LOTE // len(linha) + 1)
+        with mock.patch('cardapio.views._ler_lote_produtos') as ler:
+            response = self.client.post(reverse('produto_importar'), {
+                'conteudo': conteudo, 'formato': 'csv', 'aplicar': '1',
+            })
+        ler.assert_not_called()
+        self.assertIn('Arquivo maior que 1 MB.', [str(m) for m in response.context['messages']])
+        self.assertEqual(Produto.objects.count(), 2)
+
+    def test_linha_invalida_cancela_todo_o_lote(self):
+        conteudo = json.dumps([
+            {'id': self.burguer.id, 'nome': 'Burguer', 'preco': '25.00'},
+            {'nome': 'Sem preco', 'preco': 'abc'},
+            {'id': 999, 'nome': 'Fantasma', 'preco': '1.00'},
+        ])
+        response = self._importar(conteudo, nome='produtos.json', aplicar='1')
+        erros = [str(mensagem) for mensagem in response.context['messages']]
+        self.assertIn('Linha 2: preco invalido.', erros)
+        self.assertIn('Linha 3: produto 999 nao existe.', erros)
+
+        response = self._importar(f'id;nome;preco\n{self.burguer.id};Burguer;25,00\n;X;abc\n')
+        self.assertIn('Linha 3: preco invalido.', [str(m) for m in response.context['messages']])
+        self.burguer.refresh_from_db()
+        self.assertEqual(self.burguer.preco, Decimal('20.00'))
+        self.assertEqual(self.burguer.descricao, 'Simples')
+
+    def test_reajuste_percentual(self):
+        response = self.client.post(reverse('produto_reajustar'), {'percentual': '10'})
+        self.assertEqual(response.context['previa']['alterados'], 2)
+        self.assertEqual(Produto.objects.get(pk=self.batata.pk).preco, Decimal('10.00'))
+
+        # sessao, usuario, leitura dos produtos e um unico UPDATE (com savepoint)
+        with self.assertNumQueries(6):
+            self.client.post(reverse('produto_reajustar'), {'percentual': '10', 'aplicar': '1'})
+        precos = dict(Produto.objects.values_list('nome', 'preco'))
+        self.assertEqual(precos, {'Burguer': Decimal('22.00'), 'Batata': Decimal('11.00')})
+
+
+class BuscaProdutosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pao = Produto.objects.create(nome='X-Pão', descricao='Pão australiano e cheddar', preco=Decimal('28.00'))
+        self.batata = Produto.objects.create(nome='Batata', descricao='Frita com páprica', preco=Decimal('12.00'))
+        self.suco = Produto.objects.create(nome='Suco', descricao='Laranja natural', preco=Decimal('8.00'))
+
+    def _nomes(self, **params):
+        response = self.client.get(reverse('menu_busca'), params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        return [produto.nome for produto in response.context['produtos']]
+
+    def test_busca_ignora_acentos_e_usa_prefixo(self):
+        self.assertEqual(self._nomes(q='pao'), ['X-Pão'])
+        self.assertEqual(self._nomes(q='PAPRI'), ['Batata'])
+        self.assertEqual(self._nomes(q='laranja natu'), ['Suco'])
+        self.assertEqual(self._nomes(q='"pão"* (x)'), ['X-Pão'])
+
+    def test_faixa_de_preco(self):
+        self.assertEqual(self._nomes(preco_min='10', preco_max='20'), ['Batata'])
+        self.assertEqual(self._nomes(q='frita', preco_max='12,00'), ['Batata'])
+        self.assertEqual(self._nomes(q='pao', preco_max='20'), [])
+
+    def test_indice_acompanha_alteracoes(self):
+        self.batata.nome = 'Mandioca'
+        self.batata.save()
+        self.suco.delete()
+        self.assertEqual(self._nomes(q='mandioca'), ['Mandioca'])
+        self.assertEqual(self._nomes(q='batata'), [])
+        self.assertEqual(self._nomes(q='laranja'), [])
+
+        views._aplicar_lote_produtos([Produto(nome='Pão de queijo', descricao='Porção', preco=Decimal('9.00'))], [])
+        self.assertEqual(self._nomes(q='pao', preco_max='10'), ['Pão de queijo'])
+
+    def test_fragmento_e_pagina_completa(self):
+        response = self.client.get(reverse('menu_busca'), {'q': 'inexistente'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertNotContains(response, '<html')
+        self.assertContains(response, 'Nenhum produto encontrado')
+        self.assertIn('X-Requested-With', response['Vary'])
+
+        response = self.client.get(reverse('menu_busca'), {'q': 'pao'})
+        self.assertContains(response, 'id="busca-produtos"')
+        self.assertContains(response, 'value="pao"')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, MARCADOR_CSRF)
+
+
+class EstaticosTests(SimpleTestCase):
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.raiz, ignore_errors=True)
+        configuracao = override_settings(
+            STATIC_ROOT=self.raiz,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'cardapio.estaticos.ArmazenamentoEstaticos'},
+            },
+        )
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.css = staticfiles_storage.stored_name('css/app.css')
+        self.fabrica = RequestFactory()
+
+    def _get(self, caminho, **extras):
+        return estaticos.servir_estatico(self.fabrica.get('/static/' + caminho, **extras), caminho)
+
+    def test_collectstatic_gera_hash_e_variantes(self):
+        self.assertRegex(self.css, r'^css/app\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(self.raiz, self.css + '.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.raiz, 'css/app.css.gz')))
+
+    def test_serve_variante_comprimida_com_cache_longo(self):
+        response = self._get(self.css, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        original = b''.join(self._get(self.css, HTTP_ACCEPT_ENCODING='gzip;q=0').streaming_content)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original)
+
+        response = self._get('css/app.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_304_mantem_vary_e_cache(self):
+        ultima = self._get(self.css)['Last-Modified']
+        response = self._get(self.css, HTTP_IF_MODIFIED_SINCE=ultima, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_caminho_fora_do_static_root(self):
+        with self.assertRaises(Http404):
+            self._get('../settings.py')
+
+    def test_paginas_sem_tailwind_cdn(self):
+        html = render_to_string('base.html')
+        self.assertNotIn('cdn.tailwindcss.com', html)
+        self.assertIn(f'/static/{self.css}', html)
+
+
+class FragmentosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['fragmentos'].clear()
+        self.produto = Produto.objects.create(nome='Burguer Classico', descricao='Carne', preco=Decimal('20.00'))
+
+    def _busca(self, client=None):
+        client = client or self.client
+        return client.get(reverse('menu_busca'), {'q': 'burguer'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_card_segue_a_versao_do_catalogo(self):
+        self.assertContains(self._busca(), 'Burguer Classico')
+        self.produto.nome = 'Burguer Duplo'
+        self.produto.save()
+        # Mesma versao: o card vem do cache de fragmentos.
+        self.assertContains(self._busca(), 'Burguer Classico')
+
+        invalidar_catalogo()
+        response = self._busca()
+        self.assertContains(response, 'Burguer Duplo')
+        self.assertNotContains(response, 'Burguer Classico')
+
+    def test_card_em_cache_recebe_o_token_de_cada_cliente(self):
+        tokens = []
+        for client in (Client(), Client()):
+            response = self._busca(client)
+            self.assertNotContains(response, MARCADOR_CSRF)
+            tokens.append(re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1))
+        self.assertNotEqual(tokens[0], tokens[1])
+
+    def test_perfil_producao_usa_loader_em_cache(self):
+        codigo = (
+            'import django; django.setup(); from django.template import engines; '
+            "engine = engines['django'].engine; "
+            'print([loader.__module__ for loader in engine.template_loaders]); '
+            'print(engine.context_processors)'
+        )
+        resultado = subprocess.run(
+            [sys.executable, '-c', codigo],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, NETBURGUER_PERFIL='producao', DJANGO_SETTINGS_MODULE='netburger.settings'),
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        carregadores, processadores = resultado.stdout.splitlines()
+        self.assertEqual(carregadores, "['django.template.loaders.cached']")
+        self.assertNotIn('context_processors.debug', processadores)
+
+
+class ReplicaLeituraTests(TransactionTestCase):
+    # Inclui um alias 'replica' ja configurado por NETBURGUER_REPLICA_SQLITE.
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        # Replica: segundo arquivo SQLite, copiado do banco de teste pela API de backup.
+        config = dict(connections.settings['default'], NAME=os.path.join(diretorio.name, 'replica.sqlite3'))
+        patcher = mock.patch.dict(connections.settings, {replica.ALIAS_REPLICA: config})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # A conexao pode ja existir (espelho de teste) com as configuracoes antigas.
+        conexao = connections[replica.ALIAS_REPLICA]
+        conexao.close()
+        patcher = mock.patch.object(conexao, 'settings_dict', config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(conexao.close)
+
+        self.client.force_login(User.objects.create_user('admin', password='senha'))
+        self._pedido('Copiado')
+        replica.atualizar_replica()
+        self._pedido('So no primario')
+
+    def _pedido(self, nome):
+        return Pedido.objects.create(nome_cliente=nome, endereco_entrega='Rua G, 7', total_final=Decimal('10.00'))
+
+    def _clientes_no_historico(self):
+        response = self.client.get(reverse('historico_pedidos'))
+        return [pedido.nome_cliente for pedido in response.context['pedidos']]
+
+    def test_historico_e_exportacao_leem_da_replica(self):
+        self.assertEqual(self._clientes_no_historico(), ['Copiado'])
+        csv_texto = b''.join(self.client.get(reverse('historico_exportar')).streaming_content).decode()
+        self.assertIn('Copiado', csv_texto)
+        self.assertNotIn('So no primario', csv_texto)
+
+    def test_quem_grava_le_do_primario_durante_a_janela(self):
+        self.client.post(reverse('produto_criar'), {'nome': 'X-Novo', 'descricao': '...', 'preco': '9.90'})
+        self.assertEqual(self._clientes_no_historico(), ['So no primario', 'Copiado'])
+
+        sessao = self.client.session
+        sessao[replica.CHAVE_PRIMARIO_ATE] = 0
+        sessao.save()
+        self.assertEqual(self._clientes_no_historico(), ['Copiado'])
+
+    def test_sem_replica_le_do_primario(self):
+        with mock.patch.dict(connections.settings):
+            del connections.settings[replica.ALIAS_REPLICA]
+            self.assertEqual(self._clientes_no_historico(), ['So no primario', 'Copiado'])
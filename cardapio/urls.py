@@ -7,23 +7,41 @@ from . import views
 urlpatterns = [
     # Fluxos do cliente
     path('', views.menu_cardapio, name='menu_cardapio'),
+    path('busca/', views.menu_busca, name='menu_busca'),
     path('carrinho/', views.carrinho_detalhe, name='carrinho_detalhe'),
     path('produto/<int:produto_id>/adicionar/', views.adicionar_ao_carrinho, name='adicionar_ao_carrinho'),
     path('carrinho/item/<int:produto_id>/atualizar/', views.atualizar_carrinho, name='atualizar_carrinho'),
     path('checkout/', views.finalizar_pedido, name='finalizar_pedido'),
+    path('p/<slug:token>/', views.pedido_link, name='pedido_link'),
+
+    # API do carrinho (usada pelo site_cart.js)
+    path('carrinho/api/', views.api_carrinho_resumo, name='api_carrinho_resumo'),
+    path('carrinho/api/contagem/', views.api_carrinho_contagem, name='api_carrinho_contagem'),
+    path('carrinho/api/adicionar/<int:produto_id>/', views.api_carrinho_adicionar, name='api_carrinho_adicionar'),
+    path('carrinho/api/item/<int:produto_id>/atualizar/', views.api_carrinho_atualizar, name='api_carrinho_atualizar'),
+    path('carrinho/api/item/<int:produto_id>/remover/', views.api_carrinho_remover, name='api_carrinho_remover'),
 
     # Fluxos de administracao
     path('painel/login/', views.login_admin, name='admin_login'),
     path('painel/logout/', views.logout_admin, name='admin_logout'),
     path('painel/', views.admin_painel, name='admin_painel'),
+    path('painel/metrics/', views.metricas_prometheus, name='metricas_prometheus'),
+    path('painel/cozinha/', views.cozinha_painel, name='cozinha_painel'),
+    path('painel/cozinha/eventos/', views.cozinha_eventos, name='cozinha_eventos'),
 
     # CRUD Produtos
     path('painel/produtos/', views.produto_listar, name='produto_listar'),
     path('painel/produtos/novo/', views.produto_criar, name='produto_criar'),
     path('painel/produtos/editar/<int:produto_id>/', views.produto_editar, name='produto_editar'),
     path('painel/produtos/remover/<int:produto_id>/', views.produto_remover, name='produto_remover'),
+    path('painel/produtos/lote/', views.produto_lote, name='produto_lote'),
+    path('painel/produtos/lote/exportar/', views.produto_exportar, name='produto_exportar'),
+    path('painel/produtos/lote/importar/', views.produto_importar, name='produto_importar'),
+    path('painel/produtos/lote/reajustar/', views.produto_reajustar, name='produto_reajustar'),
 
     # Historico e relatorios
     path('painel/pedidos/historico/', views.historico_pedidos, name='historico_pedidos'),
+    path('painel/pedidos/historico/exportar/', views.historico_exportar, name='historico_exportar'),
     path('painel/pedidos/relatorio/', views.relatorio_vendas, name='relatorio_vendas'),
+    path('painel/pedidos/relatorio/pdf/', views.relatorio_vendas_pdf, name='relatorio_vendas_pdf'),
 ]
@@ -1,19 +1,70 @@
 """Views principais do sistema NetBurguer."""
 
+import base64
+import binascii
+import csv
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import hashlib
+import io
 import json
+import os
+import uuid
 from urllib.parse import quote
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum
-from django.http import HttpResponseServerError
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Sum
+from asgiref.sync import sync_to_async
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    HttpResponseServerError,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse
 from django.utils import timezone
-
-from .models import Pedido, Produto
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import base36_to_int, http_date, int_to_base36, quote_etag
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from .busca import buscar_produtos, indexar_produtos
+from .catalogo import (
+    MARCADOR_CSRF,
+    aindice_produtos,
+    aobter_menu_html,
+    aobter_produtos,
+    aversao_catalogo,
+    indice_produtos,
+    invalidar_catalogo,
+    obter_menu_html,
+    obter_produto,
+    obter_produtos,
+    ultima_modificacao,
+    versao_catalogo,
+)
+from .cozinha import abertura, eventos_desde, fluxo_eventos
+from .fila import enfileirar_lote
+from .limites import limitar_concorrencia, limitar_taxa
+from .metricas import registro
+from .models import ItemPedido, Pedido, Produto, VendaDiaria
+from .relatorio_pdf import caminho_relatorio
+from .relatorios import recalcular_venda_diaria
+from .replica import ler_da_replica
+from .tarefas import agendar_relatorio_pdf, gerar_recibo, notificar_cozinha
 
 
 def _converter_preco(valor):
@@ -33,20 +84,50 @@ def _converter_preco(valor):
 
 
 class Carrinho:
-    """Representa o carrinho de compras armazenado na sessao."""
+    """Representa o carrinho de compras armazenado na sessao.
+
+    A sessao guarda apenas ``{'i': {id: quantidade}}``; nome e preco vem
+    sempre do catalogo cacheado atual, entao o carrinho nunca fica com preco
+    antigo (itens que sairam do catalogo sao tirados por
+    ``remover_indisponiveis``). A sessao so e regravada quando o conteudo
+    muda de fato.
+    """
 
     DESCONTO_PERCENTUAL = Decimal('0.10')
     QTD_MINIMA_COMBO = 3
     CHAVE_SESSAO = 'carrinho'
 
-    def __init__(self, request):
+    def __init__(self, request, produtos=None):
+        """``produtos`` (indice id -> Produto) ja lido evita acessar o cache
+        de forma sincrona nas views assincronas."""
         self.session = request.session
-        self.carrinho = self.session.get(self.CHAVE_SESSAO, {})
+        self._alterado = False
+        self._produtos = produtos
+        self.carrinho = self._carregar(self.session.get(self.CHAVE_SESSAO))
+
+    def _carregar(self, dados):
+        """Le o formato compacto, convertendo carrinhos no formato antigo."""
+        if not dados:
+            return {}
+        if 'i' in dados:
+            # Sessoes gravadas com a chave 'v' (versao do catalogo) perdem a
+            # chave na proxima gravacao.
+            return dict(dados['i'])
+
+        # Formato antigo: {id: {'id', 'nome', 'preco', 'quantidade'}}
+        self._alterado = True
+        return {
+            produto_id: item['quantidade']
+            for produto_id, item in dados.items()
+            if isinstance(item, dict) and 'quantidade' in item
+        }
 
     def salvar(self):
-        """Persiste o carrinho na sessao do usuario."""
-        self.session[self.CHAVE_SESSAO] = self.carrinho
-        self.session.modified = True
+        """Persiste o carrinho na sessao do usuario, se algo mudou."""
+        if not self._alterado:
+            return
+        self.session[self.CHAVE_SESSAO] = {'i': self.carrinho}
+        self._alterado = False
 
     def adicionar(self, produto, quantidade=1):
         """Adiciona um produto ao carrinho."""
@@ -58,15 +139,8 @@ class Carrinho:
         quantidade = max(1, quantidade)
         produto_id = str(produto.id)
 
-        if produto_id not in self.carrinho:
-            self.carrinho[produto_id] = {
-                'id': produto.id,
-                'nome': produto.nome,
-                'preco': str(produto.preco),
-                'quantidade': 0,
-            }
-
-        self.carrinho[produto_id]['quantidade'] += quantidade
+        self.carrinho[produto_id] = self.carrinho.get(produto_id, 0) + quantidade
+        self._alterado = True
         self.salvar()
 
     def atualizar(self, produto_id, nova_qtd):
@@ -81,7 +155,9 @@ class Carrinho:
             return
 
         if nova_qtd > 0:
-            self.carrinho[produto_id]['quantidade'] = nova_qtd
+            if self.carrinho[produto_id] != nova_qtd:
+                self.carrinho[produto_id] = nova_qtd
+                self._alterado = True
         else:
             self.remover(produto_id)
 
@@ -92,7 +168,28 @@ class Carrinho:
         produto_id = str(produto_id)
         if produto_id in self.carrinho:
             del self.carrinho[produto_id]
+            self._alterado = True
+            self.salvar()
+
+    def remover_indisponiveis(self):
+        """Retira itens cujo produto saiu do catalogo; retorna quantos foram removidos.
+
+        Precos e nomes ja vem do indice do catalogo, entao esta e a unica
+        revalidacao necessaria e nao consulta o banco com o cache aquecido.
+        """
+        produtos = self._indice()
+        indisponiveis = [
+            produto_id for produto_id in self.carrinho if int(produto_id) not in produtos
+        ]
+        for produto_id in indisponiveis:
+            del self.carrinho[produto_id]
+        if indisponiveis:
+            self._alterado = True
             self.salvar()
+        return len(indisponiveis)
+
+    def _indice(self):
+        return self._produtos if self._produtos is not None else indice_produtos()
 
     def itens_distintos(self):
         """Retorna quantos produtos diferentes estao no carrinho."""
@@ -109,8 +206,8 @@ class Carrinho:
     def calcular_total_bruto(self):
         """Calcula o total antes dos descontos."""
         total = Decimal('0.00')
-        for item in self.carrinho.values():
-            total += Decimal(item['preco']) * item['quantidade']
+        for item in self:
+            total += item['total']
         return total
 
     def calcular_total_final(self):
@@ -127,7 +224,7 @@ class Carrinho:
     def validar_itens(self):
         """Garante que o carrinho possui itens validos."""
         return not self.esta_vazio() and all(
-            item['quantidade'] > 0 for item in self.carrinho.values()
+            quantidade > 0 for quantidade in self.carrinho.values()
         )
 
     def esta_vazio(self):
@@ -137,8 +234,8 @@ class Carrinho:
         """Remove o carrinho da sessao."""
         if self.CHAVE_SESSAO in self.session:
             del self.session[self.CHAVE_SESSAO]
-            self.session.modified = True
         self.carrinho = {}
+        self._alterado = False
 
     def serializar_itens(self, itens=None):
         """Converte o carrinho para uma lista pronta para persistencia."""
@@ -158,19 +255,21 @@ class Carrinho:
 
     def __iter__(self):
         """Permite iterar pelos itens para uso nos templates."""
-        for item in self.carrinho.values():
-            preco = Decimal(item['preco'])
-            quantidade = item['quantidade']
+        produtos = self._indice()
+        for produto_id, quantidade in self.carrinho.items():
+            produto = produtos.get(int(produto_id))
+            if produto is None:
+                continue
             yield {
-                'id': item['id'],
-                'nome': item['nome'],
-                'preco': preco,
+                'id': produto.id,
+                'nome': produto.nome,
+                'preco': produto.preco,
                 'quantidade': quantidade,
-                'total': preco * quantidade,
+                'total': produto.preco * quantidade,
             }
 
     def __len__(self):
-        return sum(item['quantidade'] for item in self.carrinho.values())
+        return sum(self.carrinho.values())
 
 
 # ---------------------------
@@ -208,6 +307,14 @@ def admin_painel(request):
     return render(request, 'admin/painel.html')
 
 
+@login_required
+def metricas_prometheus(request):
+    """Exporta as metricas de desempenho no formato texto do Prometheus."""
+    return HttpResponse(
+        registro.exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
 @login_required
 def produto_listar(request):
     produtos = Produto.objects.all()
@@ -267,46 +374,376 @@ def produto_remover(request, produto_id):
     return redirect('produto_listar')
 
 
+# ---------------------------
+# Produtos em lote (exportacao, importacao e reajuste de precos)
+# ---------------------------
+
+CAMPOS_PRODUTO_LOTE = ('id', 'nome', 'descricao', 'preco')
+TAMANHO_MAXIMO_LOTE = 1024 * 1024
+PRECO_MAXIMO = Decimal('9999.99')  # max_digits=6 do Produto.preco
+
+
+def _ler_lote_produtos(conteudo, formato):
+    """Valida as linhas do CSV/JSON; retorna (linhas, erros).
+
+    ``descricao`` fica None quando a coluna nao vem no arquivo, para que
+    a importacao preserve a descricao dos produtos ja cadastrados.
+    """
+    if formato == 'json':
+        try:
+            registros = json.loads(conteudo)
+        except ValueError as erro:
+            return [], [f'JSON invalido: {erro}']
+        if isinstance(registros, dict):
+            registros = registros.get('produtos')
+        if not isinstance(registros, list) or not all(isinstance(r, dict) for r in registros):
+            return [], ['O JSON deve ser uma lista de produtos.']
+        numerados = enumerate(registros, start=1)
+    else:
+        try:
+            dialeto = csv.Sniffer().sniff(conteudo[:2048], delimiters=',;')
+        except csv.Error:
+            dialeto = csv.excel
+        # Linha 1 e o cabecalho.
+        numerados = enumerate(csv.DictReader(io.StringIO(conteudo), dialect=dialeto), start=2)
+
+    linhas, erros, ids_vistos = [], [], set()
+    for numero, dados in numerados:
+        if None in dados:
+            erros.append(f'Linha {numero}: colunas a mais (preco com virgula? use ponto ou separador ;).')
+            continue
+        produto_id = str(dados.get('id') or '').strip()
+        if produto_id:
+            if not produto_id.isdigit():
+                erros.append(f'Linha {numero}: id invalido.')
+                continue
+            produto_id = int(produto_id)
+            if produto_id in ids_vistos:
+                erros.append(f'Linha {numero}: produto {produto_id} repetido no arquivo.')
+                continue
+            ids_vistos.add(produto_id)
+        else:
+            produto_id = None
+
+        nome = str(dados.get('nome') or '').strip()
+        preco = _converter_preco(dados.get('preco'))
+        if not nome or len(nome) > 100:
+            erros.append(f'Linha {numero}: nome obrigatorio (ate 100 caracteres).')
+        elif preco is None or preco > PRECO_MAXIMO:
+            erros.append(f'Linha {numero}: preco invalido.')
+        else:
+            descricao = dados.get('descricao')
+            linhas.append({
+                'linha': numero,
+                'id': produto_id,
+                'nome': nome,
+                'descricao': None if descricao is None else str(descricao).strip(),
+                'preco': preco,
+            })
+    if not linhas and not erros:
+        erros.append('Nenhum produto encontrado no arquivo.')
+    return linhas, erros
+
+
+def _planejar_lote_produtos(linhas):
+    """Compara as linhas com o banco; retorna (novos, alterados, diferencas, erros)."""
+    existentes = Produto.objects.in_bulk([linha['id'] for linha in linhas if linha['id']])
+    novos, alterados, diferencas, erros = [], [], [], []
+
+    for linha in linhas:
+        if linha['id'] is None:
+            novos.append(
+                Produto(nome=linha['nome'], descricao=linha['descricao'] or '', preco=linha['preco'])
+            )
+            diferencas.append({'linha': linha['linha'], 'acao': 'criar', 'nome': linha['nome'],
+                               'mudancas': [('preco', None, linha['preco'])]})
+            continue
+
+        produto = existentes.get(linha['id'])
+        if produto is None:
+            erros.append(f"Linha {linha['linha']}: produto {linha['id']} nao existe.")
+            continue
+        mudancas = []
+        for campo in ('nome', 'descricao', 'preco'):
+            novo = linha[campo]
+            if novo is not None and getattr(produto, campo) != novo:
+                mudancas.append((campo, getattr(produto, campo), novo))
+                setattr(produto, campo, novo)
+        if mudancas:
+            alterados.append(produto)
+        diferencas.append({'linha': linha['linha'], 'acao': 'alterar' if mudancas else 'igual',
+                           'id': produto.id, 'nome': produto.nome, 'mudancas': mudancas})
+    return novos, alterados, diferencas, erros
+
+
+def _aplicar_lote_produtos(novos, alterados, campos=('nome', 'descricao', 'preco')):
+    """Grava o lote em uma transacao, com uma unica invalidacao do catalogo.
+
+    bulk_create/bulk_update nao disparam post_save, entao a invalidacao e
+    o indice de busca, feitos pelos sinais por produto, sao tratados aqui.
+    """
+    with transaction.atomic():
+        Produto.objects.bulk_create(novos)
+        Produto.objects.bulk_update(alterados, list(campos))
+        if novos or {'nome', 'descricao'} & set(campos):
+            indexar_produtos(novos + alterados)
+        transaction.on_commit(invalidar_catalogo)
+
+
+def _percentual_reajuste(valor):
+    try:
+        percentual = Decimal(str(valor).replace(',', '.'))
+    except (InvalidOperation, TypeError):
+        return None
+    if not percentual.is_finite() or not Decimal('-100') < percentual <= Decimal('1000'):
+        return None
+    return percentual
+
+
+def _planejar_reajuste(percentual):
+    """Aplica o percentual a todos os precos; retorna (alterados, diferencas, erros)."""
+    fator = 1 + percentual / 100
+    alterados, diferencas, erros = [], [], []
+    for produto in Produto.objects.order_by('nome'):
+        novo = _converter_preco(produto.preco * fator)
+        if novo is None or novo > PRECO_MAXIMO:
+            erros.append(f'{produto.nome}: preco resultante fora do limite.')
+            continue
+        if novo != produto.preco:
+            diferencas.append({'acao': 'alterar', 'id': produto.id, 'nome': produto.nome,
+                               'mudancas': [('preco', produto.preco, novo)]})
+            produto.preco = novo
+            alterados.append(produto)
+    return alterados, diferencas, erros
+
+
+def _pagina_lote(request, previa=None, erros=()):
+    for erro in erros:
+        messages.error(request, erro)
+    return render(request, 'admin/produto_lote.html', {'previa': previa})
+
+
+@login_required
+def produto_lote(request):
+    return _pagina_lote(request)
+
+
+@login_required
+def produto_exportar(request):
+    """Exporta o catalogo em CSV ou JSON, no mesmo formato aceito pela importacao."""
+    produtos = Produto.objects.order_by('id').values_list(*CAMPOS_PRODUTO_LOTE)
+    if request.GET.get('formato') == 'json':
+        dados = [
+            {'id': pk, 'nome': nome, 'descricao': descricao, 'preco': f'{preco:.2f}'}
+            for pk, nome, descricao, preco in produtos
+        ]
+        response = HttpResponse(
+            json.dumps(dados, ensure_ascii=False, indent=2),
+            content_type='application/json; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="produtos.json"'
+        return response
+
+    escritor = csv.writer(_Eco())
+    conteudo = [escritor.writerow(CAMPOS_PRODUTO_LOTE)]
+    conteudo += [
+        escritor.writerow([pk, nome, descricao, f'{preco:.2f}'])
+        for pk, nome, descricao, preco in produtos
+    ]
+    response = HttpResponse(''.join(conteudo), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="produtos.csv"'
+    return response
+
+
+@login_required
+@require_POST
+def produto_importar(request):
+    """Simula (padrao) ou aplica a importacao de um CSV/JSON de produtos.
+
+    Linhas com ``id`` atualizam o produto; sem ``id`` criam um novo. Se
+    alguma linha for invalida, nada e gravado.
+    """
+    arquivo = request.FILES.get('arquivo')
+    if arquivo is not None:
+        if arquivo.size > TAMANHO_MAXIMO_LOTE:
+            return _pagina_lote(request, erros=['Arquivo maior que 1 MB.'])
+        try:
+            conteudo = arquivo.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return _pagina_lote(request, erros=['O arquivo deve estar em UTF-8.'])
+        formato = 'json' if arquivo.name.lower().endswith('.json') else 'csv'
+    else:
+        # Confirmacao vinda da pagina de simulacao: o conteudo volta pelo
+        # formulario e passa pelo mesmo limite do arquivo.
+        conteudo = request.POST.get('conteudo', '')
+        if len(conteudo.encode('utf-8')) > TAMANHO_MAXIMO_LOTE:
+            return _pagina_lote(request, erros=['Arquivo maior que 1 MB.'])
+        formato = 'json' if request.POST.get('formato') == 'json' else 'csv'
+
+    linhas, erros = _ler_lote_produtos(conteudo, formato)
+    novos, alterados, diferencas, erros_banco = _planejar_lote_produtos(linhas)
+    erros += erros_banco
+    if erros:
+        return _pagina_lote(request, erros=erros)
+
+    if 'aplicar' in request.POST:
+        _aplicar_lote_produtos(novos, alterados)
+        messages.success(
+            request, f'Importacao concluida: {len(novos)} criado(s), {len(alterados)} alterado(s).'
+        )
+        return redirect('produto_listar')
+
+    return _pagina_lote(request, previa={
+        'tipo': 'importacao',
+        'diferencas': diferencas,
+        'criados': len(novos),
+        'alterados': len(alterados),
+        'conteudo': conteudo,
+        'formato': formato,
+    })
+
+
+@login_required
+@require_POST
+def produto_reajustar(request):
+    """Simula (padrao) ou aplica um reajuste percentual em todos os precos."""
+    percentual = _percentual_reajuste(request.POST.get('percentual'))
+    if percentual is None:
+        return _pagina_lote(request, erros=['Informe um percentual entre -100 e 1000.'])
+
+    alterados, diferencas, erros = _planejar_reajuste(percentual)
+    if erros:
+        return _pagina_lote(request, erros=erros)
+
+    if 'aplicar' in request.POST:
+        _aplicar_lote_produtos([], alterados, campos=('preco',))
+        messages.success(request, f'Reajuste de {percentual}% aplicado a {len(alterados)} produto(s).')
+        return redirect('produto_listar')
+
+    return _pagina_lote(request, previa={
+        'tipo': 'reajuste',
+        'diferencas': diferencas,
+        'criados': 0,
+        'alterados': len(alterados),
+        'percentual': percentual,
+    })
+
+
 # ---------------------------
 # Fluxos do cliente
 # ---------------------------
 
 
+def _menu_etag(request, versao=None):
+    """ETag do cardapio: versao do catalogo + segredo CSRF + usuario logado."""
+    if len(messages.get_messages(request)):
+        return None
+    get_token(request)
+    versao = versao if versao is not None else versao_catalogo()
+    chave = f"{versao}:{request.META['CSRF_COOKIE']}:{request.user.pk}"
+    return hashlib.md5(chave.encode()).hexdigest()
+
+
+def _menu_ultima_modificacao(request, versao=None):
+    if len(messages.get_messages(request)):
+        return None
+    return ultima_modificacao(versao)
+
+
+def _renderizar_menu(request, menu_html):
+    """Monta a pagina do cardapio; ``menu_html`` vazio indica catalogo sem produtos."""
+    if not menu_html:
+        response = render(
+            request,
+            'cliente/menu.html',
+            {
+                'mensagem_erro': 'Nao ha produtos cadastrados no momento.',
+                'combo_minimo': Carrinho.QTD_MINIMA_COMBO,
+            },
+        )
+    else:
+        menu_html = menu_html.replace(MARCADOR_CSRF, get_token(request))
+        response = render(
+            request,
+            'cliente/menu.html',
+            {'menu_html': mark_safe(menu_html), 'combo_minimo': Carrinho.QTD_MINIMA_COMBO},
+        )
+
+    # A pagina carrega o token CSRF do cliente, entao so o navegador pode guarda-la.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@condition(etag_func=_menu_etag, last_modified_func=_menu_ultima_modificacao)
 def menu_cardapio(request):
     """Lista os produtos disponiveis."""
+    versao = versao_catalogo()
     try:
-        produtos = Produto.objects.all()
+        produtos = obter_produtos(versao)
     except Exception:
         return HttpResponseServerError(
             'Erro ao carregar cardapio. Tente novamente mais tarde.'
         )
+    return _renderizar_menu(request, obter_menu_html(versao) if produtos else None)
 
-    if not produtos.exists():
-        return render(
+
+@require_GET
+def menu_busca(request):
+    """Busca no cardapio por texto e faixa de preco.
+
+    Chamadas do formulario do cardapio (fetch) recebem so o fragmento da
+    grade; sem JavaScript, a pagina inteira com os resultados.
+    """
+    busca = {
+        'q': request.GET.get('q', '').strip()[:100],
+        'preco_min': _converter_preco(request.GET.get('preco_min')),
+        'preco_max': _converter_preco(request.GET.get('preco_max')),
+    }
+    produtos = buscar_produtos(busca['q'], busca['preco_min'], busca['preco_max'])
+    # Os cards vem do cache de fragmentos (por produto e versao do catalogo),
+    # compartilhados entre clientes: o token CSRF entra depois.
+    grade = render_to_string(
+        'cliente/_produtos_grid.html',
+        {'produtos': produtos, 'busca': busca, 'versao': versao_catalogo(), 'csrf_token': MARCADOR_CSRF},
+    ).replace(MARCADOR_CSRF, get_token(request))
+
+    if _requisicao_ajax(request):
+        response = HttpResponse(grade)
+    else:
+        response = render(
             request,
             'cliente/menu.html',
-            {
-                'mensagem_erro': 'Nao ha produtos cadastrados no momento.',
-                'combo_minimo': Carrinho.QTD_MINIMA_COMBO,
-            },
+            {'menu_html': mark_safe(grade), 'busca': busca, 'combo_minimo': Carrinho.QTD_MINIMA_COMBO},
         )
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['X-Requested-With'])
+    return response
 
-    return render(
-        request,
-        'cliente/menu.html',
-        {'produtos': produtos, 'combo_minimo': Carrinho.QTD_MINIMA_COMBO},
+
+def _requisicao_ajax(request):
+    """Identifica chamadas do site_cart.js (fetch com X-Requested-With)."""
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
     )
 
 
+@limitar_taxa('carrinho')
 def adicionar_ao_carrinho(request, produto_id):
     if request.method != 'POST':
         return redirect('menu_cardapio')
 
-    produto = get_object_or_404(Produto, id=produto_id)
+    produto = obter_produto(produto_id)
+    if produto is None:
+        raise Http404('Produto nao encontrado.')
     quantidade = request.POST.get('quantidade', 1)
 
     carrinho = Carrinho(request)
     carrinho.adicionar(produto, quantidade)
+
+    if _requisicao_ajax(request):
+        return JsonResponse({'success': True, 'count': len(carrinho)})
+
     messages.success(request, f'{produto.nome} adicionado ao carrinho.')
     return redirect('menu_cardapio')
 
@@ -321,27 +758,182 @@ def atualizar_carrinho(request, produto_id):
     return redirect('carrinho_detalhe')
 
 
-def carrinho_detalhe(request):
-    carrinho = Carrinho(request)
-    total_bruto = carrinho.calcular_total_bruto()
-    total_final, desconto = carrinho.calcular_total_final()
+def _avisar_itens_removidos(request, carrinho):
+    removidos = carrinho.remover_indisponiveis()
+    if removidos:
+        messages.warning(
+            request, 'Alguns itens do carrinho nao estao mais disponiveis e foram removidos.'
+        )
+    return removidos
 
-    context = {
+
+def _contexto_carrinho(carrinho):
+    total_final, desconto = carrinho.calcular_total_final()
+    return {
         'carrinho': carrinho,
-        'total_bruto': total_bruto,
+        'total_bruto': carrinho.calcular_total_bruto(),
         'desconto_aplicado': desconto,
         'total_final': total_final,
         'tem_desconto': carrinho.verificar_desconto_combo(),
         'faltam_para_combo': carrinho.faltam_para_combo(),
         'combo_minimo': Carrinho.QTD_MINIMA_COMBO,
     }
-    return render(request, 'cliente/carrinho.html', context)
+
+
+def carrinho_detalhe(request):
+    carrinho = Carrinho(request)
+    _avisar_itens_removidos(request, carrinho)
+    return render(request, 'cliente/carrinho.html', _contexto_carrinho(carrinho))
+
+
+# ---------------------------
+# API do carrinho (JSON, sem renderizar templates)
+# ---------------------------
+
+
+def _resumo_carrinho(carrinho):
+    """Estado do carrinho serializado para as respostas JSON."""
+    total_final, desconto = carrinho.calcular_total_final()
+    return {
+        'success': True,
+        'count': len(carrinho),
+        'itens': [
+            {
+                'id': item['id'],
+                'nome': item['nome'],
+                'preco': f"{item['preco']:.2f}",
+                'quantidade': item['quantidade'],
+                'total': f"{item['total']:.2f}",
+            }
+            for item in carrinho
+        ],
+        'total_bruto': f'{carrinho.calcular_total_bruto():.2f}',
+        'desconto_aplicado': f'{desconto:.2f}',
+        'total_final': f'{total_final:.2f}',
+        'tem_desconto': carrinho.verificar_desconto_combo(),
+        'faltam_para_combo': carrinho.faltam_para_combo(),
+    }
+
+
+@require_GET
+def api_carrinho_resumo(request):
+    carrinho = Carrinho(request)
+    itens_removidos = carrinho.remover_indisponiveis()
+    return JsonResponse(dict(_resumo_carrinho(carrinho), itens_removidos=itens_removidos))
+
+
+@require_GET
+def api_carrinho_contagem(request):
+    """Quantidade de itens lida direto da sessao, sem consultar produtos."""
+    return JsonResponse({'count': len(Carrinho(request))})
+
+
+@require_POST
+@limitar_taxa('carrinho')
+def api_carrinho_adicionar(request, produto_id):
+    produto = obter_produto(produto_id)
+    if produto is None:
+        return JsonResponse(
+            {'success': False, 'erro': 'Produto nao encontrado.'}, status=404
+        )
+
+    carrinho = Carrinho(request)
+    carrinho.adicionar(produto, request.POST.get('quantidade', 1))
+    return JsonResponse(_resumo_carrinho(carrinho))
+
+
+@require_POST
+def api_carrinho_atualizar(request, produto_id):
+    carrinho = Carrinho(request)
+    carrinho.atualizar(produto_id, request.POST.get('quantidade', 0))
+    return JsonResponse(_resumo_carrinho(carrinho))
+
+
+@require_POST
+def api_carrinho_remover(request, produto_id):
+    carrinho = Carrinho(request)
+    carrinho.remover(produto_id)
+    return JsonResponse(_resumo_carrinho(carrinho))
+
+
+# ---------------------------
+# Versoes assincronas (perfil ASGI, ver netburger/urls_asgi.py)
+# ---------------------------
+
+
+async def _carregar_sessao(request, usuario=False):
+    """Carrega a sessao (e o usuario) em uma thread, fora do loop de eventos.
+
+    O Django 4.2 ainda nao tem API assincrona de sessao e os backends db e
+    cached_db consultam o banco no primeiro acesso. Depois da carga, ler e
+    gravar a sessao e o usuario nao toca mais o banco nesta requisicao; a
+    gravacao fica com o SessionMiddleware, como na versao sincrona.
+    """
+
+    def carregar():
+        request.session.keys()
+        if usuario:
+            request.user.is_authenticated
+
+    await sync_to_async(carregar)()
+
+
+async def menu_cardapio_async(request):
+    """Versao assincrona de ``menu_cardapio``, com o mesmo ETag/Last-Modified."""
+    await _carregar_sessao(request, usuario=True)
+    versao = await aversao_catalogo()
+
+    etag = _menu_etag(request, versao)
+    etag = quote_etag(etag) if etag else None
+    ultima = _menu_ultima_modificacao(request, versao)
+    ultima = int(ultima.timestamp()) if ultima else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=ultima)
+    if response is None:
+        try:
+            produtos = await aobter_produtos(versao)
+        except Exception:
+            return HttpResponseServerError(
+                'Erro ao carregar cardapio. Tente novamente mais tarde.'
+            )
+        response = _renderizar_menu(request, await aobter_menu_html(versao) if produtos else None)
+
+    if request.method in ('GET', 'HEAD'):
+        if ultima and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(ultima)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+    return response
+
+
+async def carrinho_detalhe_async(request):
+    """Versao assincrona de ``carrinho_detalhe``."""
+    await _carregar_sessao(request, usuario=True)
+    versao = await aversao_catalogo()
+    carrinho = Carrinho(request, await aindice_produtos(versao))
+    _avisar_itens_removidos(request, carrinho)
+    return render(request, 'cliente/carrinho.html', _contexto_carrinho(carrinho))
+
+
+async def api_carrinho_contagem_async(request):
+    """Versao assincrona de ``api_carrinho_contagem``."""
+    # require_GET so aceita views assincronas a partir do Django 5.0.
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    await _carregar_sessao(request)
+    return JsonResponse({'count': len(Carrinho(request))})
 
 
 # ---------------------------
 # Finalizacao do pedido (WhatsApp)
 # ---------------------------
 
+CHAVE_CHECKOUTS_CONCLUIDOS = 'checkouts_concluidos'
+CHECKOUTS_LEMBRADOS = 5
+SALT_LINK_PEDIDO = 'cardapio.pedido_link'
+TAMANHO_ASSINATURA_PEDIDO = 16
+TAREFAS_POS_PEDIDO = (gerar_recibo, notificar_cozinha)
+
 
 def _gerar_mensagem_formatada(nome, endereco, itens, total_final, desconto, total_bruto):
     linhas = [
@@ -375,10 +967,106 @@ def _gerar_link_whatsapp(mensagem):
     return f'https://api.whatsapp.com/send?phone={numero}&text={texto_formatado}'
 
 
+def _assinatura_pedido(id_base36):
+    return salted_hmac(SALT_LINK_PEDIDO, id_base36, algorithm='sha256').hexdigest()[:TAMANHO_ASSINATURA_PEDIDO]
+
+
+def _token_pedido(pedido_id):
+    """Token curto e assinado do pedido: ``<id em base36>-<hmac truncado>``."""
+    id_base36 = int_to_base36(pedido_id)
+    return f'{id_base36}-{_assinatura_pedido(id_base36)}'
+
+
+def _pedido_id_do_token(token):
+    """Id do pedido se a assinatura confere; ``None`` caso contrario."""
+    id_base36, _, assinatura = token.partition('-')
+    if not id_base36 or not constant_time_compare(assinatura, _assinatura_pedido(id_base36)):
+        return None
+    try:
+        return base36_to_int(id_base36)
+    except ValueError:
+        return None
+
+
+def _link_curto_do_pedido(pedido):
+    return reverse('pedido_link', args=[_token_pedido(pedido.id)])
+
+
+def _criar_itens_pedido(pedido, itens):
+    """Grava as linhas normalizadas do pedido em um unico INSERT."""
+    ItemPedido.objects.bulk_create(
+        [
+            ItemPedido(
+                pedido=pedido,
+                produto_id=item['id'],
+                nome=item['nome'],
+                preco_unitario=item['preco'],
+                quantidade=item['quantidade'],
+                total=item['total'],
+            )
+            for item in itens
+        ]
+    )
+
+
+def _mensagem_do_pedido(pedido):
+    """Mensagem gravada no checkout; pedidos antigos (sem ela) sao remontados."""
+    if pedido.mensagem:
+        return pedido.mensagem
+    itens = [
+        {
+            'quantidade': item['quantidade'],
+            'nome': item['nome'],
+            'total': Decimal(item['total']),
+        }
+        for item in _itens_do_json(pedido.itens_json)
+    ]
+    return _gerar_mensagem_formatada(
+        pedido.nome_cliente,
+        pedido.endereco_entrega,
+        itens,
+        pedido.total_final,
+        pedido.desconto_aplicado,
+        pedido.total_bruto,
+    )
+
+
+def _token_checkout_valido(token):
+    return len(token) == 32 and all(c in '0123456789abcdef' for c in token)
+
+
+def _registrar_checkout_concluido(request, token, link_pedido):
+    """Guarda na sessao o link dos ultimos checkouts para responder reenvios."""
+    concluidos = request.session.get(CHAVE_CHECKOUTS_CONCLUIDOS, {})
+    concluidos[token] = link_pedido
+    request.session[CHAVE_CHECKOUTS_CONCLUIDOS] = dict(
+        list(concluidos.items())[-CHECKOUTS_LEMBRADOS:]
+    )
+
+
+@limitar_taxa('checkout')
+@limitar_concorrencia('checkout')
 def finalizar_pedido(request):
+    token = request.POST.get('token_checkout', '') if request.method == 'POST' else ''
+    if not _token_checkout_valido(token):
+        token = uuid.uuid4().hex
+
+    # Reenvio de um checkout ja concluido: devolve o mesmo redirecionamento.
+    concluidos = request.session.get(CHAVE_CHECKOUTS_CONCLUIDOS, {})
+    if request.method == 'POST' and token in concluidos:
+        return redirect(concluidos[token])
+
     carrinho = Carrinho(request)
 
+    if _avisar_itens_removidos(request, carrinho):
+        messages.error(request, 'Revise o carrinho antes de finalizar o pedido.')
+        return redirect('carrinho_detalhe')
+
     if not carrinho.validar_itens():
+        if request.method == 'POST':
+            pedido = Pedido.objects.filter(token_checkout=token).first()
+            if pedido is not None:
+                return redirect(_link_curto_do_pedido(pedido))
         messages.error(request, 'Adicione itens ao carrinho antes de finalizar o pedido.')
         return redirect('carrinho_detalhe')
 
@@ -387,20 +1075,21 @@ def finalizar_pedido(request):
     itens_carrinho = list(carrinho)
 
     dados_cliente = {'nome': '', 'endereco': ''}
+    context = {
+        'carrinho': carrinho,
+        'total_final': total_final,
+        'total_bruto': total_bruto,
+        'desconto_aplicado': desconto,
+        'dados_cliente': dados_cliente,
+        'token_checkout': token,
+    }
 
     if request.method == 'POST':
         dados_cliente['nome'] = request.POST.get('nome', '').strip()
         dados_cliente['endereco'] = request.POST.get('endereco', '').strip()
 
         if not dados_cliente['nome'] or not dados_cliente['endereco']:
-            context = {
-                'carrinho': carrinho,
-                'total_final': total_final,
-                'total_bruto': total_bruto,
-                'desconto_aplicado': desconto,
-                'erro': 'Preencha todos os campos obrigatorios.',
-                'dados_cliente': dados_cliente,
-            }
+            context['erro'] = 'Preencha todos os campos obrigatorios.'
             return render(request, 'cliente/finalizar_pedido.html', context)
 
         mensagem = _gerar_mensagem_formatada(
@@ -411,49 +1100,180 @@ def finalizar_pedido(request):
             desconto,
             total_bruto,
         )
-        whatsapp_link = _gerar_link_whatsapp(mensagem)
 
         try:
-            Pedido.objects.create(
-                nome_cliente=dados_cliente['nome'],
-                endereco_entrega=dados_cliente['endereco'],
-                total_bruto=total_bruto,
-                desconto_aplicado=desconto,
-                total_final=total_final,
-                itens_json=json.dumps(
-                    carrinho.serializar_itens(itens_carrinho), ensure_ascii=False
-                ),
-            )
+            with transaction.atomic():
+                pedido = Pedido.objects.create(
+                    nome_cliente=dados_cliente['nome'],
+                    endereco_entrega=dados_cliente['endereco'],
+                    total_bruto=total_bruto,
+                    desconto_aplicado=desconto,
+                    total_final=total_final,
+                    itens_json=json.dumps(
+                        carrinho.serializar_itens(itens_carrinho), ensure_ascii=False
+                    ),
+                    token_checkout=token,
+                    mensagem=mensagem,
+                )
+                _criar_itens_pedido(pedido, itens_carrinho)
+                # O consolidado do dia entra na mesma transacao, para o relatorio
+                # bater com os pedidos mesmo sem o worker rodando.
+                recalcular_venda_diaria(timezone.localdate(pedido.data_criacao))
+                # Os demais efeitos ficam com o worker (processar_tarefas);
+                # as tarefas sao gravadas junto com o pedido.
+                enfileirar_lote(
+                    [(funcao, {'pedido_id': pedido.id}) for funcao in TAREFAS_POS_PEDIDO]
+                )
+        except IntegrityError:
+            # Requisicao concorrente com o mesmo token ja gravou o pedido.
+            pedido = Pedido.objects.filter(token_checkout=token).first()
+            if pedido is None:
+                context['erro'] = 'Erro ao salvar o pedido. Tente novamente.'
+                return render(request, 'cliente/finalizar_pedido.html', context)
         except Exception:
-            context = {
-                'carrinho': carrinho,
-                'total_final': total_final,
-                'total_bruto': total_bruto,
-                'desconto_aplicado': desconto,
-                'erro': 'Erro ao salvar o pedido. Tente novamente.',
-                'dados_cliente': dados_cliente,
-            }
+            context['erro'] = 'Erro ao salvar o pedido. Tente novamente.'
             return render(request, 'cliente/finalizar_pedido.html', context)
 
+        # A sessao nao participa da transacao: o carrinho so e limpo depois
+        # que o pedido foi confirmado no banco.
         carrinho.limpar_carrinho()
-        return redirect(whatsapp_link)
+        # O redirecionamento leva so o link curto; a mensagem fica no pedido.
+        link_pedido = _link_curto_do_pedido(pedido)
+        _registrar_checkout_concluido(request, token, link_pedido)
+        return redirect(link_pedido)
 
-    context = {
-        'carrinho': carrinho,
-        'total_final': total_final,
-        'total_bruto': total_bruto,
-        'desconto_aplicado': desconto,
-        'dados_cliente': dados_cliente,
-    }
     return render(request, 'cliente/finalizar_pedido.html', context)
 
 
+@require_GET
+def pedido_link(request, token):
+    """Link curto do pedido: redireciona ao WhatsApp ou mostra a mensagem para copiar.
+
+    Mensagens que gerariam uma URL acima de WHATSAPP_URL_MAXIMO (ou ``?resumo=1``)
+    vao para a pagina de resumo em vez de um Location de varios KB.
+    """
+    pedido_id = _pedido_id_do_token(token)
+    if pedido_id is None:
+        raise Http404('Pedido nao encontrado.')
+    pedido = get_object_or_404(
+        Pedido.objects.only(
+            'mensagem', 'nome_cliente', 'endereco_entrega', 'itens_json',
+            'total_bruto', 'desconto_aplicado', 'total_final',
+        ),
+        pk=pedido_id,
+    )
+    mensagem = _mensagem_do_pedido(pedido)
+    if not pedido.mensagem:
+        Pedido.objects.filter(pk=pedido.pk, mensagem='').update(mensagem=mensagem)
+
+    whatsapp_link = _gerar_link_whatsapp(mensagem)
+    cabe_na_url = len(whatsapp_link) <= settings.WHATSAPP_URL_MAXIMO
+    if cabe_na_url and not request.GET.get('resumo'):
+        response = redirect(whatsapp_link)
+    else:
+        if not cabe_na_url:
+            # Abre a conversa sem o texto; o cliente cola a mensagem copiada.
+            whatsapp_link = _gerar_link_whatsapp('').removesuffix('&text=')
+        response = render(request, 'cliente/pedido_link.html', {
+            'pedido': pedido,
+            'mensagem': mensagem,
+            'whatsapp_link': whatsapp_link,
+            'mensagem_no_link': cabe_na_url,
+        })
+    # O pedido nao muda depois de gravado: reenvios saem do cache do navegador.
+    patch_cache_control(response, private=True, max_age=settings.PEDIDO_LINK_MAX_AGE)
+    return response
+
+
 # ---------------------------
 # Historico e relatorios
 # ---------------------------
 
+RANKING_PRODUTOS_LIMITE = 10
+
+# Marcador onde as linhas da tabela sao inseridas no modo streaming.
+MARCADOR_LINHAS = '<!--NETBURGUER_LINHAS_HISTORICO-->'
+
+
+def _inicio_do_dia(data):
+    """Meia-noite de ``data`` no TIME_ZONE configurado, como datetime aware."""
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _filtrar_periodo(pedidos, data_inicio=None, data_fim=None):
+    """Filtra por intervalo semiaberto [inicio, fim + 1 dia) em data_criacao.
+
+    Comparar a coluna diretamente (em vez de ``__date``) permite ao banco
+    usar o indice de data_criacao.
+    """
+    if data_inicio:
+        if isinstance(data_inicio, str):
+            data_inicio = date.fromisoformat(data_inicio)
+        pedidos = pedidos.filter(data_criacao__gte=_inicio_do_dia(data_inicio))
+    if data_fim:
+        if isinstance(data_fim, str):
+            data_fim = date.fromisoformat(data_fim)
+        pedidos = pedidos.filter(data_criacao__lt=_inicio_do_dia(data_fim + timedelta(days=1)))
+    return pedidos
+
+
+def _codificar_cursor(pedido):
+    """Gera o cursor opaco (data_criacao, id) do ultimo pedido da pagina."""
+    valor = f'{pedido.data_criacao.isoformat()}|{pedido.id}'
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def _decodificar_cursor(cursor):
+    """Le o cursor recebido na URL; retorna None quando invalido."""
+    if not cursor:
+        return None
+    try:
+        data_iso, pedido_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(data_iso), int(pedido_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+
+
+def _tamanho_pagina(valor):
+    """Tamanho da pagina do historico, limitado pelo maximo configurado."""
+    padrao = getattr(settings, 'HISTORICO_PAGINA_TAMANHO', 50)
+    maximo = getattr(settings, 'HISTORICO_PAGINA_MAXIMO', 500)
+    try:
+        tamanho = int(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return min(max(1, tamanho), maximo)
+
+
+def _historico_streaming(request, pedidos, filtros):
+    """Envia a tabela do historico linha a linha, sem carregar tudo em memoria."""
+    pagina = render_to_string(
+        'admin/historico.html',
+        {'filtros': filtros, 'streaming': True, 'marcador_linhas': MARCADOR_LINHAS},
+        request=request,
+    )
+    inicio, fim = pagina.split(MARCADOR_LINHAS)
+    template_linha = get_template('admin/_historico_linha.html')
+    chunk_size = getattr(settings, 'HISTORICO_STREAMING_CHUNK', 500)
+
+    def gerar():
+        yield inicio
+        vazio = True
+        for pedido in pedidos.iterator(chunk_size=chunk_size):
+            vazio = False
+            yield template_linha.render({'pedido': pedido})
+        if vazio:
+            yield render_to_string(
+                'admin/_historico_linha.html',
+                {'mensagem_vazio': 'Nenhum pedido registrado no periodo selecionado.'},
+            )
+        yield fim
+
+    return StreamingHttpResponse(gerar(), content_type='text/html; charset=utf-8')
+
 
 @login_required
+@ler_da_replica
 def historico_pedidos(request):
     filtros = {
         'data_inicio': request.GET.get('data_inicio', ''),
@@ -461,13 +1281,25 @@ def historico_pedidos(request):
     }
 
     try:
-        pedidos = Pedido.objects.all().order_by('-data_criacao')
+        pedidos = _filtrar_periodo(
+            Pedido.objects.all().order_by('-data_criacao', '-id'),
+            filtros['data_inicio'],
+            filtros['data_fim'],
+        )
 
-        if filtros['data_inicio']:
-            pedidos = pedidos.filter(data_criacao__date__gte=filtros['data_inicio'])
+        if request.GET.get('stream'):
+            return _historico_streaming(request, pedidos, filtros)
 
-        if filtros['data_fim']:
-            pedidos = pedidos.filter(data_criacao__date__lte=filtros['data_fim'])
+        tamanho = _tamanho_pagina(request.GET.get('por_pagina'))
+        cursor = _decodificar_cursor(request.GET.get('cursor'))
+        if cursor is not None:
+            data_cursor, id_cursor = cursor
+            pedidos = pedidos.filter(
+                Q(data_criacao__lt=data_cursor) | Q(data_criacao=data_cursor, id__lt=id_cursor)
+            )
+
+        # Busca um registro a mais apenas para saber se existe proxima pagina.
+        pagina = list(pedidos[:tamanho + 1])
 
     except Exception:
         return render(
@@ -476,30 +1308,163 @@ def historico_pedidos(request):
             {'erro': 'Erro ao carregar historico de pedidos.', 'filtros': filtros},
         )
 
-    context = {'pedidos': pedidos, 'filtros': filtros}
+    tem_proxima = len(pagina) > tamanho
+    pagina = pagina[:tamanho]
+
+    context = {'pedidos': pagina, 'filtros': filtros, 'por_pagina': tamanho}
+
+    if tem_proxima:
+        parametros = request.GET.copy()
+        parametros['cursor'] = _codificar_cursor(pagina[-1])
+        context['proxima_pagina'] = parametros.urlencode()
+
+    if cursor is not None:
+        parametros = request.GET.copy()
+        parametros.pop('cursor', None)
+        context['primeira_pagina'] = parametros.urlencode()
 
-    if not pedidos.exists():
+    if not pagina:
         context['mensagem_vazio'] = 'Nenhum pedido registrado no periodo selecionado.'
 
     return render(request, 'admin/historico.html', context)
 
 
+class _Eco:
+    """Pseudo-buffer: devolve a linha escrita pelo csv.writer sem acumular."""
+
+    def write(self, valor):
+        return valor
+
+
+def _itens_do_json(itens_json):
+    try:
+        return json.loads(itens_json or '[]')
+    except ValueError:
+        return []
+
+
+# Inicios de celula que planilhas (Excel, Sheets) interpretam como formula.
+INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _celula_segura(valor):
+    """Prefixa com ' o texto que a planilha executaria como formula."""
+    if isinstance(valor, str) and valor.startswith(INICIOS_FORMULA):
+        return "'" + valor
+    return valor
+
+
+class _EscritorCsvSeguro:
+    """csv.writer que neutraliza formulas nos textos vindos do cliente."""
+
+    def __init__(self, destino):
+        self._escritor = csv.writer(destino)
+
+    def writerow(self, linha):
+        return self._escritor.writerow([_celula_segura(valor) for valor in linha])
+
+
+def _linhas_csv(pedidos, formato_itens):
+    """Gera as linhas do CSV do historico, lote a lote."""
+    escritor = _EscritorCsvSeguro(_Eco())
+    cabecalho = ['id', 'data', 'cliente', 'endereco', 'total_bruto', 'desconto', 'total_final']
+    if formato_itens == 'largo':
+        cabecalho.append('itens')
+    elif formato_itens == 'longo':
+        cabecalho += ['produto_id', 'item', 'quantidade', 'preco_unitario', 'total_item']
+    yield escritor.writerow(cabecalho)
+
+    campos = ['id', 'data_criacao', 'nome_cliente', 'endereco_entrega',
+              'total_bruto', 'desconto_aplicado', 'total_final']
+    if formato_itens:
+        campos.append('itens_json')
+
+    chunk_size = getattr(settings, 'HISTORICO_STREAMING_CHUNK', 500)
+    fuso = timezone.get_current_timezone()
+    for valores in pedidos.values_list(*campos).iterator(chunk_size=chunk_size):
+        linha = list(valores[:7])
+        linha[1] = linha[1].astimezone(fuso).strftime('%Y-%m-%d %H:%M:%S')
+
+        if formato_itens == 'largo':
+            itens = _itens_do_json(valores[7])
+            linha.append('; '.join(f"{item['quantidade']}x {item['nome']}" for item in itens))
+            yield escritor.writerow(linha)
+        elif formato_itens == 'longo':
+            for item in _itens_do_json(valores[7]) or [{}]:
+                yield escritor.writerow(
+                    linha
+                    + [
+                        item.get('produto_id', ''),
+                        item.get('nome', ''),
+                        item.get('quantidade', ''),
+                        item.get('preco', ''),
+                        item.get('total', ''),
+                    ]
+                )
+        else:
+            yield escritor.writerow(linha)
+
+
 @login_required
+@ler_da_replica
+def historico_exportar(request):
+    """Exporta o historico filtrado em CSV, transmitido em lotes."""
+    filtros = {
+        'data_inicio': request.GET.get('data_inicio', ''),
+        'data_fim': request.GET.get('data_fim', ''),
+    }
+    formato_itens = request.GET.get('itens', '')
+    if formato_itens not in ('', 'largo', 'longo'):
+        formato_itens = ''
+
+    try:
+        pedidos = _filtrar_periodo(
+            Pedido.objects.order_by('-data_criacao', '-id'),
+            filtros['data_inicio'],
+            filtros['data_fim'],
+        )
+    except ValueError:
+        messages.error(request, 'Periodo invalido para exportacao.')
+        return redirect('historico_pedidos')
+
+    response = StreamingHttpResponse(
+        _linhas_csv(pedidos, formato_itens), content_type='text/csv; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'attachment; filename="pedidos.csv"'
+    return response
+
+
+@login_required
+@ler_da_replica
 def relatorio_vendas(request):
     try:
-        hoje = timezone.now().date()
+        hoje = timezone.localdate()
         primeiro_dia_mes = hoje.replace(day=1)
-        pedidos_mes = Pedido.objects.filter(data_criacao__date__gte=primeiro_dia_mes).order_by(
-            '-data_criacao'
+
+        # KPIs saem do consolidado diario (no maximo 31 linhas por mes).
+        vendas_diarias = list(
+            VendaDiaria.objects.filter(data__gte=primeiro_dia_mes, data__lte=hoje)
         )
+        qtd_pedidos = sum(dia.qtd_pedidos for dia in vendas_diarias)
+        total_mensal = sum((dia.total_final for dia in vendas_diarias), Decimal('0.00'))
 
-        estatisticas = pedidos_mes.aggregate(
-            qtd_pedidos=Count('id'),
-            total_mensal=Sum('total_final'),
+        # Ranking por produto: um unico GROUP BY sobre ItemPedido.
+        ranking_produtos = list(
+            ItemPedido.objects.filter(
+                pedido__data_criacao__gte=_inicio_do_dia(primeiro_dia_mes)
+            )
+            .values('produto_id', 'nome')
+            .annotate(qtd_vendida=Sum('quantidade'), receita=Sum('total'))
+            .order_by('-qtd_vendida', '-receita')[:RANKING_PRODUTOS_LIMITE]
         )
 
-        qtd_pedidos = estatisticas.get('qtd_pedidos') or 0
-        total_mensal = estatisticas.get('total_mensal') or Decimal('0.00')
+        pedidos_mes = _filtrar_periodo(Pedido.objects.all(), primeiro_dia_mes).order_by(
+            '-data_criacao', '-id'
+        )
+        paginador = Paginator(
+            pedidos_mes, getattr(settings, 'RELATORIO_PAGINA_TAMANHO', 50)
+        )
+        pagina = paginador.get_page(request.GET.get('pagina'))
 
     except Exception:
         return render(
@@ -512,6 +1477,79 @@ def relatorio_vendas(request):
         'qtd_pedidos': qtd_pedidos,
         'total_mensal': total_mensal,
         'mes_referencia': primeiro_dia_mes.strftime('%m/%Y'),
-        'pedidos_detalhe': pedidos_mes,
+        'vendas_diarias': vendas_diarias,
+        'ranking_produtos': ranking_produtos,
+        'pedidos_detalhe': pagina,
     }
     return render(request, 'admin/relatorio.html', context)
+
+
+@login_required
+def relatorio_vendas_pdf(request):
+    """Entrega o PDF do mes; se ainda nao existir, enfileira a geracao para o worker."""
+    try:
+        referencia = datetime.strptime(request.GET.get('mes', ''), '%Y-%m').date()
+    except ValueError:
+        referencia = timezone.localdate()
+
+    destino = caminho_relatorio(referencia)
+    nome_arquivo = f'relatorio_vendas_{referencia:%Y_%m}.pdf'
+    if os.path.exists(destino):
+        return FileResponse(open(destino, 'rb'), as_attachment=True, filename=nome_arquivo)
+
+    agendar_relatorio_pdf(referencia)
+    return render(
+        request,
+        'admin/relatorio_pdf_aguarde.html',
+        {'mes_referencia': referencia.strftime('%m/%Y'), 'mes': referencia.strftime('%Y-%m')},
+        status=202,
+    )
+
+
+# ---------------------------
+# Cozinha (feed de pedidos por Server-Sent Events)
+# ---------------------------
+
+
+@login_required
+def cozinha_painel(request):
+    return render(request, 'admin/cozinha.html')
+
+
+def _ultimo_evento(request):
+    """Id do ultimo pedido ja visto: Last-Event-ID (reconexao) ou ?desde=."""
+    valor = request.headers.get('Last-Event-ID') or request.GET.get('desde')
+    try:
+        return max(0, int(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+def _resposta_sse(conteudo):
+    response = StreamingHttpResponse(conteudo, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: entrega cada evento na hora
+    return response
+
+
+@login_required
+def cozinha_eventos(request):
+    """Feed da cozinha sob WSGI: entrega o lote pendente e encerra.
+
+    O EventSource reconecta sozinho (``retry``) enviando o Last-Event-ID,
+    entao a tela continua atualizada sem prender um worker por conexao.
+    Sob ASGI a rota usa ``cozinha_eventos_async``, que mantem o fluxo aberto.
+    """
+    ultimo_id = _ultimo_evento(request)
+    partes = [abertura(ultimo_id)]
+    if ultimo_id is not None:
+        partes.extend(evento for _, evento in eventos_desde(ultimo_id))
+    return _resposta_sse(partes)
+
+
+async def cozinha_eventos_async(request):
+    """Feed da cozinha sob ASGI, alimentado pela fonte unica do processo."""
+    await _carregar_sessao(request, usuario=True)
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    return _resposta_sse(fluxo_eventos(_ultimo_evento(request)))
@@ -1,4 +1,5 @@
 import os
 from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'netburger.settings')
+os.environ.setdefault('NETBURGUER_ASGI', '1')
 application = get_asgi_application()
@@ -18,8 +18,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cardapio.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'cardapio.replica.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -27,7 +29,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'netburger.urls'
+# Sob ASGI (netburger/asgi.py define NETBURGUER_ASGI=1) o cardapio, o carrinho e a
+# contagem do carrinho sao servidos pelas views assincronas.
+ASGI_ATIVO = os.environ.get('NETBURGUER_ASGI') == '1'
+ROOT_URLCONF = 'netburger.urls_asgi' if ASGI_ATIVO else 'netburger.urls'
 
 TEMPLATES = [
     {
@@ -54,6 +59,110 @@ DATABASES = {
     }
 }
 
+# Perfil de execucao: 'producao' liga WAL e conexoes persistentes no SQLite,
+# evitando o "database is locked" em checkouts concorrentes.
+PERFIL = os.environ.get('NETBURGUER_PERFIL', 'desenvolvimento')
+
+# PRAGMAs aplicados a cada nova conexao SQLite (ver cardapio.signals).
+SQLITE_PRAGMAS = {}
+
+if PERFIL == 'producao':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('NETBURGUER_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+    })
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'busy_timeout': int(os.environ.get('NETBURGUER_SQLITE_BUSY_TIMEOUT_MS', 20000)),
+        'synchronous': 'NORMAL',
+        'cache_size': -20000,  # ~20 MB
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+# Replica de leitura para o historico e o relatorio do painel (cardapio/replica.py).
+# NETBURGUER_REPLICA_SQLITE aponta para um segundo arquivo SQLite, mantido em dia
+# pelo comando atualizar_replica (API de backup online). Sem ela, ou sem alias
+# 'replica', tudo le do 'default'. Uma replica Postgres entra aqui como outro alias.
+REPLICA_SQLITE = os.environ.get('NETBURGUER_REPLICA_SQLITE')
+if REPLICA_SQLITE:
+    DATABASES['replica'] = dict(
+        DATABASES['default'], NAME=REPLICA_SQLITE, TEST={'MIRROR': 'default'}
+    )
+DATABASE_ROUTERS = ['cardapio.replica.RoteadorReplica']
+# Depois de gravar algo, o cliente le do primario por esta janela (segundos);
+# deve cobrir o intervalo de atualizacao da replica.
+REPLICA_JANELA_PRIMARIO = 15
+REPLICA_INTERVALO = 5
+REPLICA_BACKUP_TIMEOUT = 20
+
+# Templates do perfil de producao: loader com cache explicito (cada template e
+# lido e compilado uma unica vez por processo, independente de DEBUG e do
+# autoreload do runserver) e sem o context processor de debug.
+CARREGADORES_TEMPLATES = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if PERFIL == 'producao':
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [('django.template.loaders.cached.Loader', CARREGADORES_TEMPLATES)]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.template.context_processors.debug')
+
+# Cache do cardapio (catalogo versionado). A versao do catalogo mora nele: com
+# varios workers o backend tem de ser compartilhado, senao a edicao feita em um
+# worker nao chega aos outros (precos antigos no carrinho, no checkout e no ETag
+# do cardapio). Escolhido por NETBURGUER_CACHE:
+#   locmem  -> memoria do processo; so serve com um unico worker (padrao em desenvolvimento)
+#   arquivo -> arquivos em .cache/catalogo (ou NETBURGUER_CACHE_DIR), compartilhados
+#              pelos workers da mesma maquina (padrao no perfil de producao)
+#   redis   -> NETBURGUER_CACHE_URL (redis://...), requer o pacote redis
+#   db      -> tabela netburguer_cache no banco (python manage.py createcachetable)
+CACHES_CATALOGO = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'netburguer',
+    },
+    'arquivo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('NETBURGUER_CACHE_DIR', str(BASE_DIR / '.cache' / 'catalogo')),
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('NETBURGUER_CACHE_URL', 'redis://127.0.0.1:6379/0'),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'netburguer_cache',
+    },
+}
+CACHE_CATALOGO = os.environ.get('NETBURGUER_CACHE', 'arquivo' if PERFIL == 'producao' else 'locmem')
+
+CACHES = {
+    'default': CACHES_CATALOGO[CACHE_CATALOGO],
+    # Fragmentos de template ({% cache ... using="fragmentos" %}): cabecalho, cards
+    # de produto por versao do catalogo, banner do combo. Separado para que os
+    # cards de versoes antigas nao expulsem o catalogo do cache 'default'.
+    'fragmentos': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'netburguer-fragmentos',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Baldes do limite de requisicoes (cardapio/limites.py), um por cliente.
+    # Local ao processo, como os contadores de checkouts simultaneos.
+    'limites': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'netburguer-limites',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'sessoes': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('NETBURGUER_SESSOES_DIR', str(BASE_DIR / '.cache' / 'sessoes')),
+        'TIMEOUT': 60 * 60 * 24 * 14,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = 'pt-br'
@@ -64,6 +173,20 @@ USE_TZ = True
 # Sessão do carrinho
 CART_SESSION_ID = 'carrinho'
 
+# Backend de sessao, escolhido por NETBURGUER_SESSAO:
+#   db        -> padrao do Django (uma leitura/gravacao no SQLite por requisicao)
+#   cookie    -> cookie assinado; o carrinho compacto cabe com folga em 4 KB
+#   cache     -> apenas no cache 'sessoes' (arquivo local, substituto do Redis)
+#   cached_db -> cache 'sessoes' na leitura, banco como copia duravel
+SESSOES_BACKENDS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+}
+SESSION_ENGINE = SESSOES_BACKENDS[os.environ.get('NETBURGUER_SESSAO', 'db')]
+SESSION_CACHE_ALIAS = 'sessoes'
+
 # Autenticação
 LOGIN_URL = 'admin_login'
 LOGIN_REDIRECT_URL = 'admin_painel'
@@ -74,9 +197,76 @@ TIME_ZONE = 'America/Sao_Paulo'
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Em producao o collectstatic grava nomes com hash (css/app.3f2a....css) e as
+# variantes .gz/.br; sem servidor web na frente o proprio Django serve
+# STATIC_ROOT com cache longo (cardapio.estaticos). Desligue com
+# NETBURGUER_SERVIR_ESTATICOS=0 quando o nginx servir /static/.
+if PERFIL == 'producao':
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'cardapio.estaticos.ArmazenamentoEstaticos'},
+    }
+SERVIR_ESTATICOS = PERFIL == 'producao' and os.environ.get('NETBURGUER_SERVIR_ESTATICOS', '1') == '1'
+ESTATICOS_MAX_AGE = 60 * 60 * 24 * 365
 TEMPLATE_DIRS = [BASE_DIR / 'templates']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Historico de pedidos: paginacao por cursor e tamanho do lote no modo streaming
+HISTORICO_PAGINA_TAMANHO = int(os.environ.get('HISTORICO_PAGINA_TAMANHO', 50))
+HISTORICO_PAGINA_MAXIMO = 500
+HISTORICO_STREAMING_CHUNK = 500
+
+# Relatorio mensal: pedidos detalhados por pagina
+RELATORIO_PAGINA_TAMANHO = 50
+
+# Relatorios em PDF gerados em segundo plano (um arquivo por mes/ultimo pedido)
+RELATORIOS_PDF_DIR = BASE_DIR / 'relatorios_pdf'
+
+# Fila de tarefas pos-checkout (cardapio.fila), processada por:
+#   python manage.py processar_tarefas
+# Com NETBURGUER_TAREFAS_SINCRONAS=1 as tarefas rodam no proprio processo,
+# logo apos o commit (util em desenvolvimento, sem worker).
+TAREFAS_SINCRONAS = os.environ.get('NETBURGUER_TAREFAS_SINCRONAS', '0') == '1'
+TAREFAS_BACKOFF_BASE = 5  # segundos; dobra a cada nova tentativa
+TAREFAS_BACKOFF_MAXIMO = 600
+TAREFAS_TIMEOUT = 300  # tarefa "executando" ha mais tempo volta para a fila
+RECIBOS_DIR = BASE_DIR / 'recibos'
+COZINHA_WEBHOOK_URL = os.environ.get('NETBURGUER_COZINHA_WEBHOOK', '')
+
+# Feed da cozinha (SSE): uma consulta por processo a cada intervalo, repassada
+# a todas as telas abertas; heartbeat mantem a conexao viva atras de proxies.
+COZINHA_SSE_INTERVALO = 1.0
+COZINHA_SSE_HEARTBEAT = 15.0
+COZINHA_SSE_RETRY_MS = 3000
+
+# Controle de admissao (cardapio/limites.py). Valem so para POST.
+# LIMITES_TAXA: balde de fichas por sessao (ou IP, sem sessao) e grupo de views;
+#   'capacidade' e a rajada permitida, 'por_segundo' o ritmo sustentado.
+# LIMITES_CONCORRENCIA: execucoes simultaneas por processo; acima disso a
+#   resposta e um 429 imediato pedindo nova tentativa em 'tentar_em' segundos.
+LIMITES_ATIVOS = os.environ.get('NETBURGUER_LIMITES', '1') == '1'
+LIMITES_TAXA = {
+    'carrinho': {'capacidade': 20, 'por_segundo': 2.0},
+    'checkout': {'capacidade': 5, 'por_segundo': 0.2},
+}
+LIMITES_CONCORRENCIA = {
+    'checkout': {
+        'maximo': int(os.environ.get('NETBURGUER_CHECKOUTS_SIMULTANEOS', '4')),
+        'tentar_em': 2,
+    },
+}
+
+# Metricas por view (Server-Timing e /painel/metrics/)
+METRICAS_ATIVAS = os.environ.get('NETBURGUER_METRICAS', '1') == '1'
+
 # Numero do WhatsApp da loja usado para gerar o link do pedido
 WHATSAPP_NUMERO_LOJA = os.environ.get('WHATSAPP_NUMERO_LOJA', '5565993481587')
+
+# Link curto do pedido (/p/<token>/): acima deste tamanho a URL do WhatsApp
+# e trocada por uma pagina com a mensagem para copiar (alguns navegadores e
+# proxies cortam URLs longas). O navegador guarda o link por PEDIDO_LINK_MAX_AGE.
+WHATSAPP_URL_MAXIMO = 2000
+PEDIDO_LINK_MAX_AGE = 60 * 60 * 24
@@ -1,7 +1,17 @@
+import re
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from cardapio.estaticos import servir_estatico
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('cardapio.urls')),
 ]
+
+if settings.SERVIR_ESTATICOS:
+    urlpatterns.insert(
+        0, re_path(r'^%s(?P<caminho>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), servir_estatico)
+    )
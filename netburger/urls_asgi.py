@@ -0,0 +1,14 @@
+"""Rotas do perfil ASGI: leituras do cliente e feed da cozinha em views assincronas."""
+
+from django.urls import path
+
+from cardapio import views
+
+from .urls import urlpatterns as urlpatterns_wsgi
+
+urlpatterns = [
+    path('', views.menu_cardapio_async, name='menu_cardapio'),
+    path('carrinho/', views.carrinho_detalhe_async, name='carrinho_detalhe'),
+    path('carrinho/api/contagem/', views.api_carrinho_contagem_async, name='api_carrinho_contagem'),
+    path('painel/cozinha/eventos/', views.cozinha_eventos_async, name='cozinha_eventos'),
+] + urlpatterns_wsgi
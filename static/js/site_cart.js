@@ -17,28 +17,53 @@ function getCookie(name) {
     return cookieValue;
 }
 
+function avisarLimite(texto){
+    if(window.Toastify){
+        Toastify({
+            text: texto,
+            duration: 4000,
+            gravity: "top",
+            position: "right",
+            style: { background: "#d32f2f" }
+        }).showToast();
+    } else {
+        alert(texto);
+    }
+}
+
 document.addEventListener('DOMContentLoaded', function(){
-    // tornar botões de adicionar (forms) em AJAX
-    const addForms = document.querySelectorAll('form[action*="adicionar"]');
-    addForms.forEach(form => {
-        form.addEventListener('submit', function(e){
-            e.preventDefault();
-            const action = form.getAttribute('action');
-            const formData = new FormData(form);
-            const csrftoken = getCookie('csrftoken');
+    // tornar botões de adicionar (forms) em AJAX; delegado no document para
+    // valer tambem para a grade trocada pela busca do cardapio
+    document.addEventListener('submit', function(e){
+        const form = e.target.closest('form[action*="adicionar"]');
+        if(!form) return;
+        e.preventDefault();
+        const action = form.getAttribute('action');
+        const formData = new FormData(form);
+        const csrftoken = getCookie('csrftoken');
 
-            fetch(action, {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': csrftoken,
-                    'X-Requested-With': 'XMLHttpRequest'
-                },
-                body: formData,
-            })
-            .then(resp => resp.json())
-            .then(data => {
-                if(data && data.success){
-                    // mostrar toast
+        fetch(action, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': csrftoken,
+                'X-Requested-With': 'XMLHttpRequest',
+                'Accept': 'application/json'
+            },
+            body: formData,
+        })
+        .then(resp => {
+            // limite de requisicoes (429): avisa e nao reenvia o formulario
+            if(resp.status === 429){
+                return resp.json().then(d => { avisarLimite(d.erro); return null; });
+            }
+            // sem JSON (ex.: erro do servidor), segue o fluxo normal do formulario
+            if(!resp.ok) throw new Error(resp.status);
+            return resp.json();
+        })
+        .then(data => {
+            if(data && data.success){
+                // mostrar toast (Toastify e opcional)
+                if(window.Toastify){
                     Toastify({
                         text: "Adicionado ao carrinho!",
                         duration: 3000,
@@ -46,22 +71,23 @@ document.addEventListener('DOMContentLoaded', function(){
                         position: "right",
                         style: { background: "#16a34a" }
                     }).showToast();
+                }
 
-                    // atualizar contador
-                    const counter = document.getElementById('cart-count');
-                    if(counter){
-                        counter.textContent = data.count || 0;
-                    }
+                // atualizar contador
+                const counter = document.getElementById('cart-count');
+                if(counter){
+                    counter.textContent = data.count || 0;
                 }
-            })
-            .catch(err => {
-                console.error('Erro ao adicionar ao carrinho', err);
-            })
+            }
+        })
+        .catch(err => {
+            console.error('Erro ao adicionar ao carrinho', err);
+            form.submit();
         })
     })
 
     // buscar contador inicial
-    fetch('/cart/count/')
+    fetch('/carrinho/api/contagem/')
     .then(r => r.json())
     .then(d => {
         const counter = document.getElementById('cart-count');